@@ -0,0 +1,117 @@
+"""
+Yazım hatalarına toleranslı şehir çözümleme (karakter trigram indeksi).
+
+filter_hotels şehirde birebir (normalize) eşleşme istiyor; "Antlya" gibi bir
+yazım hatası boş sonuç veriyor, kullanıcı tekrar deniyor ve Places açıksa her
+deneme yeni bir API çağrısı oluyor. Girdi, upstream'e gitmeden önce katalog
+şehirleri + SEHIR_LISTESI üzerinden kurulan trigram indeksiyle en yakın şehre
+çözülür.
+
+Benzerlik: normalize edilmiş ve boşlukla dolgulanmış ("  antalya ") trigram
+kümelerinin Jaccard oranı. Eşik altındaki girdiler olduğu gibi bırakılır
+(Places katalogda olmayan yerleri de arayabilir: "Bodrum", "Kaş").
+
+    CITY_MATCH_THRESHOLD=0.35    0 => sadece birebir (normalize) eşleşme
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from app.utils.text_utils import normalize_text
+
+SEHIR_LISTESI = [
+    "Adana","Adıyaman","Afyonkarahisar","Ağrı","Amasya","Ankara","Antalya","Artvin",
+    "Aydın","Balıkesir","Bilecik","Bingöl","Bitlis","Bolu","Burdur","Bursa",
+    "Çanakkale","Çankırı","Çorum","Denizli","Diyarbakır","Edirne","Elazığ","Erzincan",
+    "Erzurum","Eskişehir","Gaziantep","Giresun","Gümüşhane","Hakkari","Hatay","Isparta",
+    "Mersin","İstanbul","İzmir","Kars","Kastamonu","Kayseri","Kırklareli","Kırşehir",
+    "Kocaeli","Konya","Kütahya","Malatya","Manisa","Kahramanmaraş","Mardin","Muğla",
+    "Muş","Nevşehir","Niğde","Ordu","Rize","Sakarya","Samsun","Siirt","Sinop","Sivas",
+    "Tekirdağ","Tokat","Trabzon","Tunceli","Şanlıurfa","Uşak","Van","Yozgat","Zonguldak",
+    "Aksaray","Bayburt","Karaman","Kırıkkale","Batman","Şırnak","Bartın","Ardahan",
+    "Iğdır","Yalova","Karabük","Kilis","Osmaniye","Düzce"
+]
+
+DEFAULT_THRESHOLD = 0.35
+_MAX_CACHED_QUERIES = 1024
+
+
+def match_threshold() -> float:
+    try:
+        return float(os.getenv("CITY_MATCH_THRESHOLD", "").strip() or DEFAULT_THRESHOLD)
+    except ValueError:
+        return DEFAULT_THRESHOLD
+
+
+def trigrams(norm: str) -> Set[str]:
+    padded = f"  {norm} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class CityIndex:
+    """Normalize şehir adı -> görünen ad; trigram -> aday şehirler (posting listeleri)."""
+
+    def __init__(self, names: Iterable[str]):
+        # İlk gelen yazım kazanır: katalog adları SEHIR_LISTESI'nden önce verilir
+        display: Dict[str, str] = {}
+        for name in names:
+            if name is None or name != name:
+                continue
+            norm = normalize_text(name)
+            if norm and norm not in display:
+                display[norm] = str(name).strip()
+        self._display = display
+        self._norms: List[str] = list(display)
+        self._sizes: List[int] = []
+        postings: Dict[str, List[int]] = {}
+        for i, norm in enumerate(self._norms):
+            grams = trigrams(norm)
+            self._sizes.append(len(grams))
+            for g in grams:
+                postings.setdefault(g, []).append(i)
+        self._postings = postings
+        self._cache: Dict[Tuple[str, float], Optional[Tuple[str, float]]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._norms)
+
+    def best_match(self, query: Optional[str], threshold: float) -> Optional[Tuple[str, float]]:
+        """(görünen ad, benzerlik) ya da eşik altındaysa None; birebir eşleşme 1.0."""
+        q = normalize_text(query)
+        if not q:
+            return None
+        hit = self._display.get(q)
+        if hit is not None:
+            return hit, 1.0
+        if threshold <= 0:
+            return None
+
+        key = (q, threshold)
+        if key in self._cache:
+            return self._cache[key]
+
+        grams = trigrams(q)
+        shared: Dict[int, int] = {}
+        for g in grams:
+            for i in self._postings.get(g, ()):
+                shared[i] = shared.get(i, 0) + 1
+
+        best: Optional[Tuple[str, float]] = None
+        best_key = None
+        for i, n in shared.items():
+            score = n / (len(grams) + self._sizes[i] - n)
+            # Eşitlikte uzunluğu sorguya yakın olan, sonra alfabetik (deterministik)
+            rank = (score, -abs(len(self._norms[i]) - len(q)), self._norms[i])
+            if score >= threshold and (best_key is None or rank > best_key):
+                best_key = rank
+                best = (self._display[self._norms[i]], score)
+
+        with self._lock:
+            if len(self._cache) >= _MAX_CACHED_QUERIES:
+                self._cache.clear()
+            self._cache[key] = best
+        return best
@@ -1,45 +1,94 @@
-import pandas as pd
+from __future__ import annotations
+
 import os
 import json
-from app.utils.text_utils import normalize_text
+from functools import partial
+from typing import TYPE_CHECKING
+
+from app.agents import learned_ranker
+from app.agents.restaurant_index import RestaurantIndex
+from app.models.records import Restaurant
+from app.utils.binary_catalog import open_table, split_ids
+from app.utils.deadline import has_budget
+from app.utils.snapshot_cache import SnapshotCache
+from app.utils.speculative import race_rerank, speculative_enabled
+from app.utils.tracing import traced, set_attrs
+
+if TYPE_CHECKING:  # pandas ilk CSV okumasında yüklenir (soğuk başlangıç)
+    import pandas as pd
 
 DATA_PATH = os.path.join(os.path.dirname(__file__), "..", "data", "restoran.csv")
 DATA_PATH = os.path.abspath(DATA_PATH)
 
 
 def load_restaurants() -> pd.DataFrame:
+    table = open_table("restoran", DATA_PATH)
+    if table is not None:
+        return table.to_frame()
+    import pandas as pd
     return pd.read_csv(DATA_PATH)
 
 
-def get_restaurants_near_hotel(hotel_id: int) -> pd.DataFrame:
-    df = load_restaurants()
+# ----------------------------
+# İndeksler (katalog snapshot'ı başına bir kez)
+# ----------------------------
 
-    def is_near(rest_row) -> bool:
-        yakin_ids = str(rest_row.get("otellere_yakin_ids", "")).split(",")
-        yakin_ids = [x.strip() for x in yakin_ids if x is not None]
-        return str(hotel_id) in yakin_ids
+def _catalog_source():
+    """Güncel snapshot: mmap tablosu ya da CSV imzası."""
+    table = open_table("restoran", DATA_PATH)
+    if table is not None:
+        return table
+    st = os.stat(DATA_PATH)
+    return ("csv", DATA_PATH, st.st_size, st.st_mtime_ns)
+
+
+def _build_index(source) -> RestaurantIndex:
+    if not isinstance(source, tuple):
+        return RestaurantIndex(
+            len(source),
+            source.strings("mutfak_turu"),
+            source.lists("otellere_yakin_ids"),
+            source.to_frame,
+        )
 
-    near_restaurants = df[df.apply(is_near, axis=1)]
-    return near_restaurants
+    import pandas as pd
+    df = pd.read_csv(DATA_PATH)
+    yakin = df["otellere_yakin_ids"].tolist() if "otellere_yakin_ids" in df.columns else [None] * len(df)
+    return RestaurantIndex(
+        len(df),
+        df["mutfak_turu"].tolist(),
+        [split_ids(v) for v in yakin],
+        lambda rows: df.iloc[list(rows)],
+    )
 
 
-def filter_by_cuisine(df: pd.DataFrame, mutfak_turu: str):
-    if not mutfak_turu:
-        return df
+_indexes: SnapshotCache[RestaurantIndex] = SnapshotCache(_build_index)
 
-    df = df.copy()
-    df["_mutfak_norm"] = df["mutfak_turu"].apply(normalize_text)
-    target = normalize_text(mutfak_turu)
 
-    out = df[df["_mutfak_norm"] == target].copy()
-    out.drop(columns=["_mutfak_norm"], inplace=True, errors="ignore")
-    return out
+def get_restaurant_index() -> RestaurantIndex:
+    """Güncel katalog snapshot'ının indeksi; yeniden kurulurken önceki snapshot'ınki döner."""
+    return _indexes.get(_catalog_source())
+
+
+def warm_indexes() -> None:
+    """Katalog değişikliğinden sonra catalog_watcher thread'inden çağrılır."""
+    _indexes.warm(_catalog_source())
+
+
+@traced("food_agent.get_restaurants_near_hotel")
+def get_restaurants_near_hotel(hotel_id: int) -> pd.DataFrame:
+    index = get_restaurant_index()
+    hid = _safe_int(hotel_id)
+    near_restaurants = index.frame(index.rows_for(hid) if hid is not None else [])
+    set_attrs(hotel_id=hotel_id, catalog_rows=index.n_rows, candidates=len(near_restaurants))
+    return near_restaurants
 
 
 def get_restaurant_recommendations(hotel_id: int, mutfak_turu=None) -> pd.DataFrame:
-    near_restaurants = get_restaurants_near_hotel(hotel_id)
-    final_list = filter_by_cuisine(near_restaurants, mutfak_turu)
-    return final_list
+    # near ∩ mutfak: iki küme kesişimi, DataFrame sadece sonuç satırları için
+    index = get_restaurant_index()
+    hid = _safe_int(hotel_id)
+    return index.frame(index.rows_for(hid, mutfak_turu) if hid is not None else [])
 
 
 # ----------------------------
@@ -50,6 +99,11 @@ def _use_llm() -> bool:
     return os.getenv("LLM_PROVIDER", "mock").strip().lower() != "mock"
 
 
+def _llm_budget_ok() -> bool:
+    # İstek bütçesi azsa LLM'i bekleme, heuristik sıralama yeterli
+    return has_budget(float(os.getenv("LLM_MIN_BUDGET_S", "2.0")))
+
+
 def _safe_int(x, default=None):
     try:
         return int(x)
@@ -63,7 +117,7 @@ def _rerank_restaurants_with_llm(food_context: str, hotel: dict, candidates: lis
     Hata olursa [] döner (fallback için).
     """
     try:
-        from app.llm.llm_client import generate_text
+        from app.llm.llm_client import generate_text_batched
         from app.utils import prompt_utils as pu
     except Exception:
         return []
@@ -72,12 +126,12 @@ def _rerank_restaurants_with_llm(food_context: str, hotel: dict, candidates: lis
         system = pu.build_system_prompt()
         prompt = pu.build_food_prompt_json(food_context, hotel, candidates, profile_hint)
 
-        resp = generate_text(
+        # LLM_MICROBATCH=1 ise eşzamanlı rerank'ler tek çağrıda birleşir (JSON cevap)
+        resp = generate_text_batched(
             system=system,
             prompt=prompt,
             temperature=0.2,
             max_tokens=700,
-            response_format="json",
         )
 
         data = json.loads(resp.text)
@@ -105,41 +159,56 @@ def _rerank_restaurants_with_llm(food_context: str, hotel: dict, candidates: lis
         return []
 
 
+@traced("food_agent.select_top_restaurants_for_hotel")
 def select_top_restaurants_for_hotel(hotel_id: int, mutfak_turu=None, top_k: int = 3, profile_hint: str = ""):
     """
     Rapor: her otel için 1–3 restoran öner.
-    Mock: puanı yüksek olanları öne al.
-    LLM_PROVIDER != mock ise: LLM ile rerank dener, olmazsa fallback.
+    Mock: puanı yüksek olanları öne al; eğitilmiş ranker modeli varsa onun sırası.
+    LLM_PROVIDER != mock ise (ve model emin değilse): LLM ile rerank dener, olmazsa fallback.
     """
     df = get_restaurant_recommendations(hotel_id, mutfak_turu)
+    set_attrs(hotel_id=hotel_id, candidates=len(df), top_k=top_k)
     if df.empty:
         return []
 
-    df_sorted = df.sort_values(["puan"], ascending=False).head(max(top_k, 10))  # LLM için biraz geniş aday
+    df_sorted = df.sort_values(["puan"], ascending=False)
+    ranking = learned_ranker.rank("restaurant", df_sorted, top_k)
+    if ranking is not None:
+        df_sorted = df_sorted.iloc[ranking.order]
+        set_attrs(ranker="learned", ranker_confidence=round(ranking.confidence, 3))
+    df_sorted = df_sorted.head(max(top_k, 10))  # LLM için biraz geniş aday
 
     candidates = []
     for _, row in df_sorted.iterrows():
-        candidates.append({
-            "id": int(row["id"]),
-            "isim": row["isim"],
-            "mutfak_turu": row["mutfak_turu"],
-            "puan": float(row["puan"]),
-            "konum_aciklama": row.get("konum_aciklama", ""),
-        })
-
-    # ✅ LLM opsiyonel rerank
-    if _use_llm():
+        candidates.append(Restaurant(
+            id=int(row["id"]),
+            isim=row["isim"],
+            mutfak_turu=row["mutfak_turu"],
+            puan=float(row["puan"]),
+            konum_aciklama=row.get("konum_aciklama", ""),
+        ))
+
+    # ✅ LLM opsiyonel rerank (model eminse atlanır)
+    if _use_llm() and _llm_budget_ok() and not (ranking and ranking.confident):
         # Food context: elimizde sadece mutfak tercihi var
         food_context = f"Mutfak tercihi: {mutfak_turu or 'farketmez'}"
         hotel_stub = {"id": hotel_id}  # otel detayın yoksa minimal stub yeterli
 
-        llm_ranked = _rerank_restaurants_with_llm(
+        rerank = partial(
+            _rerank_restaurants_with_llm,
             food_context=food_context,
             hotel=hotel_stub,
             candidates=candidates,
             profile_hint=profile_hint,
             top_k=top_k,
         )
+        if speculative_enabled():
+            # Heuristik sıralama hazır; LLM sadece bütçe içinde gelirse kazanır
+            ranked, outcome = race_rerank("restaurant_rerank", candidates[:top_k], rerank)
+            llm_ranked = ranked if outcome == "llm_won" else []
+        else:
+            llm_ranked = rerank()
+        set_attrs(llm_used=bool(llm_ranked))
         if llm_ranked:
             print(f"🤖 [food_agent] LLM rerank kullanıldı ✅ (hotel_id={hotel_id})")
             return llm_ranked
@@ -1,7 +1,22 @@
-import pandas as pd
+from __future__ import annotations
+
 import os
 import json
+from functools import partial
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Sequence, Tuple
+
+from app.agents import learned_ranker
+from app.agents.city_index import SEHIR_LISTESI, CityIndex, match_threshold
+from app.models.records import Hotel
+from app.utils.binary_catalog import open_table
 from app.utils.text_utils import normalize_text
+from app.utils.deadline import has_budget
+from app.utils.snapshot_cache import SnapshotCache
+from app.utils.speculative import race_rerank, speculative_enabled
+from app.utils.tracing import traced, set_attrs
+
+if TYPE_CHECKING:  # pandas ilk CSV okumasında yüklenir (soğuk başlangıç)
+    import pandas as pd
 
 DATA_PATH = os.path.join(os.path.dirname(__file__), "..", "data", "otel.csv")
 DATA_PATH = os.path.abspath(DATA_PATH)
@@ -9,10 +24,77 @@ DATA_PATH = os.path.abspath(DATA_PATH)
 
 def load_hotels() -> pd.DataFrame:
     """otel.csv dosyasını okuyup dataframe olarak döner"""
+    table = open_table("otel", DATA_PATH)
+    if table is not None:
+        return table.to_frame()
+    import pandas as pd
     return pd.read_csv(DATA_PATH)
 
 
+# ----------------------------
+# Şehir çözümleme (yazım hatası toleransı)
+# ----------------------------
+
+def _catalog_source():
+    table = open_table("otel", DATA_PATH)
+    if table is not None:
+        return table
+    st = os.stat(DATA_PATH)
+    return ("csv", DATA_PATH, st.st_size, st.st_mtime_ns)
+
+
+def catalog_version() -> str:
+    """Kaynak CSV'nin sürümü (boyut + mtime); sıcak yenilemede değişir."""
+    st = os.stat(DATA_PATH)
+    return f"{st.st_size}:{st.st_mtime_ns}"
+
+
+def _build_city_index(source) -> CityIndex:
+    if isinstance(source, tuple):
+        import pandas as pd
+        cities = pd.read_csv(DATA_PATH, usecols=["sehir"])["sehir"].tolist()
+    else:
+        cities = source.strings("sehir")
+    return CityIndex(list(dict.fromkeys(cities)) + SEHIR_LISTESI)
+
+
+_city_indexes: SnapshotCache[CityIndex] = SnapshotCache(_build_city_index)
+
+
+def get_city_index() -> CityIndex:
+    """Katalog şehirleri + SEHIR_LISTESI; yeniden kurulurken önceki snapshot'ınki döner."""
+    return _city_indexes.get(_catalog_source())
+
+
+@traced("hotel_agent.resolve_city")
+def resolve_city(sehir: str) -> Optional[str]:
+    """
+    Girdiyi bilinen en yakın şehre çözer ("Antlya" -> "Antalya").
+    Eşik (CITY_MATCH_THRESHOLD) altında None döner; çağıran girdiyi olduğu gibi kullanır.
+    """
+    match = get_city_index().best_match(sehir, match_threshold())
+    if match is None:
+        set_attrs(resolved=False)
+        return None
+    name, score = match
+    set_attrs(resolved=True, city=name, similarity=round(score, 3))
+    return name
+
+
+@traced("hotel_agent.filter_hotels")
 def filter_hotels(sehir: str, max_fiyat: int, min_puan: float) -> pd.DataFrame:
+    table = open_table("otel", DATA_PATH)
+    if table is not None:
+        # mmap kolonlar üzerinde filtre; DataFrame sadece eşleşen satırlar için
+        mask = (
+            table.eq_normalized("sehir", sehir) &
+            (table["fiyat_gece"] <= max_fiyat) &
+            (table["puan"] >= min_puan)
+        )
+        filtered = table.to_frame(mask.nonzero()[0])
+        set_attrs(sehir=sehir, catalog_rows=len(table), candidates=len(filtered), catalog="mmap")
+        return filtered
+
     df = load_hotels()
 
     df["_sehir_norm"] = df["sehir"].apply(normalize_text)
@@ -25,9 +107,61 @@ def filter_hotels(sehir: str, max_fiyat: int, min_puan: float) -> pd.DataFrame:
     ].copy()
 
     filtered.drop(columns=["_sehir_norm"], inplace=True, errors="ignore")
+    set_attrs(sehir=sehir, catalog_rows=len(df), candidates=len(filtered))
     return filtered
 
 
+@traced("hotel_agent.city_partition")
+def city_partition(sehir: str) -> pd.DataFrame:
+    """Şehrin tüm otelleri (fiyat/puan filtresi yok); toplu sorgularda bir kez taranır."""
+    table = open_table("otel", DATA_PATH)
+    if table is not None:
+        part = table.to_frame(table.eq_normalized("sehir", sehir).nonzero()[0])
+        set_attrs(sehir=sehir, catalog_rows=len(table), candidates=len(part), catalog="mmap")
+        return part
+
+    df = load_hotels()
+    part = df[df["sehir"].apply(normalize_text) == normalize_text(sehir)]
+    set_attrs(sehir=sehir, catalog_rows=len(df), candidates=len(part))
+    return part
+
+
+@traced("hotel_agent.select_top_hotels_many")
+def select_top_hotels_many(
+    city_df: pd.DataFrame,
+    queries: Sequence[Tuple[int, float, int, str]],
+) -> List[List[Hotel]]:
+    """
+    Tek şehir bölümü üzerinde birden çok (max_fiyat, min_puan, top_k, profile_hint) sorgusu.
+
+    Tüm fiyat/puan predikatları ve skorlar (satır x sorgu) matrisleriyle tek
+    seferde hesaplanır; sonuçlar her sorgu için filter_hotels + select_top_hotels
+    (LLM/ranker kapalıyken) ile aynıdır.
+    """
+    import numpy as np
+
+    set_attrs(candidates=len(city_df), queries=len(queries))
+    if city_df.empty or not queries:
+        return [[] for _ in queries]
+
+    price = city_df["fiyat_gece"].to_numpy(dtype=float)[:, None]
+    puan = city_df["puan"].to_numpy(dtype=float)[:, None]
+    max_f = np.array([q[0] for q in queries], dtype=float)[None, :]
+    min_p = np.array([q[1] for q in queries], dtype=float)[None, :]
+
+    mask = (price <= max_f) & (puan >= min_p)
+    max_price = np.maximum(np.where(mask, price, -np.inf).max(axis=0), 1.0)
+    skor = (puan * 20) + ((max_price - price) / max_price * 10)
+
+    out: List[List[Hotel]] = []
+    for j, (_, _, top_k, profile_hint) in enumerate(queries):
+        rows = mask[:, j].nonzero()[0]
+        # select_top_hotels ile aynı sıra: skor, sonra puan (azalan, kararlı)
+        order = rows[np.lexsort((-puan[rows, 0], -skor[rows, j]))][:top_k]
+        out.append([_hotel_from_row(city_df.iloc[i], skor[i, j], profile_hint) for i in order])
+    return out
+
+
 # ----------------------------
 # LLM (Gemini) opsiyonel rerank
 # ----------------------------
@@ -36,6 +170,11 @@ def _use_llm() -> bool:
     return os.getenv("LLM_PROVIDER", "mock").strip().lower() != "mock"
 
 
+def _llm_budget_ok() -> bool:
+    # İstek bütçesi azsa LLM'i bekleme, heuristik sıralama yeterli
+    return has_budget(float(os.getenv("LLM_MIN_BUDGET_S", "2.0")))
+
+
 def _safe_int(x, default=None):
     try:
         return int(x)
@@ -49,7 +188,7 @@ def _rerank_hotels_with_llm(user_context: str, candidates: list, profile_hint: s
     Hata olursa [] döner (fallback için).
     """
     try:
-        from app.llm.llm_client import generate_text
+        from app.llm.llm_client import generate_text_batched
         from app.utils import prompt_utils as pu
     except Exception:
         return []
@@ -58,12 +197,12 @@ def _rerank_hotels_with_llm(user_context: str, candidates: list, profile_hint: s
         system = pu.build_system_prompt()
         prompt = pu.build_hotel_prompt_json(user_context, candidates, profile_hint)
 
-        resp = generate_text(
+        # LLM_MICROBATCH=1 ise eşzamanlı rerank'ler tek çağrıda birleşir (JSON cevap)
+        resp = generate_text_batched(
             system=system,
             prompt=prompt,
             temperature=0.2,
             max_tokens=700,
-            response_format="json",  # Gemini garanti etmese de prompt JSON istiyor
         )
 
         data = json.loads(resp.text)
@@ -91,6 +230,86 @@ def _rerank_hotels_with_llm(user_context: str, candidates: list, profile_hint: s
         return []
 
 
+def _score_and_sort(filtered_df: pd.DataFrame, top_k: int):
+    df = filtered_df.copy()
+    max_price = max(float(df["fiyat_gece"].max()), 1.0)
+
+    df["uygunluk_skoru"] = (df["puan"] * 20) + ((max_price - df["fiyat_gece"]) / max_price * 10)
+    df = df.sort_values(["uygunluk_skoru", "puan"], ascending=[False, False])
+
+    # Feedback'ten öğrenilen model: eşitlikte heuristik sıra korunur
+    ranking = learned_ranker.rank("hotel", df, top_k)
+    if ranking is not None:
+        df = df.iloc[ranking.order]
+        set_attrs(ranker="learned", ranker_confidence=round(ranking.confidence, 3))
+    return df, ranking
+
+
+def _hotel_from_row(row, skor, profile_hint: str) -> Hotel:
+    # gerekce = base_reason | profile_hint (profil ipucu kayıtlar arasında paylaşılır)
+    return Hotel(
+        id=int(row["id"]),
+        isim=row["isim"],
+        sehir=row["sehir"],
+        fiyat_gece=int(row["fiyat_gece"]),
+        puan=float(row["puan"]),
+        konum_aciklama=row.get("konum_aciklama", ""),
+        skor=round(float(skor), 1),
+        base_reason=f"Yüksek puan ({row['puan']}) ve bütçeye uygun fiyat ({row['fiyat_gece']} TL).",
+        profile_hint=profile_hint,
+    )
+
+
+def rank_hotels(filtered_df: pd.DataFrame) -> List[Tuple[int, float]]:
+    """Tüm adayların (id, skor) sırası (select_top_hotels'in LLM'siz sırası); sayfalama indeksi için."""
+    if filtered_df.empty:
+        return []
+    df, _ = _score_and_sort(filtered_df, len(filtered_df))
+    return [
+        (int(i), round(float(s), 1))
+        for i, s in zip(df["id"].tolist(), df["uygunluk_skoru"].tolist())
+    ]
+
+
+def _build_id_map(source) -> Tuple[Dict[int, int], Any]:
+    """id -> satır haritası + aynı snapshot'tan satır üreten fonksiyon."""
+    if isinstance(source, tuple):
+        import pandas as pd
+        df = pd.read_csv(DATA_PATH)
+        ids, frame = df["id"].tolist(), (lambda r, df=df: df.iloc[r])
+    else:
+        ids, frame = source["id"].tolist(), source.to_frame
+    return {int(hid): i for i, hid in enumerate(ids)}, frame
+
+
+_id_maps: SnapshotCache[Tuple[Dict[int, int], Any]] = SnapshotCache(_build_id_map)
+
+
+def warm_indexes() -> None:
+    """Katalog değişikliğinden sonra catalog_watcher thread'inden çağrılır."""
+    source = _catalog_source()
+    _city_indexes.warm(source)
+    _id_maps.warm(source)
+
+
+def hotels_by_id(
+    entries: Sequence[Tuple[int, float]],
+    profile_hint: str = "",
+) -> List[Hotel]:
+    """(id, skor) çiftlerinden Hotel listesi; id -> satır haritası katalog snapshot'ı başına bir kez kurulur."""
+    rows, frame = _id_maps.get(_catalog_source())
+
+    found = [(rows[int(hid)], skor) for hid, skor in entries if int(hid) in rows]
+    if not found:
+        return []
+    part = frame([r for r, _ in found])
+    return [
+        _hotel_from_row(row, skor, profile_hint)
+        for (_, row), (_, skor) in zip(part.iterrows(), found)
+    ]
+
+
+@traced("hotel_agent.select_top_hotels")
 def select_top_hotels(
     filtered_df: pd.DataFrame,
     top_k: int = 5,
@@ -98,42 +317,37 @@ def select_top_hotels(
     user_context: str = "",
 ) -> list:
     """
-    Varsayılan: skor bazlı seçim.
-    Eğer LLM_PROVIDER != mock ise, LLM ile rerank dener; başarısızsa fallback.
+    Varsayılan: skor bazlı seçim; eğitilmiş ranker modeli varsa onun sırası.
+    Eğer LLM_PROVIDER != mock ise (ve model emin değilse), LLM ile rerank dener; başarısızsa fallback.
     """
-    df = filtered_df.copy()
-    if df.empty:
+    set_attrs(candidates=len(filtered_df), top_k=top_k)
+    if filtered_df.empty:
         return []
 
-    max_price = max(float(df["fiyat_gece"].max()), 1.0)
+    df, ranking = _score_and_sort(filtered_df, top_k)
+    df = df.head(top_k)
 
-    df["uygunluk_skoru"] = (df["puan"] * 20) + ((max_price - df["fiyat_gece"]) / max_price * 10)
-    df = df.sort_values(["uygunluk_skoru", "puan"], ascending=[False, False]).head(top_k)
-
-    results = []
-    for _, row in df.iterrows():
-        base_reason = f"Yüksek puan ({row['puan']}) ve bütçeye uygun fiyat ({row['fiyat_gece']} TL)."
-        reason = f"{base_reason} | {profile_hint}" if profile_hint else base_reason
-
-        results.append({
-            "id": int(row["id"]),
-            "isim": row["isim"],
-            "sehir": row["sehir"],
-            "fiyat_gece": int(row["fiyat_gece"]),
-            "puan": float(row["puan"]),
-            "konum_aciklama": row.get("konum_aciklama", ""),
-            "skor": round(float(row["uygunluk_skoru"]), 1),
-            "gerekce": reason
-        })
-
-    # ✅ LLM opsiyonel rerank
-    if _use_llm():
-        llm_ranked = _rerank_hotels_with_llm(
+    results = [
+        _hotel_from_row(row, row["uygunluk_skoru"], profile_hint)
+        for _, row in df.iterrows()
+    ]
+
+    # ✅ LLM opsiyonel rerank (model eminse atlanır)
+    if _use_llm() and _llm_budget_ok() and not (ranking and ranking.confident):
+        rerank = partial(
+            _rerank_hotels_with_llm,
             user_context=user_context,
             candidates=results,
             profile_hint=profile_hint,
             top_k=top_k
         )
+        if speculative_enabled():
+            # Heuristik sıralama hazır; LLM sadece bütçe içinde gelirse kazanır
+            ranked, outcome = race_rerank("hotel_rerank", results, rerank)
+            llm_ranked = ranked if outcome == "llm_won" else []
+        else:
+            llm_ranked = rerank()
+        set_attrs(llm_used=bool(llm_ranked))
         if llm_ranked:
             print("🤖 [hotel_agent] LLM rerank kullanıldı ✅")
             return llm_ranked
@@ -0,0 +1,315 @@
+"""
+Feedback'ten öğrenilen yerel sıralama modeli.
+
+Sıralama ya sabit `uygunluk_skoru` formülüydü ya da yavaş/ücretli LLM
+rerank'i. Bu modül `feedback` tablosundaki (otel_id / restoran_id, rating)
+kayıtlarını katalog özellikleriyle (puan, fiyat, merkeze mesafe, mutfak,
+şehir) birleştirip küçük bir ridge regresyonu eğitir; servis yolunda aday
+DataFrame'i tek bir matris çarpımıyla puanlanır.
+
+Özellikler eğitimde standartlaştırılır (ortalama/ölçek modelle birlikte
+saklanır); tek bir ridge cezası tüm kolonlara eşit etki eder.
+
+Güven: sıralamanın kesildiği yerdeki (top_k. ile top_k+1. aday arası) tahmin
+farkı, modelin görmediği verideki tahmin hatasıyla (k-katlı çapraz doğrulama
+artıklarının sigma'sı) karşılaştırılır: güven = erf(fark / (2 * sigma)), yani
+iki adayın sırasının doğru olma olasılığından türetilir. Kayıt sayısı arttıkça
+kendiliğinden 1'e gitmez; model kötü uyuyorsa düşük kalır. Güven
+RANKER_MIN_CONFIDENCE'ın altındaysa agent'lar (LLM açıksa) yine LLM'e sorar.
+
+    LEARNED_RANKER=off           modeli tamamen kapatır
+    RANKER_MIN_CONFIDENCE=0.6    LLM'e düşme eşiği
+    RANKER_MIN_SAMPLES=20        eğitimde tür başına gereken en az kayıt
+
+Eğitim (offline):
+    python -m app.agents.learned_ranker
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+from app.utils.text_utils import normalize_text
+
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+
+MODEL_PATH = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "..", "data", "ranker_model.json")
+)
+
+# 2: standartlaştırılmış özellikler + çapraz doğrulama sigma'sı
+FORMAT_VERSION = 2
+RIDGE_LAMBDA = 1.0
+CV_FOLDS = 5
+
+# tür => (sayısal kolonlar, one-hot kolonlar)
+_FEATURES: Dict[str, Tuple[Tuple[str, ...], Tuple[str, ...]]] = {
+    "hotel": (("puan", "log_fiyat", "mesafe_merkez_km"), ("sehir",)),
+    "restaurant": (("puan", "fiyat_seviye"), ("mutfak_turu", "sehir")),
+}
+
+
+def ranker_enabled() -> bool:
+    return os.getenv("LEARNED_RANKER", "auto").strip().lower() not in ("0", "off", "false", "no")
+
+
+def _min_confidence() -> float:
+    try:
+        return float(os.getenv("RANKER_MIN_CONFIDENCE", "").strip() or 0.6)
+    except ValueError:
+        return 0.6
+
+
+def _min_samples() -> int:
+    try:
+        return int(os.getenv("RANKER_MIN_SAMPLES", "").strip() or 20)
+    except ValueError:
+        return 20
+
+
+# ----------------------------
+# Özellikler (eğitim ve servis yolu aynı fonksiyonu kullanır)
+# ----------------------------
+
+def _numeric(df: pd.DataFrame, name: str) -> np.ndarray:
+    import numpy as np
+
+    if name == "log_fiyat":
+        col = df["fiyat_gece"] if "fiyat_gece" in df.columns else None
+        values = np.zeros(len(df)) if col is None else col.to_numpy(dtype=float, na_value=0.0)
+        return np.log1p(np.clip(values, 0.0, None))
+    if name not in df.columns:
+        return np.zeros(len(df))
+    return df[name].to_numpy(dtype=float, na_value=0.0)
+
+
+def _feature_matrix(kind: str, df: pd.DataFrame, vocab: Dict[str, List[str]]) -> np.ndarray:
+    import numpy as np
+
+    numeric, categorical = _FEATURES[kind]
+    blocks = [np.ones((len(df), 1))]
+    blocks += [_numeric(df, name)[:, None] for name in numeric]
+    for name in categorical:
+        words = vocab.get(name, [])
+        pos = {w: i for i, w in enumerate(words)}
+        onehot = np.zeros((len(df), len(words)))
+        if name in df.columns and words:
+            idx = np.array([pos.get(normalize_text(v), -1) for v in df[name].tolist()], dtype=np.int64)
+            rows = np.flatnonzero(idx >= 0)
+            onehot[rows, idx[rows]] = 1.0
+        blocks.append(onehot)
+    return np.hstack(blocks)
+
+
+# ----------------------------
+# Servis yolu
+# ----------------------------
+
+@dataclass
+class Ranking:
+    order: Any  # np.ndarray: df içindeki konumlar, tahmini puana göre azalan
+    confidence: float
+
+    @property
+    def confident(self) -> bool:
+        return self.confidence >= _min_confidence()
+
+
+_lock = threading.Lock()
+_state: Dict[str, Any] = {"stat": None, "model": None}
+
+
+def load_model(path: str = MODEL_PATH) -> Optional[Dict[str, Any]]:
+    try:
+        st = os.stat(path)
+        key = (st.st_size, st.st_mtime_ns)
+    except OSError:
+        return None
+
+    with _lock:
+        if _state["stat"] == key:
+            return _state["model"]
+        model: Optional[Dict[str, Any]] = None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                loaded = json.load(f)
+            if loaded.get("version") == FORMAT_VERSION:
+                model = loaded
+        except Exception as e:
+            print(f"⚠️ [ranker] Model okunamadı: {e}")
+        _state["stat"] = key
+        _state["model"] = model
+        return model
+
+
+def has_model(kind: str) -> bool:
+    if not ranker_enabled():
+        return False
+    model = load_model()
+    return bool(model and model.get("kinds", {}).get(kind))
+
+
+def _confidence(sorted_scores: np.ndarray, top_k: int, sigma: float) -> float:
+    """
+    sigma: tek tahminin görülmemiş verideki hatası. İki tahminin farkının hatası
+    sigma*sqrt(2); sıranın doğru olma olasılığı p = Φ(gap / (sigma*sqrt(2))),
+    güven = 2p - 1 = erf(gap / (2*sigma)).
+    """
+    if len(sorted_scores) <= 1:
+        return 1.0
+    if sigma <= 0:
+        return 0.0  # hata ölçülemedi: emin olma
+    if len(sorted_scores) > top_k:
+        gap = float(sorted_scores[top_k - 1] - sorted_scores[top_k])
+    else:
+        gap = float(sorted_scores[0] - sorted_scores[-1]) / (len(sorted_scores) - 1)
+    return math.erf(max(gap, 0.0) / (2.0 * sigma))
+
+
+def rank(kind: str, df: pd.DataFrame, top_k: int) -> Optional[Ranking]:
+    """
+    df satırlarını modelin tahmini puanına göre sıralar.
+    Model yoksa/kapalıysa None (çağıran heuristik sıralamaya düşer).
+    """
+    if not ranker_enabled() or df.empty:
+        return None
+    model = load_model()
+    params = (model or {}).get("kinds", {}).get(kind)
+    if not params:
+        return None
+
+    import numpy as np
+
+    X = _standardize(_feature_matrix(kind, df, params["vocab"]), params["x_mean"], params["x_scale"])
+    scores = X @ np.asarray(params["w"]) + params["mean"]
+    # Eşitlikte mevcut (heuristik) sıra korunur
+    order = np.argsort(-scores, kind="stable")
+    return Ranking(order=order, confidence=_confidence(scores[order], top_k, params["sigma"]))
+
+
+# ----------------------------
+# Eğitim (offline)
+# ----------------------------
+
+def _standardize(X: np.ndarray, x_mean: List[float], x_scale: List[float]) -> np.ndarray:
+    import numpy as np
+
+    return (X - np.asarray(x_mean)) / np.asarray(x_scale)
+
+
+def _scaler(X: np.ndarray) -> Tuple[List[float], List[float]]:
+    import numpy as np
+
+    mu = X.mean(axis=0)
+    sd = X.std(axis=0)
+    sd[sd == 0] = 1.0  # sabit kolonlar (ör. tek şehir) olduğu gibi
+    mu[0], sd[0] = 0.0, 1.0  # sabit terim
+    return mu.tolist(), sd.tolist()
+
+
+def _solve(Xs: np.ndarray, y: np.ndarray) -> Tuple[float, np.ndarray]:
+    import numpy as np
+
+    mean = float(y.mean())
+    reg = RIDGE_LAMBDA * np.eye(Xs.shape[1])
+    reg[0, 0] = 0.0  # sabit terimi cezalandırma
+    w = np.linalg.solve(Xs.T @ Xs + reg, Xs.T @ (y - mean))
+    return mean, w
+
+
+def _cv_sigma(X: np.ndarray, y: np.ndarray) -> float:
+    """k-katlı çapraz doğrulama: her kat, kalanlarla (kendi ölçekleyicisiyle) eğitilen modelle tahmin edilir."""
+    import numpy as np
+
+    n = len(y)
+    folds = min(CV_FOLDS, n)
+    perm = np.random.default_rng(0).permutation(n)
+    resid = np.empty(n)
+    for k in range(folds):
+        test = perm[k::folds]
+        train_idx = np.setdiff1d(perm, test)
+        x_mean, x_scale = _scaler(X[train_idx])
+        mean, w = _solve(_standardize(X[train_idx], x_mean, x_scale), y[train_idx])
+        resid[test] = y[test] - mean - _standardize(X[test], x_mean, x_scale) @ w
+    return float(np.sqrt(np.mean(resid ** 2)))
+
+
+def _fit(kind: str, df: pd.DataFrame, y: np.ndarray, vocab: Dict[str, List[str]]) -> Dict[str, Any]:
+    X = _feature_matrix(kind, df, vocab)
+    x_mean, x_scale = _scaler(X)
+    mean, w = _solve(_standardize(X, x_mean, x_scale), y)
+    return {
+        "vocab": vocab,
+        "x_mean": [round(float(v), 6) for v in x_mean],
+        "x_scale": [round(float(v), 6) for v in x_scale],
+        "w": [round(float(v), 6) for v in w],
+        "mean": mean,
+        "sigma": _cv_sigma(X, y),
+        "n": int(len(y)),
+    }
+
+
+def _vocab(catalog: pd.DataFrame, names: Tuple[str, ...]) -> Dict[str, List[str]]:
+    return {
+        name: sorted({normalize_text(v) for v in catalog[name].dropna().tolist()})
+        for name in names if name in catalog.columns
+    }
+
+
+def train(path: str = MODEL_PATH) -> Dict[str, Any]:
+    """feedback ⨝ katalog => tür başına ridge modeli; modeli dosyaya yazar."""
+    import numpy as np
+    import pandas as pd
+
+    from app.agents import food_agent, hotel_agent
+    from app.utils.db_utils import get_conn
+
+    conn = get_conn()
+    try:
+        fb = pd.read_sql_query("SELECT otel_id, restoran_id, rating FROM feedback", conn)
+    finally:
+        conn.close()
+
+    # Places id'leri (metin) katalogda yok; sadece CSV id'leri eşleşir
+    fb["otel_id"] = pd.to_numeric(fb["otel_id"], errors="coerce")
+    fb["restoran_id"] = pd.to_numeric(fb["restoran_id"], errors="coerce")
+
+    kinds: Dict[str, Any] = {}
+    samples = {
+        "hotel": (hotel_agent.load_hotels(), fb[fb["restoran_id"].isna()].rename(columns={"otel_id": "id"})),
+        "restaurant": (food_agent.load_restaurants(), fb.rename(columns={"restoran_id": "id"})),
+    }
+    for kind, (catalog, labels) in samples.items():
+        joined = labels.dropna(subset=["id"]).merge(catalog, on="id", how="inner")
+        if len(joined) < _min_samples():
+            print(f"ℹ️ [ranker] {kind}: {len(joined)} kayıt (< {_min_samples()}), model eğitilmedi.")
+            continue
+        vocab = _vocab(catalog, _FEATURES[kind][1])
+        kinds[kind] = _fit(kind, joined, joined["rating"].to_numpy(dtype=float), vocab)
+
+    model = {
+        "version": FORMAT_VERSION,
+        "trained_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "features": {k: list(v[0]) + list(v[1]) for k, v in _FEATURES.items()},
+        "kinds": kinds,
+    }
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(model, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+    return model
+
+
+if __name__ == "__main__":
+    trained = train()
+    for kind_name, p in trained["kinds"].items():
+        print(f"✅ {kind_name}: n={p['n']}, sigma(cv)={p['sigma']:.3f}")
+    print(f"   -> {MODEL_PATH}")
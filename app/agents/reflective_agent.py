@@ -1,4 +1,5 @@
-from app.utils.db_utils import get_recent_feedback
+from app.utils.db_utils import get_recent_feedback, get_recent_tag_counts
+from app.utils.keyword_index import tag_hints
 
 def build_profile_hint(user_id: int) -> str:
     """
@@ -27,13 +28,7 @@ def build_profile_hint(user_id: int) -> str:
     else:
         hints.append("dengeyi koru (puan/fiyat)")
 
-    # yorumlardan basit anahtar kelimeler
-    comments = " ".join((r[1] or "") for r in rows).lower()
-    if "sessiz" in comments:
-        hints.append("tercih: sessiz/sakin ortam")
-    if "aile" in comments:
-        hints.append("tercih: aile dostu")
-    if "ucuz" in comments or "bütçe" in comments or "butce" in comments:
-        hints.append("tercih: bütçe hassasiyeti")
+    # yorumlardan tercih etiketleri (insert_feedback sırasında indekslendi)
+    hints.extend(tag_hints(get_recent_tag_counts(user_id, limit=20)))
 
     return " | ".join(hints)
@@ -1,17 +1,18 @@
 from datetime import datetime
 import os
 import re
+import threading
 import warnings
 from typing import Optional, List, Dict, Any
 
-from app.agents.hotel_agent import filter_hotels, select_top_hotels
+# Not: agent'lar pandas'ı, provider'lar requests'i ilk kullanımda yükler;
+# Places provider da sadece PLACES_API_KEY varsa import edilir.
+from app.agents.hotel_agent import filter_hotels, resolve_city, select_top_hotels
 from app.agents.food_agent import select_top_restaurants_for_hotel
 from app.utils.db_utils import get_or_create_user, create_session, insert_feedback
 from app.agents.reflective_agent import build_profile_hint
-from app.llm.llm_client import generate_text
-
-# Places provider (varsa kullanacağız)
-from app.providers.places_provider import search_hotels, search_restaurants_near_hotel
+from app.utils.env_utils import ensure_dotenv
+from app.utils.profiling import profile_request
 
 # Demo çıktısını temizlemek için (LibreSSL uyarısı)
 warnings.filterwarnings("ignore", message="urllib3 v2 only supports OpenSSL*")
@@ -66,11 +67,62 @@ def _max_price_to_price_level(max_fiyat: int) -> int:
     return 4
 
 
-def run_full_recommendation_flow():
-    # LLM provider test (Gemini/Mock) - sistem çökmesin diye generate_text zaten fallback'li olmalı
-    test_resp = generate_text(prompt="LLM test: sadece 'ok' yaz.", max_tokens=10)
+def _start_llm_probe() -> Optional[Dict[str, Any]]:
+    """
+    LLM provider testi (Gemini/Mock). LLM_STARTUP_PROBE:
+    - off (varsayılan): test yok
+    - async: arka planda çalışır, sonucu otel aramasından önce raporlanır
+    - sync: eski davranış, ilk prompt'tan önce bekler
+    """
+    mode = os.getenv("LLM_STARTUP_PROBE", "off").strip().lower()
+    if mode not in ("async", "sync"):
+        return None
+
+    probe: Dict[str, Any] = {"resp": None, "error": None}
+
+    def _run():
+        try:
+            from app.llm.llm_client import generate_text
+            probe["resp"] = generate_text(prompt="LLM test: sadece 'ok' yaz.", max_tokens=10)
+        except Exception as e:
+            probe["error"] = e
+
+    t = threading.Thread(target=_run, name="llm-probe", daemon=True)
+    t.start()
+    probe["thread"] = t
+    if mode == "sync":
+        t.join()
+        _report_llm_probe(probe)
+    return probe
+
+
+def _report_llm_probe(probe: Optional[Dict[str, Any]]) -> None:
+    if not probe or probe.get("reported"):
+        return
+    if probe["thread"].is_alive():
+        print("🧪 LLM Provider Test => hâlâ çalışıyor (arka planda)\n")
+        return
+    probe["reported"] = True
+    if probe["error"] is not None:
+        print(f"🧪 LLM Provider Test => hata: {probe['error']}\n")
+        return
+    test_resp = probe["resp"]
     print(f"🧪 LLM Provider Test => provider={test_resp.provider}, model={test_resp.model}, text={test_resp.text}\n")
 
+
+def run_full_recommendation_flow(profile: bool = False):
+    """
+    profile=True (ya da PROFILE_SAMPLE_RATE ile örneklenirse) akış cProfile +
+    tracemalloc altında çalışır, çıktı PROFILE_DIR'e yazılır (bkz. app.utils.profiling).
+    """
+    ensure_dotenv()
+    with profile_request("cli.recommendation_flow", force=profile):
+        _run_flow()
+
+
+def _run_flow():
+    llm_probe = _start_llm_probe()
+
     print("=== OTEL & RESTORAN ÖNERİ SİSTEMİ ===\n")
 
     # --- Kullanıcı + session ---
@@ -88,6 +140,10 @@ def run_full_recommendation_flow():
 
     # --- Kullanıcı istekleri ---
     sehir = input("Şehir giriniz (örn: Antalya): ").strip()
+    resolved = resolve_city(sehir)
+    if resolved and resolved != sehir:
+        print(f"🔤 Şehir '{sehir}' -> '{resolved}' olarak düzeltildi.")
+    sehir = resolved or sehir
     max_fiyat = read_int_in_range("Maksimum gecelik fiyat (örn: 2000): ", 0, 10_000_000)
 
     min_puan_raw = input("Minimum otel puanı (örn: 4.0): ").strip()
@@ -100,9 +156,12 @@ def run_full_recommendation_flow():
     mutfak_turu = input("İstediğiniz mutfak türü (boş bırakabilirsiniz): ").strip()
     mutfak_turu = mutfak_turu or None
 
+    _report_llm_probe(llm_probe)
     print("\n🔎 Uygun oteller aranıyor...\n")
 
     use_places = bool(os.getenv("PLACES_API_KEY", "").strip())
+    if use_places:
+        from app.providers.places_provider import search_hotels, search_restaurants_near_hotel
 
     # --- Otel listesi ---
     if use_places:
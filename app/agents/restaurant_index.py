@@ -0,0 +1,105 @@
+"""
+Restoran kataloğu için bellek içi indeksler.
+
+- near:    otel_id -> yakın restoran satırları (otellere_yakin_ids'ten)
+- cuisine: normalize mutfak -> restoran satırları; tam, token ve önek eşleşmesi
+
+Eskiden her otel için her istekte restoran DataFrame'i taranıyor, mutfak
+kolonu baştan normalize ediliyor ve sadece birebir eşleşme aranıyordu.
+İndeks katalog snapshot'ı başına bir kez kurulur; filtre bir küme kesişimidir.
+
+Mutfak eşleşmesi:
+- sorgu normalize haliyle bir mutfakla birebir aynıysa sadece o mutfak
+- değilse: sorgunun her token'ı mutfağın bir token'ının öneki olan tüm
+  mutfaklar ("türk" -> "Türk Mutfağı", "deniz" -> "Deniz Ürünleri")
+"""
+
+from __future__ import annotations
+
+import bisect
+import threading
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, Optional, Sequence, Set
+
+from app.utils.text_utils import normalize_text
+
+_EMPTY: FrozenSet[int] = frozenset()
+_MAX_CACHED_QUERIES = 1024
+
+
+class CuisineIndex:
+    def __init__(self, cuisines: Sequence[Any]):
+        exact: Dict[str, Set[int]] = {}
+        for row, value in enumerate(cuisines):
+            if value is None or value != value:
+                continue
+            exact.setdefault(normalize_text(value), set()).add(row)
+        self._exact: Dict[str, FrozenSet[int]] = {k: frozenset(v) for k, v in exact.items() if k}
+
+        token_to_names: Dict[str, Set[str]] = {}
+        for name in self._exact:
+            for token in name.split():
+                token_to_names.setdefault(token, set()).add(name)
+        self._token_to_names = token_to_names
+        self._tokens: List[str] = sorted(token_to_names)
+
+        self._cache: Dict[str, FrozenSet[int]] = {}
+        self._lock = threading.Lock()
+
+    def _names_with_token_prefix(self, prefix: str) -> Set[str]:
+        out: Set[str] = set()
+        i = bisect.bisect_left(self._tokens, prefix)
+        while i < len(self._tokens) and self._tokens[i].startswith(prefix):
+            out |= self._token_to_names[self._tokens[i]]
+            i += 1
+        return out
+
+    def match(self, query: Optional[str]) -> FrozenSet[int]:
+        """Sorguya uyan satırlar (boş sorgu => boş küme; çağıran filtre uygulamamalı)."""
+        q = normalize_text(query)
+        if not q:
+            return _EMPTY
+        cached = self._cache.get(q)
+        if cached is not None:
+            return cached
+
+        rows = self._exact.get(q)
+        if rows is None:
+            names: Optional[Set[str]] = None
+            for token in q.split():
+                hits = self._names_with_token_prefix(token)
+                names = hits if names is None else names & hits
+                if not names:
+                    break
+            rows = frozenset().union(*(self._exact[n] for n in names)) if names else _EMPTY
+
+        with self._lock:
+            if len(self._cache) >= _MAX_CACHED_QUERIES:
+                self._cache.clear()
+            self._cache[q] = rows
+        return rows
+
+
+class RestaurantIndex:
+    """Bir katalog snapshot'ı için near + cuisine indeksleri ve satırdan DataFrame üretici."""
+
+    def __init__(
+        self,
+        n_rows: int,
+        cuisines: Sequence[Any],
+        near_lists: Iterable[Sequence[int]],
+        frame: Callable[[Sequence[int]], Any],
+    ):
+        near: Dict[int, Set[int]] = {}
+        for row, hotel_ids in enumerate(near_lists):
+            for hid in hotel_ids:
+                near.setdefault(int(hid), set()).add(row)
+        self.n_rows = n_rows
+        self.near: Dict[int, FrozenSet[int]] = {k: frozenset(v) for k, v in near.items()}
+        self.cuisine = CuisineIndex(cuisines)
+        self.frame = frame
+
+    def rows_for(self, hotel_id: int, mutfak_turu: Optional[str] = None) -> List[int]:
+        rows = self.near.get(int(hotel_id), _EMPTY)
+        if mutfak_turu and normalize_text(mutfak_turu):
+            rows = rows & self.cuisine.match(mutfak_turu)
+        return sorted(rows)
@@ -0,0 +1,449 @@
+"""
+Headless JSON HTTP API (recommendation_service üzerine).
+
+Uç noktalar:
+- GET  /health
+- GET  /hotels?sehir=Antalya&max_fiyat=2000&min_puan=4.0&top_k=5&user=fatma[&include_restaurants=1&top_k_rest=3&mutfak_turu=...][&paginate=1]
+- POST /hotels        (aynı alanlar JSON body ile)
+- GET  /hotels/next?cursor=...&page_size=5   (paginate=1 ile dönen next_cursor'dan sonraki sayfa)
+- POST /restaurants   {"otel": {...}, "mutfak_turu": null, "top_k": 3, "used_places": false, "user": "fatma"}
+- POST /feedback      {"user": "fatma", "otel_id": "1", "restoran_id": "2", "rating": 4, "comment": "", "session_id": 12}
+
+Sunucu pre-fork çalışır: ana süreç portu bir kez açar, N worker aynı soketten
+kabul eder (load balancer arkasına yatay ölçeklenebilir). SIGTERM/SIGINT gelince
+worker'lar yeni bağlantı almayı bırakır, süren istekleri bitirip çıkar; boşta
+bekleyen keep-alive bağlantıları hemen kapatılır (kapanış onları beklemez).
+
+    API_CONN_TIMEOUT_S=30    bağlantı başına soket zaman aşımı (yavaş/boşta istemci); 0 => yok
+    API_MAX_BODY_BYTES=65536 POST gövdesi üst sınırı; büyükse okumadan 413
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from app.models.records import json_default
+
+
+class ApiError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+# ----------------------------
+# Parametre yardımcıları
+# ----------------------------
+
+def _get(params: Dict[str, Any], name: str, cast, default=None, required: bool = False):
+    v = params.get(name)
+    if v is None or v == "":
+        if required:
+            raise ApiError(400, f"'{name}' zorunlu")
+        return default
+    try:
+        if cast is bool:
+            return str(v).strip().lower() in ("1", "true", "yes", "evet")
+        if cast is float:
+            return float(str(v).replace(",", "."))
+        return cast(v)
+    except (TypeError, ValueError):
+        raise ApiError(400, f"'{name}' geçersiz: {v!r}")
+
+
+def _user_and_hint(params: Dict[str, Any]) -> Tuple[int, str]:
+    from app.agents.reflective_agent import build_profile_hint
+    from app.utils.db_utils import get_or_create_user
+
+    user_identifier = (_get(params, "user", str, "anon") or "anon").strip() or "anon"
+    user_id = get_or_create_user(user_identifier)
+    return user_id, build_profile_hint(user_id)
+
+
+# ----------------------------
+# Handler'lar
+# ----------------------------
+
+def handle_hotels(params: Dict[str, Any]) -> Dict[str, Any]:
+    from app.services.recommendation_service import compute_metrics, get_hotels, get_recommendations
+    from app.utils.deadline import request_deadline, resolve_budget
+
+    sehir = _get(params, "sehir", str, required=True).strip()
+    max_fiyat = _get(params, "max_fiyat", int, required=True)
+    min_puan = _get(params, "min_puan", float, 0.0)
+    top_k = max(1, min(_get(params, "top_k", int, 5), 20))
+    budget_s = _get(params, "budget_s", float, None)
+
+    user_id, profile_hint = _user_and_hint(params)
+    out: Dict[str, Any] = {"user_id": user_id, "profile_hint": profile_hint}
+
+    if _get(params, "include_restaurants", bool, False):
+        rec = get_recommendations(
+            sehir=sehir,
+            max_fiyat=max_fiyat,
+            min_puan=min_puan,
+            mutfak_turu=_get(params, "mutfak_turu", str, None),
+            profile_hint=profile_hint,
+            top_k=top_k,
+            top_k_rest=max(1, min(_get(params, "top_k_rest", int, 3), 10)),
+            budget_s=budget_s,
+        )
+        out.update(rec)
+    else:
+        # İmleç isteğe bağlı: tüm şehri sıralayıp durum yazar, materyalize tabloyu atlar
+        paginate = _get(params, "paginate", bool, False)
+        with request_deadline(resolve_budget(budget_s)):
+            res = get_hotels(
+                sehir=sehir,
+                max_fiyat=max_fiyat,
+                min_puan=min_puan,
+                profile_hint=profile_hint,
+                top_k=top_k,
+                with_cursor=paginate,
+            )
+        out.update({"hotels": res[0], "used_places": res[1], "complete": True})
+        if paginate:
+            out["next_cursor"] = res[2]
+
+    out["metrics"] = compute_metrics(out["hotels"])
+    return out
+
+
+def handle_hotels_next(params: Dict[str, Any]) -> Dict[str, Any]:
+    from app.services.pagination import CursorError
+    from app.services.recommendation_service import get_hotels_next
+
+    cursor = _get(params, "cursor", str, required=True)
+    page_size = max(1, min(_get(params, "page_size", int, 5), 20))
+    try:
+        oteller, used_places, next_cursor = get_hotels_next(cursor, page_size)
+    except CursorError as e:
+        raise ApiError(410, str(e))
+    return {"hotels": oteller, "used_places": used_places, "next_cursor": next_cursor}
+
+
+def handle_restaurants(params: Dict[str, Any]) -> Dict[str, Any]:
+    from app.services.recommendation_service import get_restaurants_for_hotel
+
+    otel = params.get("otel")
+    if not isinstance(otel, dict) or otel.get("id") is None:
+        raise ApiError(400, "'otel' nesnesi (en az id alanı ile) zorunlu")
+
+    _, profile_hint = _user_and_hint(params)
+    used_places = params.get("used_places")
+    recs = get_restaurants_for_hotel(
+        otel=otel,
+        mutfak_turu=_get(params, "mutfak_turu", str, None),
+        profile_hint=profile_hint,
+        top_k=max(1, min(_get(params, "top_k", int, 3), 10)),
+        used_places=None if used_places is None else bool(used_places),
+    )
+    return {"otel_id": str(otel["id"]), "restaurants": recs}
+
+
+def handle_feedback(params: Dict[str, Any]) -> Dict[str, Any]:
+    from app.utils.db_utils import create_session, get_or_create_user, insert_feedback
+
+    user_identifier = (_get(params, "user", str, "anon") or "anon").strip() or "anon"
+    otel_id = _get(params, "otel_id", str, required=True)
+    rating = _get(params, "rating", int, required=True)
+    if rating < 1 or rating > 5:
+        raise ApiError(400, "'rating' 1-5 aralığında olmalı")
+
+    user_id = get_or_create_user(user_identifier)
+    session_id = _get(params, "session_id", int, None) or create_session(user_id, session_token="api")
+
+    insert_feedback(
+        user_id=user_id,
+        session_id=session_id,
+        otel_id=otel_id,
+        restoran_id=_get(params, "restoran_id", str, None),
+        rating=rating,
+        comment=_get(params, "comment", str, ""),
+    )
+    return {"ok": True, "user_id": user_id, "session_id": session_id}
+
+
+ROUTES = {
+    ("GET", "/hotels"): handle_hotels,
+    ("POST", "/hotels"): handle_hotels,
+    ("GET", "/hotels/next"): handle_hotels_next,
+    ("POST", "/restaurants"): handle_restaurants,
+    ("POST", "/feedback"): handle_feedback,
+}
+
+
+def conn_timeout_s() -> Optional[float]:
+    try:
+        v = float(os.getenv("API_CONN_TIMEOUT_S", "").strip() or 30)
+    except ValueError:
+        v = 30.0
+    return v if v > 0 else None
+
+
+def max_body_bytes() -> int:
+    try:
+        return max(int(os.getenv("API_MAX_BODY_BYTES", "").strip() or 65536), 0)
+    except ValueError:
+        return 65536
+
+
+class ApiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "OtelOneriAPI/1.0"
+    # İstekler arasında boşta (keep-alive) mı; drain sırasında boştakiler kapatılır
+    idle = True
+
+    def setup(self):
+        # StreamRequestHandler.setup soketi bu değerle settimeout eder; süresi
+        # dolan okuma bağlantıyı kapatır (thread yavaş/boşta istemcide asılı kalmaz)
+        self.timeout = conn_timeout_s()
+        super().setup()
+        self.server.track(self, True)
+
+    def finish(self):
+        try:
+            super().finish()
+        finally:
+            self.server.track(self, False)
+
+    def handle(self):
+        self.close_connection = True
+        self.handle_one_request()
+        while not self.close_connection and not self.server.draining:
+            self.server.set_idle(self, True)
+            self.handle_one_request()
+
+    def parse_request(self) -> bool:
+        # İstek satırı geldi: artık drain bu bağlantıyı kesmez
+        self.server.set_idle(self, False)
+        return super().parse_request()
+
+    def _send_json(self, status: int, payload: Any) -> None:
+        body = json.dumps(payload, ensure_ascii=False, default=json_default).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        if getattr(self.server, "draining", False) or self.close_connection:
+            self.send_header("Connection", "close")
+            self.close_connection = True
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _params(self, method: str) -> Dict[str, Any]:
+        url = urlparse(self.path)
+        params: Dict[str, Any] = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        if method == "POST":
+            try:
+                length = int(self.headers.get("Content-Length") or 0)
+            except ValueError:
+                length = -1
+            # Hatalı/büyük gövde okunmaz: bağlantıda kalan baytlar sonraki istek sanılmasın
+            if length < 0:
+                self.close_connection = True
+                raise ApiError(400, "Content-Length geçersiz")
+            if length > max_body_bytes():
+                self.close_connection = True
+                raise ApiError(413, f"Gövde çok büyük (en fazla {max_body_bytes()} bayt)")
+            if length:
+                try:
+                    body = json.loads(self.rfile.read(length).decode("utf-8"))
+                except (UnicodeDecodeError, json.JSONDecodeError):
+                    raise ApiError(400, "Gövde geçerli JSON değil")
+                if not isinstance(body, dict):
+                    raise ApiError(400, "Gövde JSON nesnesi olmalı")
+                params.update(body)
+        return params
+
+    def _dispatch(self, method: str) -> None:
+        path = urlparse(self.path).path.rstrip("/") or "/"
+        if path == "/health":
+            self._send_json(200, {"ok": True, "pid": os.getpid()})
+            return
+
+        handler = ROUTES.get((method, path))
+        if handler is None:
+            self._send_json(404, {"error": f"{method} {path} bulunamadı"})
+            return
+
+        try:
+            self._send_json(200, handler(self._params(method)))
+        except ApiError as e:
+            self._send_json(e.status, {"error": e.message})
+        except Exception as e:
+            print(f"⚠️ [api] {method} {path} hata: {type(e).__name__}: {e}")
+            self._send_json(500, {"error": "internal error"})
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def log_message(self, fmt, *args):
+        if os.getenv("API_ACCESS_LOG", "").strip() == "1":
+            sys.stderr.write(f"[api pid={os.getpid()}] {self.address_string()} - {fmt % args}\n")
+
+
+class ApiServer(ThreadingHTTPServer):
+    # server_close() süren istek thread'lerini bekler (graceful)
+    daemon_threads = False
+    block_on_close = True
+    draining = False
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._conn_lock = threading.Lock()
+        self._conns: set = set()
+
+    def track(self, handler: ApiHandler, active: bool) -> None:
+        with self._conn_lock:
+            if active:
+                self._conns.add(handler)
+            else:
+                self._conns.discard(handler)
+
+    def set_idle(self, handler: ApiHandler, idle: bool) -> None:
+        with self._conn_lock:
+            handler.idle = idle
+        if idle and self.draining:
+            # drain, bu bağlantı bir sonraki isteği okumaya başlamadan geldi
+            self._close_read(handler)
+
+    @staticmethod
+    def _close_read(handler: ApiHandler) -> None:
+        try:
+            handler.connection.shutdown(socket.SHUT_RD)
+        except OSError:
+            pass
+
+    def close_idle(self) -> None:
+        """
+        draining=True sonrası çağrılır: sıradaki isteği bekleyen keep-alive
+        bağlantılarının okuma yarısı kapatılır; readline EOF görür ve thread
+        çıkar. Süren istekler etkilenmez (yanıtları Connection: close taşır).
+        """
+        with self._conn_lock:
+            for handler in self._conns:
+                if handler.idle:
+                    self._close_read(handler)
+
+
+# ----------------------------
+# Worker / supervisor
+# ----------------------------
+
+def _serve_on_socket(sock: socket.socket) -> None:
+    """Verilen dinleyen soket üzerinde tek worker çalıştırır; SIGTERM/SIGINT ile kapanır."""
+    from app.utils.catalog_watcher import start_catalog_watcher
+
+    start_catalog_watcher()  # CSV güncellemeleri yeniden başlatmadan alınır
+    server = ApiServer(sock.getsockname()[:2], ApiHandler, bind_and_activate=False)
+    server.socket.close()
+    server.socket = sock
+
+    def _stop(signum, frame):
+        if server.draining:
+            return
+        server.draining = True
+        server.close_idle()
+        # shutdown() serve_forever'ı bekler; sinyal aynı thread'de geldiği için ayrı thread
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, _stop)
+    signal.signal(signal.SIGINT, _stop)
+
+    try:
+        server.serve_forever(poll_interval=0.5)
+    finally:
+        server.server_close()
+
+
+def _spawn_worker(sock: socket.socket) -> int:
+    pid = os.fork()
+    if pid == 0:
+        code = 0
+        try:
+            _serve_on_socket(sock)
+        except Exception as e:
+            print(f"⚠️ [api worker {os.getpid()}] {e}")
+            code = 1
+        finally:
+            os._exit(code)
+    return pid
+
+
+def run_api(host: str, port: int, workers: int = 0, shutdown_timeout: float = 30.0) -> None:
+    from app.utils.db_utils import init_db
+
+    init_db()
+    workers = workers or int(os.getenv("API_WORKERS", "0") or 0) or (os.cpu_count() or 1)
+    if workers > 1:
+        from app.utils import binary_catalog, shared_cache
+
+        # fork'tan önce: worker'lar aynı mmap kataloğu ve Places/LLM cache dosyasını paylaşsın
+        shared_cache.ensure_default_path()
+        binary_catalog.ensure_built()
+
+    sock = socket.create_server((host, port), backlog=128)
+    print(f"🚀 API dinleniyor: http://{host}:{port} (workers={workers}, pid={os.getpid()})")
+
+    if workers <= 1 or not hasattr(os, "fork"):
+        _serve_on_socket(sock)
+        return
+
+    children: Dict[int, bool] = {}
+    stopping = {"v": False}
+
+    def _stop(signum, frame):
+        stopping["v"] = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    for _ in range(workers):
+        children[_spawn_worker(sock)] = True
+
+    signal.signal(signal.SIGTERM, _stop)
+    signal.signal(signal.SIGINT, _stop)
+
+    deadline: Optional[float] = None
+    while children:
+        if stopping["v"] and deadline is None:
+            deadline = time.monotonic() + shutdown_timeout
+        if deadline is not None and time.monotonic() > deadline:
+            print("⚠️ [api] Worker'lar zamanında kapanmadı, SIGKILL gönderiliyor.")
+            for pid in list(children):
+                try:
+                    os.kill(pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            break
+        if pid == 0:
+            time.sleep(0.2)
+            continue
+
+        children.pop(pid, None)
+        if not stopping["v"]:
+            # Beklenmedik çıkış: worker'ı yeniden başlat
+            print(f"⚠️ [api] Worker {pid} çıktı (status={status}), yeniden başlatılıyor.")
+            children[_spawn_worker(sock)] = True
+
+    sock.close()
+    print("✅ API kapatıldı.")
@@ -1,10 +1,17 @@
 from __future__ import annotations
+import contextvars
+import json
 import os
-from typing import Optional
+import threading
+from typing import Dict, List, Optional, Tuple
 
-from .providers.mock_provider import MockProvider
-from .providers.gemini_provider import GeminiProvider
-from .providers.base import LLMResponse
+from app.providers.base import LLMResponse
+from app.providers.mock_provider import MockProvider
+from app.utils import shared_cache
+from app.utils.deadline import DeadlineExceeded, current_deadline, deadline_at, remaining
+from app.utils.profiling import profiled_call
+from app.utils.env_utils import ensure_dotenv
+from app.utils.tracing import traced, set_attrs
 
 
 def _env(name: str, default: str = "") -> str:
@@ -12,12 +19,14 @@ def _env(name: str, default: str = "") -> str:
 
 
 def get_provider():
+    ensure_dotenv()
     provider_name = _env("LLM_PROVIDER", "mock").lower()
 
     try:
         if provider_name == "mock":
             return MockProvider()
         if provider_name == "gemini":
+            from app.providers.gemini_provider import GeminiProvider
             return GeminiProvider()
         raise ValueError(f"Unknown LLM_PROVIDER='{provider_name}'. Use mock|gemini.")
     except Exception as e:
@@ -27,6 +36,7 @@ def get_provider():
         return MockProvider()
 
 
+@traced("llm.generate_text")
 def generate_text(
     *,
     prompt: str,
@@ -42,7 +52,19 @@ def generate_text(
     if not resolved_model:
         resolved_model = "gemini-1.5-flash" if provider.name == "gemini" else "mock-model"
 
-    return provider.generate(
+    set_attrs(provider=provider.name, model=resolved_model, prompt_chars=len(prompt))
+
+    # Aynı prompt'u başka bir worker zaten sorduysa paylaşılan cache'ten dön
+    cache_key = None
+    if provider.name != "mock":
+        cache_key = shared_cache.make_key(
+            provider.name, resolved_model, system, prompt, temperature, max_tokens, response_format
+        )
+        cached = shared_cache.get("llm", cache_key)
+        if cached is not None:
+            return LLMResponse(text=cached["text"], model=cached["model"], provider=cached["provider"])
+
+    resp = provider.generate(
         system=system,
         prompt=prompt,
         model=resolved_model,
@@ -50,3 +72,174 @@ def generate_text(
         max_tokens=max_tokens,
         response_format=response_format,
     )
+    if cache_key is not None and resp.text:
+        shared_cache.put(
+            "llm",
+            cache_key,
+            {"text": resp.text, "model": resp.model, "provider": resp.provider},
+            shared_cache.ttl_from_env("LLM_CACHE_TTL_S", 3600),
+        )
+    return resp
+
+
+# ----------------------------
+# Micro-batching (opt-in)
+# ----------------------------
+#
+# LLM_MICROBATCH=1 iken eşzamanlı rerank istekleri kısa bir pencerede
+# toplanır, etiketli bölümlerle tek prompt'ta birleştirilir ve tek LLM
+# çağrısıyla gönderilir; JSON cevap görev etiketine göre çağıranlara dağıtılır.
+# Cevapta görevi eksik/bozuk olan çağıran kendi tekil çağrısına düşer.
+#
+# Paylaşılan çağrı ayrı bir thread'de, batch'teki en uzun deadline ile
+# (biri deadline'sızsa deadline'sız) çalışır; kısa deadline'lı bir lider
+# diğerlerinin çağrısını düşürmez. Her çağıran kendi deadline'ında vazgeçer.
+#
+#   LLM_BATCH_MAX_SIZE=8        bir çağrıdaki en fazla görev
+#   LLM_BATCH_MAX_WAIT_MS=25    ilk görevin batch dolmasını en fazla bekleyeceği süre
+
+def microbatch_enabled() -> bool:
+    return _env("LLM_MICROBATCH").lower() in ("1", "true", "yes", "on")
+
+
+def _batch_max_size() -> int:
+    try:
+        return max(int(_env("LLM_BATCH_MAX_SIZE") or 8), 1)
+    except ValueError:
+        return 8
+
+
+def _batch_max_wait_s() -> float:
+    try:
+        return max(float(_env("LLM_BATCH_MAX_WAIT_MS") or 25), 0.0) / 1000.0
+    except ValueError:
+        return 0.025
+
+
+class _BatchItem:
+    __slots__ = ("prompt", "max_tokens", "deadline", "done", "text")
+
+    def __init__(self, prompt: str, max_tokens: int):
+        self.prompt = prompt
+        self.max_tokens = max_tokens
+        self.deadline = current_deadline()
+        self.done = threading.Event()
+        self.text: Optional[str] = None  # None => tekil çağrıya düş
+
+
+class _Batch:
+    __slots__ = ("items", "full")
+
+    def __init__(self):
+        self.items: List[_BatchItem] = []
+        self.full = threading.Event()
+
+
+# (system, model, temperature) => toplanmakta olan batch
+_batch_lock = threading.Lock()
+_open_batches: Dict[Tuple[Optional[str], Optional[str], float], _Batch] = {}
+
+
+def _batch_deadline(items: List[_BatchItem]) -> Optional[float]:
+    deadlines = [it.deadline for it in items]
+    return None if any(d is None for d in deadlines) else max(deadlines)  # type: ignore[type-var]
+
+
+def _run_batch(batch: _Batch, system: Optional[str], model: Optional[str], temperature: float) -> None:
+    from app.utils.prompt_utils import build_batch_prompt
+
+    items = batch.items
+    try:
+        tasks = [(f"t{i}", it.prompt) for i, it in enumerate(items)]
+        with deadline_at(_batch_deadline(items)):
+            resp = generate_text(
+                system=system,
+                prompt=build_batch_prompt(tasks),
+                model=model,
+                temperature=temperature,
+                max_tokens=sum(it.max_tokens for it in items),
+                response_format="json",
+            )
+        results = json.loads(resp.text).get("results", {})
+        for (tag, _), it in zip(tasks, items):
+            obj = results.get(tag) if isinstance(results, dict) else None
+            if isinstance(obj, dict):
+                it.text = json.dumps(obj, ensure_ascii=False)
+        set_attrs(batch_size=len(items), batch_parsed=sum(it.text is not None for it in items))
+    except Exception as e:
+        print(f"⚠️ [llm_client] micro-batch çağrısı başarısız ({len(items)} görev): {type(e).__name__}: {e}")
+    finally:
+        for it in items:
+            it.done.set()
+
+
+@traced("llm.generate_text_batched")
+def generate_text_batched(
+    *,
+    prompt: str,
+    system: Optional[str] = None,
+    model: Optional[str] = None,
+    temperature: float = 0.2,
+    max_tokens: int = 800,
+) -> LLMResponse:
+    """
+    JSON cevaplı rerank çağrıları için generate_text; LLM_MICROBATCH açıksa
+    aynı (system, model, temperature) ile gelen eşzamanlı çağrıları birleştirir.
+    """
+    if not microbatch_enabled():
+        return generate_text(
+            prompt=prompt, system=system, model=model,
+            temperature=temperature, max_tokens=max_tokens, response_format="json",
+        )
+
+    key = (system, model, temperature)
+    item = _BatchItem(prompt, max_tokens)
+    with _batch_lock:
+        batch = _open_batches.get(key)
+        leader = batch is None
+        if leader:
+            batch = _Batch()
+            _open_batches[key] = batch
+        batch.items.append(item)
+        if len(batch.items) >= _batch_max_size():
+            _open_batches.pop(key, None)
+            batch.full.set()
+
+    if leader:
+        # İlk gelen toplayıcıdır: pencere dolana / batch dolana kadar bekler, sonra gönderir
+        wait = _batch_max_wait_s()
+        rem = remaining()
+        if rem is not None:
+            wait = min(wait, max(rem, 0.0))
+        batch.full.wait(timeout=wait)
+        with _batch_lock:
+            if _open_batches.get(key) is batch:
+                del _open_batches[key]
+
+        if len(batch.items) == 1:
+            item.done.set()
+            set_attrs(batch_size=1)
+            return generate_text(
+                prompt=prompt, system=system, model=model,
+                temperature=temperature, max_tokens=max_tokens, response_format="json",
+            )
+        # Lider de diğerleri gibi kendi deadline'ıyla bekler; çağrı onu aşabilir
+        ctx = contextvars.copy_context()  # tracing / profil bağlamı
+        threading.Thread(
+            target=ctx.run,
+            args=(profiled_call, _run_batch, batch, system, model, temperature),
+            name="llm-batch",
+            daemon=True,
+        ).start()
+
+    if not item.done.wait(timeout=remaining()):
+        raise DeadlineExceeded("request deadline exceeded while waiting for LLM micro-batch")
+
+    if item.text is None:
+        # Bu görevin cevabı ayrıştırılamadı: tekil çağrıya düş
+        set_attrs(batch_fallback=True)
+        return generate_text(
+            prompt=prompt, system=system, model=model,
+            temperature=temperature, max_tokens=max_tokens, response_format="json",
+        )
+    return LLMResponse(text=item.text, model=model or _env("LLM_MODEL", ""), provider="batch")
@@ -0,0 +1,221 @@
+"""
+Otel / restoran kayıt tipleri (CSV ve Places için ortak şema).
+
+Eskiden agent'lar, provider'lar, servis ve UI arasında serbest dict'ler
+dolaşıyordu. Bu sınıflar:
+- __slots__ kullanır (kayıt başına __dict__ yok)
+- tekrar eden metinleri (şehir, mutfak, açıklama, gerekçe, profil ipucu) intern eder
+- `gerekce`'yi saklamaz; kısa taban gerekçe + paylaşılan profil ipucundan üretir
+- dict arayüzünü korur (o["isim"], o.get("_lat")), yani mevcut kod aynen çalışır
+- to_dict/from_dict (JSON) ve to_row/from_row (cache'ler için kompakt liste) sunar
+"""
+
+from __future__ import annotations
+
+import sys
+from collections.abc import Mapping
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+Id = Union[int, str]
+
+
+def _intern(s: Any) -> Any:
+    return sys.intern(s) if isinstance(s, str) else s
+
+
+def _num(v: Any, cast) -> Any:
+    # pandas NaN / None => None
+    if v is None or v != v:
+        return None
+    return cast(v)
+
+
+class _Record(Mapping):
+    __slots__ = ()
+
+    # dict anahtarı -> slot adı
+    _KEYS: Dict[str, str] = {}
+    # sadece Places kayıtlarında dict'te görünen anahtarlar
+    _PLACES_ONLY: Tuple[str, ...] = ()
+    _ROW: Tuple[str, ...] = ()
+
+    def _has_key(self, key: str) -> bool:
+        if key not in self._KEYS:
+            return False
+        return self.source == "places" or key not in self._PLACES_ONLY
+
+    def __getitem__(self, key: str) -> Any:
+        if not self._has_key(key):
+            raise KeyError(key)
+        return getattr(self, self._KEYS[key])
+
+    def __iter__(self) -> Iterator[str]:
+        return (k for k in self._KEYS if self._has_key(k))
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {k: getattr(self, self._KEYS[k]) for k in self}
+
+    def to_row(self) -> List[Any]:
+        return [getattr(self, name) for name in self._ROW]
+
+    @classmethod
+    def from_row(cls, row: List[Any]):
+        obj = cls.__new__(cls)
+        for name, v in zip(cls._ROW, row):
+            object.__setattr__(obj, name, _intern(v))
+        return obj
+
+    def __reduce__(self):
+        # pickle (ProcessPool, cache) için kompakt: (sınıf, satır)
+        return (type(self).from_row, (self.to_row(),))
+
+
+class Hotel(_Record):
+    __slots__ = (
+        "id", "isim", "sehir", "fiyat_gece", "puan", "konum_aciklama", "skor",
+        "base_reason", "profile_hint", "lat", "lng", "price_level", "user_ratings_total", "source",
+    )
+
+    _KEYS = {
+        "id": "id",
+        "isim": "isim",
+        "sehir": "sehir",
+        "fiyat_gece": "fiyat_gece",
+        "puan": "puan",
+        "konum_aciklama": "konum_aciklama",
+        "skor": "skor",
+        "gerekce": "gerekce",
+        "_lat": "lat",
+        "_lng": "lng",
+        "_price_level": "price_level",
+        "_user_ratings_total": "user_ratings_total",
+    }
+    _PLACES_ONLY = ("_lat", "_lng", "_price_level", "_user_ratings_total")
+    _ROW = __slots__
+
+    def __init__(
+        self,
+        id: Id,
+        isim: str,
+        sehir: str,
+        fiyat_gece: Optional[int],
+        puan: float,
+        konum_aciklama: str = "",
+        skor: Optional[float] = None,
+        base_reason: str = "",
+        profile_hint: str = "",
+        lat: Optional[float] = None,
+        lng: Optional[float] = None,
+        price_level: Optional[int] = None,
+        user_ratings_total: Optional[int] = None,
+        source: str = "csv",
+    ):
+        self.id = id
+        self.isim = isim
+        self.sehir = _intern(sehir)
+        self.fiyat_gece = fiyat_gece
+        self.puan = puan
+        self.konum_aciklama = _intern(konum_aciklama)
+        self.skor = skor
+        self.base_reason = _intern(base_reason)
+        self.profile_hint = _intern(profile_hint)
+        self.lat = lat
+        self.lng = lng
+        self.price_level = price_level
+        self.user_ratings_total = user_ratings_total
+        self.source = _intern(source)
+
+    @property
+    def gerekce(self) -> str:
+        if self.profile_hint:
+            return f"{self.base_reason} | {self.profile_hint}"
+        return self.base_reason
+
+    @classmethod
+    def from_dict(cls, d: Mapping) -> "Hotel":
+        if isinstance(d, Hotel):
+            return d
+        is_places = "_lat" in d or "_lng" in d
+        return cls(
+            id=d.get("id"),
+            isim=d.get("isim", ""),
+            sehir=d.get("sehir", ""),
+            fiyat_gece=_num(d.get("fiyat_gece"), int),
+            puan=_num(d.get("puan"), float) or 0.0,
+            konum_aciklama=d.get("konum_aciklama", "") or "",
+            skor=_num(d.get("skor"), float),
+            base_reason=d.get("gerekce", "") or "",
+            lat=_num(d.get("_lat"), float),
+            lng=_num(d.get("_lng"), float),
+            price_level=_num(d.get("_price_level"), int),
+            user_ratings_total=_num(d.get("_user_ratings_total"), int),
+            source="places" if is_places else "csv",
+        )
+
+
+class Restaurant(_Record):
+    __slots__ = (
+        "id", "isim", "mutfak_turu", "puan", "konum_aciklama",
+        "price_level", "user_ratings_total", "source",
+    )
+
+    _KEYS = {
+        "id": "id",
+        "isim": "isim",
+        "mutfak_turu": "mutfak_turu",
+        "puan": "puan",
+        "konum_aciklama": "konum_aciklama",
+        "_price_level": "price_level",
+        "_user_ratings_total": "user_ratings_total",
+    }
+    _PLACES_ONLY = ("_price_level", "_user_ratings_total")
+    _ROW = __slots__
+
+    def __init__(
+        self,
+        id: Id,
+        isim: str,
+        mutfak_turu: str,
+        puan: float,
+        konum_aciklama: str = "",
+        price_level: Optional[int] = None,
+        user_ratings_total: Optional[int] = None,
+        source: str = "csv",
+    ):
+        self.id = id
+        self.isim = isim
+        self.mutfak_turu = _intern(mutfak_turu)
+        self.puan = puan
+        self.konum_aciklama = _intern(konum_aciklama)
+        self.price_level = price_level
+        self.user_ratings_total = user_ratings_total
+        self.source = _intern(source)
+
+    @classmethod
+    def from_dict(cls, d: Mapping) -> "Restaurant":
+        if isinstance(d, Restaurant):
+            return d
+        is_places = "_price_level" in d or "_user_ratings_total" in d
+        return cls(
+            id=d.get("id"),
+            isim=d.get("isim", ""),
+            mutfak_turu=d.get("mutfak_turu", ""),
+            puan=_num(d.get("puan"), float) or 0.0,
+            konum_aciklama=d.get("konum_aciklama", "") or "",
+            price_level=_num(d.get("_price_level"), int),
+            user_ratings_total=_num(d.get("_user_ratings_total"), int),
+            source="places" if is_places else "csv",
+        )
+
+
+def json_default(o: Any) -> Any:
+    """json.dumps(default=...) için: kayıtları dict'e, bilinmeyenleri str'a çevirir."""
+    if isinstance(o, _Record):
+        return o.to_dict()
+    return str(o)
@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+from app.utils.deadline import DeadlineExceeded
+
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(RuntimeError):
+    """Devre açıkken upstream'e hiç gidilmeden fırlatılır (çağıran CSV'ye düşer)."""
+
+    def __init__(self, name: str, retry_in_s: float):
+        super().__init__(f"circuit '{name}' open (retry in {retry_in_s:.0f}s)")
+        self.name = name
+        self.retry_in_s = retry_in_s
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, "").strip() or default)
+    except ValueError:
+        return default
+
+
+class CircuitBreaker:
+    """
+    Upstream uç noktası başına devre kesici.
+
+    - closed: çağrılar geçer; art arda `failure_threshold` hata (veya
+      `slow_call_s`'den uzun süren çağrı) devreyi açar.
+    - open: çağrılar anında CircuitOpenError alır; `reset_timeout_s` sonra half_open.
+    - half_open: tek bir deneme çağrısı geçer; başarılıysa closed, değilse tekrar open.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: Optional[int] = None,
+        slow_call_s: Optional[float] = None,
+        reset_timeout_s: Optional[float] = None,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold or int(_env_float("CB_FAILURE_THRESHOLD", 3))
+        self.slow_call_s = slow_call_s or _env_float("CB_SLOW_CALL_S", 5.0)
+        self.reset_timeout_s = reset_timeout_s or _env_float("CB_RESET_TIMEOUT_S", 30.0)
+
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self.last_error: Optional[str] = None
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._maybe_half_open()
+            return self._state
+
+    def _maybe_half_open(self) -> None:
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.reset_timeout_s:
+            self._state = HALF_OPEN
+            self._probe_in_flight = False
+
+    def _trip(self, reason: str) -> None:
+        if self._state != OPEN:
+            print(f"⚠️ [circuit:{self.name}] devre açıldı: {reason}")
+        self._state = OPEN
+        self._opened_at = time.monotonic()
+        self._probe_in_flight = False
+        self.last_error = reason
+
+    def before_call(self) -> None:
+        with self._lock:
+            self._maybe_half_open()
+            if self._state == OPEN:
+                retry_in = self.reset_timeout_s - (time.monotonic() - self._opened_at)
+                raise CircuitOpenError(self.name, max(retry_in, 0.0))
+            if self._state == HALF_OPEN:
+                if self._probe_in_flight:
+                    raise CircuitOpenError(self.name, 0.0)
+                self._probe_in_flight = True
+
+    def on_success(self, elapsed_s: float) -> None:
+        with self._lock:
+            if elapsed_s > self.slow_call_s:
+                self._on_failure_locked(f"yavaş çağrı ({elapsed_s:.1f}s)")
+                return
+            if self._state == HALF_OPEN:
+                print(f"✅ [circuit:{self.name}] deneme başarılı, devre kapandı.")
+            self._state = CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def on_failure(self, reason: str) -> None:
+        with self._lock:
+            self._on_failure_locked(reason)
+
+    def _on_failure_locked(self, reason: str) -> None:
+        self.last_error = reason
+        if self._state == HALF_OPEN:
+            self._trip(f"deneme başarısız: {reason}")
+            return
+        self._failures += 1
+        if self._failures >= self.failure_threshold:
+            self._trip(reason)
+
+    @contextmanager
+    def guard(self) -> Iterator[None]:
+        """`with breaker.guard(): ...upstream çağrısı...`"""
+        self.before_call()
+        t0 = time.monotonic()
+        try:
+            yield
+        except DeadlineExceeded:
+            elapsed_s = time.monotonic() - t0
+            if elapsed_s > self.slow_call_s:
+                # Bütçe bitene kadar yanıt gelmedi: upstream asılı/yavaş, hata say
+                self.on_failure(f"yavaş çağrı, deadline'a kadar yanıt yok ({elapsed_s:.1f}s)")
+                raise
+            # Kısa kalan bütçenin bitmesi upstream'in suçu değil: sayma, denemeyi serbest bırak
+            with self._lock:
+                self._probe_in_flight = False
+            raise
+        except Exception as e:
+            self.on_failure(f"{type(e).__name__}: {e}")
+            raise
+        self.on_success(time.monotonic() - t0)
+
+
+_registry: Dict[str, CircuitBreaker] = {}
+_registry_lock = threading.Lock()
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    with _registry_lock:
+        br = _registry.get(name)
+        if br is None:
+            br = CircuitBreaker(name)
+            _registry[name] = br
+        return br
+
+
+def breaker_states() -> Dict[str, str]:
+    with _registry_lock:
+        items = list(_registry.items())
+    return {name: br.state for name, br in items}
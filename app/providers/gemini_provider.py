@@ -1,9 +1,11 @@
 from __future__ import annotations
 import os
-import requests
 from typing import Optional, Any, Dict
 
 from .base import LLMResponse, LLMUsage
+from app.utils.deadline import DeadlineExceeded, deadline_caused_timeout, timeout_for
+
+GEMINI_TIMEOUT_S = 60.0
 
 
 class GeminiProvider:
@@ -43,7 +45,15 @@ class GeminiProvider:
             },
         }
 
-        r = requests.post(url, json=body, timeout=60)
+        import requests  # ilk çağrıda yüklenir
+
+        timeout = timeout_for(GEMINI_TIMEOUT_S)
+        try:
+            r = requests.post(url, json=body, timeout=timeout)
+        except requests.Timeout as e:
+            if deadline_caused_timeout(timeout, GEMINI_TIMEOUT_S):
+                raise DeadlineExceeded("Gemini: request deadline reached") from e
+            raise
         if r.status_code >= 400:
             raise RuntimeError(f"Gemini error {r.status_code}: {r.text}")
 
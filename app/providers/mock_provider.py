@@ -1,9 +1,22 @@
 from __future__ import annotations
 import json
+import re
 from typing import Optional
 from .base import LLMResponse, LLMUsage
 
 
+# prompt_utils.build_batch_prompt bölümleri
+_BATCH_TASK = re.compile(r'<gorev id="([^"]+)">\n(.*?)\n</gorev>', re.DOTALL)
+
+
+def _mock_json(prompt: str) -> dict:
+    return {
+        "ok": True,
+        "note": "mock response",
+        "summary": prompt[:120],
+    }
+
+
 class MockProvider:
     name = "mock"
 
@@ -20,11 +33,12 @@ class MockProvider:
 
         # İstersen burada prompt içeriğine göre branch yapabilirsin.
         if response_format == "json":
-            payload = {
-                "ok": True,
-                "note": "mock response",
-                "summary": prompt[:120],
-            }
+            tasks = _BATCH_TASK.findall(prompt)
+            if tasks:
+                # micro-batch: her görev etiketine tekil çağrının vereceği cevap
+                payload = {"results": {tag: _mock_json(task) for tag, task in tasks}}
+            else:
+                payload = _mock_json(prompt)
             text = json.dumps(payload, ensure_ascii=False)
         else:
             text = f"[MOCK:{model}] {prompt[:200]}"
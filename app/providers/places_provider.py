@@ -1,31 +1,86 @@
-from dotenv import load_dotenv
-load_dotenv()  # .env dosyasını YÜKLER (en üstte olmalı)
-
 import os
-import requests
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, Sequence, Tuple
+
+from app.models.records import Hotel, Restaurant
+from app.providers.circuit_breaker import get_breaker
+from app.utils import shared_cache
+from app.utils.deadline import DeadlineExceeded, deadline_caused_timeout, timeout_for
+from app.utils.env_utils import ensure_dotenv
+from app.utils.tracing import traced, set_attrs
+
+# .env (PLACES_BASE_URL vb. için); requests ise ilk API çağrısında import edilir
+ensure_dotenv()
 
 
 # =========================
 # Config
 # =========================
 
-PLACES_KEY = os.getenv("PLACES_API_KEY", "").strip()
+# Yük testi / lokal stub sunucular için override edilebilir
+PLACES_BASE_URL = (
+    os.getenv("PLACES_BASE_URL", "").strip()
+    or "https://maps.googleapis.com/maps/api/place"
+).rstrip("/")
+
+PLACES_TEXTSEARCH_URL = f"{PLACES_BASE_URL}/textsearch/json"
+PLACES_NEARBY_URL = f"{PLACES_BASE_URL}/nearbysearch/json"
 
-PLACES_TEXTSEARCH_URL = "https://maps.googleapis.com/maps/api/place/textsearch/json"
-PLACES_NEARBY_URL = "https://maps.googleapis.com/maps/api/place/nearbysearch/json"
+PLACES_TIMEOUT_S = float(os.getenv("PLACES_TIMEOUT_S", "").strip() or 60)
 
 
 # =========================
 # Helpers
 # =========================
 
-def _require_key():
-    if not PLACES_KEY:
+def _require_key() -> str:
+    key = os.getenv("PLACES_API_KEY", "").strip()
+    if not key:
         raise RuntimeError(
             "PLACES_API_KEY is not set. "
             "Make sure .env exists and load_dotenv() is called."
         )
+    return key
+
+
+def _get_json(url: str, params: Dict[str, Any], endpoint: str, label: str) -> Dict[str, Any]:
+    """
+    Places GET çağrısı; uç nokta başına devre kesici ile korunur.
+    Devre açıksa istek atılmadan CircuitOpenError fırlar.
+    Başarılı yanıtlar (SHARED_CACHE_PATH açıksa) worker'lar arası paylaşılır.
+    """
+    cache_key = shared_cache.make_key(url, {k: v for k, v in params.items() if k != "key"})
+    cached = shared_cache.get("places", cache_key)
+    if cached is not None:
+        set_attrs(provider="places", cache_hit=True)
+        return cached
+
+    import requests
+
+    breaker = get_breaker(endpoint)
+    set_attrs(provider="places", circuit=breaker.state)
+
+    # Kalan istek bütçesi yetmiyorsa hiç çağırma (devre kesiciye de sayılmaz)
+    timeout = timeout_for(PLACES_TIMEOUT_S)
+
+    with breaker.guard():
+        try:
+            r = requests.get(url, params=params, timeout=timeout)
+        except requests.Timeout as e:
+            if deadline_caused_timeout(timeout, PLACES_TIMEOUT_S):
+                raise DeadlineExceeded(f"Places {label}: request deadline reached") from e
+            raise
+        r.raise_for_status()
+        data = r.json()
+
+        status = data.get("status")
+        set_attrs(http_status=r.status_code, places_status=status)
+        if status not in ("OK", "ZERO_RESULTS"):
+            raise RuntimeError(
+                f"Places {label} error: {status} "
+                f"{data.get('error_message')}"
+            )
+    shared_cache.put("places", cache_key, data, shared_cache.ttl_from_env("PLACES_CACHE_TTL_S", 86400))
+    return data
 
 
 def _safe_get(d: Dict[str, Any], path: List[str], default=None):
@@ -52,37 +107,50 @@ def _price_level_ok(
 # Public API
 # =========================
 
+@traced("places.search_hotels")
 def search_hotels(
     city: str,
     *,
     min_rating: float = 0.0,
     max_price_level: Optional[int] = None,
     limit: int = 5,
-) -> List[Dict[str, Any]]:
-    _require_key()
+) -> List[Hotel]:
+    data = _hotel_textsearch(city)
+    results = _hotels_from_results(data, city, min_rating, max_price_level, limit)
+    set_attrs(raw_results=len(data.get("results", [])), results=len(results))
+    return results
+
 
-    query = f"hotels in {city}"
+@traced("places.search_hotels_many")
+def search_hotels_many(
+    city: str,
+    filters: Sequence[Tuple[float, Optional[int], int]],
+) -> List[List[Hotel]]:
+    """
+    Aynı şehir için birden çok (min_rating, max_price_level, limit) filtresi;
+    tek TextSearch çağrısı yapılır, filtreler yanıt üzerinde uygulanır.
+    """
+    data = _hotel_textsearch(city)
+    set_attrs(raw_results=len(data.get("results", [])), filters=len(filters))
+    return [_hotels_from_results(data, city, r, p, n) for r, p, n in filters]
+
+
+def _hotel_textsearch(city: str) -> Dict[str, Any]:
     params = {
-        "query": query,
-        "key": PLACES_KEY,
+        "query": f"hotels in {city}",
+        "key": _require_key(),
     }
+    return _get_json(PLACES_TEXTSEARCH_URL, params, "places.textsearch", "TextSearch")
 
-    r = requests.get(
-        PLACES_TEXTSEARCH_URL,
-        params=params,
-        timeout=60,
-    )
-    r.raise_for_status()
-    data = r.json()
 
-    status = data.get("status")
-    if status not in ("OK", "ZERO_RESULTS"):
-        raise RuntimeError(
-            f"Places TextSearch error: {status} "
-            f"{data.get('error_message')}"
-        )
-
-    results: List[Dict[str, Any]] = []
+def _hotels_from_results(
+    data: Dict[str, Any],
+    city: str,
+    min_rating: float,
+    max_price_level: Optional[int],
+    limit: int,
+) -> List[Hotel]:
+    results: List[Hotel] = []
 
     for item in data.get("results", []):
         rating = float(item.get("rating", 0.0) or 0.0)
@@ -98,24 +166,25 @@ def search_hotels(
         if lat is None or lng is None:
             continue
 
-        results.append({
-            "id": item.get("place_id"),
-            "isim": item.get("name", ""),
-            "sehir": city,
-            "fiyat_gece": None,
-            "puan": rating,
-            "konum_aciklama": (
+        results.append(Hotel(
+            id=item.get("place_id"),
+            isim=item.get("name", ""),
+            sehir=city,
+            fiyat_gece=None,
+            puan=rating,
+            konum_aciklama=(
                 item.get("formatted_address")
                 or item.get("vicinity")
                 or ""
             ),
-            "skor": round(rating * 20, 1),
-            "gerekce": "Google Places verisine göre yüksek puan / popülerlik.",
-            "_lat": lat,
-            "_lng": lng,
-            "_price_level": price_level,
-            "_user_ratings_total": item.get("user_ratings_total"),
-        })
+            skor=round(rating * 20, 1),
+            base_reason="Google Places verisine göre yüksek puan / popülerlik.",
+            lat=lat,
+            lng=lng,
+            price_level=price_level,
+            user_ratings_total=item.get("user_ratings_total"),
+            source="places",
+        ))
 
         if len(results) >= limit:
             break
@@ -123,6 +192,7 @@ def search_hotels(
     return results
 
 
+@traced("places.search_restaurants_near_hotel")
 def search_restaurants_near_hotel(
     *,
     hotel_lat: float,
@@ -130,49 +200,38 @@ def search_restaurants_near_hotel(
     cuisine: Optional[str] = None,
     radius_m: int = 1500,
     limit: int = 3,
-) -> List[Dict[str, Any]]:
-    _require_key()
+) -> List[Restaurant]:
+    key = _require_key()
 
     params = {
         "location": f"{hotel_lat},{hotel_lng}",
         "radius": radius_m,
         "type": "restaurant",
-        "key": PLACES_KEY,
+        "key": key,
     }
     if cuisine:
         params["keyword"] = cuisine
 
-    r = requests.get(
-        PLACES_NEARBY_URL,
-        params=params,
-        timeout=60,
-    )
-    r.raise_for_status()
-    data = r.json()
-
-    status = data.get("status")
-    if status not in ("OK", "ZERO_RESULTS"):
-        raise RuntimeError(
-            f"Places Nearby error: {status} "
-            f"{data.get('error_message')}"
-        )
+    data = _get_json(PLACES_NEARBY_URL, params, "places.nearbysearch", "Nearby")
 
-    out: List[Dict[str, Any]] = []
+    out: List[Restaurant] = []
 
     for item in data.get("results", []):
         rating = float(item.get("rating", 0.0) or 0.0)
 
-        out.append({
-            "id": item.get("place_id"),
-            "isim": item.get("name", ""),
-            "mutfak_turu": cuisine or "restaurant",
-            "puan": rating,
-            "konum_aciklama": item.get("vicinity") or "",
-            "_price_level": item.get("price_level"),
-            "_user_ratings_total": item.get("user_ratings_total"),
-        })
+        out.append(Restaurant(
+            id=item.get("place_id"),
+            isim=item.get("name", ""),
+            mutfak_turu=cuisine or "restaurant",
+            puan=rating,
+            konum_aciklama=item.get("vicinity") or "",
+            price_level=item.get("price_level"),
+            user_ratings_total=item.get("user_ratings_total"),
+            source="places",
+        ))
 
         if len(out) >= limit:
             break
 
+    set_attrs(raw_results=len(data.get("results", [])), results=len(out))
     return out
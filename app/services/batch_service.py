@@ -0,0 +1,248 @@
+"""
+Etkileşimsiz toplu öneri (kampanyalar için ön hesaplama).
+
+Girdi JSONL (her satır bir istek):
+    {"user": "fatma", "sehir": "Antalya", "max_fiyat": 2000, "min_puan": 4.0, "mutfak_turu": null}
+
+Çıktı JSONL (tamamlanma sırasıyla, her satır bir sonuç):
+    {"line": 1, "ok": true, "request": {...}, "hotels": [...], "restaurants": {...}, "metrics": {...}}
+    {"line": 2, "ok": false, "request": {...}, "error": "ValueError: ..."}
+
+- Süreç havuzunda çalışır; aynı anda en fazla `workers * 2` istek uçuştadır
+  (girdi dosyası satır satır okunur, bellek sabit kalır).
+- Her kayıt kendi hatasını taşır; bir kaydın patlaması batch'i durdurmaz.
+- `<output>.ckpt` dosyasına tamamlanan satırların filigranı yazılır; aynı komut
+  tekrar çalıştırılınca bitenler atlanır ve çıktıya eklenerek devam edilir.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from typing import Any, Dict, Iterator, Optional, Set, Tuple
+
+from app.models.records import json_default
+
+
+# ----------------------------
+# Tek kayıt (worker sürecinde çalışır)
+# ----------------------------
+
+def _parse_request(raw: Dict[str, Any]) -> Dict[str, Any]:
+    sehir = str(raw.get("sehir") or "").strip()
+    if not sehir:
+        raise ValueError("'sehir' zorunlu")
+    mutfak = raw.get("mutfak_turu")
+    return {
+        "user": str(raw.get("user") or "anon").strip() or "anon",
+        "sehir": sehir,
+        "max_fiyat": int(raw["max_fiyat"]),
+        "min_puan": float(str(raw.get("min_puan", 0.0)).replace(",", ".")),
+        "mutfak_turu": (str(mutfak).strip() or None) if mutfak else None,
+        "top_k": int(raw.get("top_k", 5)),
+        "top_k_rest": int(raw.get("top_k_rest", 3)),
+    }
+
+
+def run_one(line_no: int, raw_line: str) -> Dict[str, Any]:
+    """Tek isteği işler; her hatayı kayda yazar (asla raise etmez)."""
+    from app.agents.reflective_agent import build_profile_hint
+    from app.services.recommendation_service import compute_metrics, get_recommendations
+    from app.utils.db_utils import get_or_create_user
+
+    t0 = time.perf_counter()
+    raw: Any = None
+    try:
+        raw = json.loads(raw_line)
+        if not isinstance(raw, dict):
+            raise ValueError("satır JSON nesnesi olmalı")
+        req = _parse_request(raw)
+
+        user_id = get_or_create_user(req["user"])
+        profile_hint = build_profile_hint(user_id)
+
+        rec = get_recommendations(
+            sehir=req["sehir"],
+            max_fiyat=req["max_fiyat"],
+            min_puan=req["min_puan"],
+            mutfak_turu=req["mutfak_turu"],
+            profile_hint=profile_hint,
+            top_k=req["top_k"],
+            top_k_rest=req["top_k_rest"],
+        )
+
+        return {
+            "line": line_no,
+            "ok": True,
+            "request": req,
+            "used_places": rec["used_places"],
+            "complete": rec["complete"],
+            "hotels": rec["hotels"],
+            "restaurants": rec["restaurants"],
+            "metrics": compute_metrics(rec["hotels"]),
+            "elapsed_ms": round((time.perf_counter() - t0) * 1000.0, 2),
+        }
+    except Exception as e:
+        return {
+            "line": line_no,
+            "ok": False,
+            "request": raw if isinstance(raw, dict) else raw_line.strip()[:500],
+            "error": f"{type(e).__name__}: {e}",
+            "elapsed_ms": round((time.perf_counter() - t0) * 1000.0, 2),
+        }
+
+
+# ----------------------------
+# Checkpoint
+# ----------------------------
+
+class Checkpoint:
+    """
+    done_upto: bu satıra kadar (dahil) her şey çıktıda.
+    extra: filigranın üstünde tamamlanmış satırlar (pencere boyutuyla sınırlı).
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.done_upto = 0
+        self.extra: Set[int] = set()
+
+    def load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, encoding="utf-8") as f:
+            data = json.load(f)
+        self.done_upto = int(data.get("done_upto", 0))
+        self.extra = {int(x) for x in data.get("extra", [])}
+
+    def is_done(self, line_no: int) -> bool:
+        return line_no <= self.done_upto or line_no in self.extra
+
+    def mark(self, line_no: int) -> None:
+        if line_no <= self.done_upto:
+            return
+        self.extra.add(line_no)
+        while self.done_upto + 1 in self.extra:
+            self.done_upto += 1
+            self.extra.discard(self.done_upto)
+
+    def save(self) -> None:
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"done_upto": self.done_upto, "extra": sorted(self.extra)}, f)
+        os.replace(tmp, self.path)
+
+
+def _recover_output(output_path: str, ckpt: Checkpoint) -> None:
+    """
+    Checkpoint kaydedilmeden önce çıktıya yazılmış satırları da bitmiş say;
+    yarım kalmış son satırı (çökme anında) kırp.
+    """
+    if not os.path.exists(output_path):
+        return
+    good_size = 0
+    with open(output_path, "rb") as f:
+        for raw in f:
+            if not raw.endswith(b"\n"):
+                break
+            try:
+                rec = json.loads(raw)
+                ckpt.mark(int(rec["line"]))
+            except Exception:
+                break
+            good_size += len(raw)
+    if good_size != os.path.getsize(output_path):
+        with open(output_path, "r+b") as f:
+            f.truncate(good_size)
+
+
+def _iter_input(input_path: str) -> Iterator[Tuple[int, str]]:
+    # Boş satırlar da verilir: çağıran onları bitmiş işaretler (filigran boşlukta takılmasın)
+    with open(input_path, encoding="utf-8") as f:
+        for line_no, line in enumerate(f, start=1):
+            yield line_no, line
+
+
+# ----------------------------
+# Sürücü
+# ----------------------------
+
+def run_batch(
+    input_path: str,
+    output_path: str,
+    workers: int = 0,
+    resume: bool = True,
+    checkpoint_every: int = 50,
+) -> Dict[str, Any]:
+    workers = workers or (os.cpu_count() or 1)
+    max_in_flight = workers * 2
+
+    ckpt = Checkpoint(f"{output_path}.ckpt")
+    if resume:
+        ckpt.load()
+        _recover_output(output_path, ckpt)
+    else:
+        for p in (output_path, ckpt.path):
+            if os.path.exists(p):
+                os.remove(p)
+
+    stats = {"ok": 0, "failed": 0, "skipped": 0}
+    t0 = time.perf_counter()
+    since_save = 0
+
+    with open(output_path, "a", encoding="utf-8") as out, ProcessPoolExecutor(max_workers=workers) as pool:
+        in_flight: Dict[Future, int] = {}
+
+        def _drain(block: bool) -> None:
+            nonlocal since_save
+            if not in_flight:
+                return
+            done, _ = wait(list(in_flight), timeout=None if block else 0, return_when=FIRST_COMPLETED)
+            for fut in done:
+                line_no = in_flight.pop(fut)
+                try:
+                    rec = fut.result()
+                except Exception as e:  # worker süreci çöktü vb.
+                    rec = {"line": line_no, "ok": False, "error": f"{type(e).__name__}: {e}"}
+
+                out.write(json.dumps(rec, ensure_ascii=False, default=json_default) + "\n")
+                stats["ok" if rec.get("ok") else "failed"] += 1
+                ckpt.mark(line_no)
+                since_save += 1
+
+            if since_save >= checkpoint_every:
+                out.flush()
+                ckpt.save()
+                since_save = 0
+
+        for line_no, line in _iter_input(input_path):
+            if ckpt.is_done(line_no):
+                stats["skipped"] += 1
+                continue
+            if not line.strip():
+                ckpt.mark(line_no)  # çıktı yok, ama done_upto ilerleyebilmeli
+                continue
+            while len(in_flight) >= max_in_flight:
+                _drain(block=True)
+            in_flight[pool.submit(run_one, line_no, line)] = line_no
+
+        while in_flight:
+            _drain(block=True)
+
+        out.flush()
+        ckpt.save()
+
+    stats["elapsed_s"] = round(time.perf_counter() - t0, 3)
+    return stats
+
+
+def main_batch(input_path: str, output_path: Optional[str], workers: int = 0, resume: bool = True) -> None:
+    from app.utils.db_utils import init_db
+
+    init_db()
+    output_path = output_path or f"{os.path.splitext(input_path)[0]}.out.jsonl"
+    print(f"📦 Batch: {input_path} -> {output_path} (workers={workers or os.cpu_count()})")
+    stats = run_batch(input_path, output_path, workers=workers, resume=resume)
+    print(f"✅ Bitti: başarılı={stats['ok']}, hatalı={stats['failed']}, atlanan={stats['skipped']}, süre={stats['elapsed_s']} sn")
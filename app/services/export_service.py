@@ -0,0 +1,210 @@
+"""
+users / sessions / feedback tablolarının akışlı (streaming) dışa aktarımı.
+
+Tablolar `id` üzerinde keyset sayfalama ile okunur (WHERE id > ? ORDER BY id
+LIMIT ?); her sayfa ayrı bir dosyaya yazılır, yani bellek kullanımı tablo
+boyutundan bağımsızdır. Her sayfa kendi kısa okuma işleminde çalışır;
+yazan taraf (insert_feedback) uzun süre kilitlenmez.
+
+Artımlı: her tablo için son yazılan id `export_state.json`'da tutulur; bir
+sonraki çalıştırma sadece daha yeni satırları yazar. Durum her parça
+yazıldıktan sonra güncellenir, yarıda kesilen iş kaldığı yerden devam eder.
+(Satırlar ekleme-yalnız varsayılır; sonradan güncellenen satırlar yeniden
+yazılmaz — tam dökümü --full ile alın.)
+
+Çıktı:
+    <out>/<tablo>/<tablo>_<ilk_id>-<son_id>.csv | .parquet
+
+Çalıştırma:
+    python -m app.services.export_service --out exports/
+    python -m app.services.export_service --out exports/ --format parquet --chunk-rows 100000
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import os
+import sqlite3
+import time
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from app.utils.db_utils import DB_PATH
+
+TABLES = ("users", "sessions", "feedback")
+STATE_FILE = "export_state.json"
+DEFAULT_CHUNK_ROWS = 50_000
+
+
+def _connect_ro(db_path: str) -> sqlite3.Connection:
+    # Salt okunur: dışa aktarım asla yazma kilidi almaz
+    return sqlite3.connect(f"file:{db_path}?mode=ro", uri=True, timeout=5.0)
+
+
+def iter_pages(
+    conn: sqlite3.Connection,
+    table: str,
+    after_id: int = 0,
+    page_rows: int = DEFAULT_CHUNK_ROWS,
+) -> Iterator[Tuple[List[str], List[Tuple[Any, ...]]]]:
+    """(kolonlar, satırlar) sayfaları; id sırasıyla, after_id'den sonrası."""
+    if table not in TABLES:
+        raise ValueError(f"bilinmeyen tablo: {table}")
+    last_id = int(after_id)
+    while True:
+        cur = conn.execute(
+            f"SELECT * FROM {table} WHERE id > ? ORDER BY id LIMIT ?",
+            (last_id, int(page_rows)),
+        )
+        columns = [d[0] for d in cur.description]
+        rows = cur.fetchall()
+        if not rows:
+            return
+        yield columns, rows
+        last_id = int(rows[-1][columns.index("id")])
+
+
+def column_types(conn: sqlite3.Connection, table: str) -> Dict[str, str]:
+    """Kolon -> SQL'de bildirilen tip (PRAGMA table_info; büyük harf)."""
+    if table not in TABLES:
+        raise ValueError(f"bilinmeyen tablo: {table}")
+    return {row[1]: str(row[2] or "").upper() for row in conn.execute(f"PRAGMA table_info({table})")}
+
+
+def _arrow_type(decl: str):
+    import pyarrow as pa
+
+    # SQLite tip yakınlığı (affinity) kuralları, aynı sırayla
+    if "INT" in decl:
+        return pa.int64()
+    if any(t in decl for t in ("CHAR", "CLOB", "TEXT")):
+        return pa.string()
+    if decl == "" or "BLOB" in decl:
+        return pa.binary()
+    if any(t in decl for t in ("REAL", "FLOA", "DOUB")):
+        return pa.float64()
+    if any(t in decl for t in ("DATE", "TIME")):
+        # SQLite zamanı metin saklar ("YYYY-MM-DD HH:MM:SS"); CSV ile aynı, kayıpsız
+        return pa.string()
+    return pa.float64()  # NUMERIC
+
+
+def _parquet_schema(types: Dict[str, str]):
+    import pyarrow as pa
+
+    return pa.schema([pa.field(name, _arrow_type(decl)) for name, decl in types.items()])
+
+
+def _write_csv(path: str, columns: Sequence[str], rows: Sequence[Tuple[Any, ...]], schema: Any = None) -> None:
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(columns)
+        w.writerows(rows)
+
+
+def _write_parquet(path: str, columns: Sequence[str], rows: Sequence[Tuple[Any, ...]], schema: Any = None) -> None:
+    """
+    schema: tablo başına bir kez SQL tiplerinden kurulur (_parquet_schema); her
+    parça aynı şemayla yazılır. Parça bazında çıkarım, tamamen NULL bir kolonu
+    `null` tipiyle yazıp sonraki parçalarla uyumsuz dosyalar üretiyordu.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    table = pa.Table.from_arrays(
+        [pa.array([r[i] for r in rows], type=schema.field(name).type) for i, name in enumerate(columns)],
+        schema=schema,
+    )
+    pq.write_table(table, path, compression="zstd")
+
+
+_WRITERS = {"csv": _write_csv, "parquet": _write_parquet}
+
+
+def _load_state(out_dir: str) -> Dict[str, int]:
+    try:
+        with open(os.path.join(out_dir, STATE_FILE), "r", encoding="utf-8") as f:
+            return {k: int(v) for k, v in json.load(f).get("last_id", {}).items()}
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_state(out_dir: str, state: Dict[str, int]) -> None:
+    path = os.path.join(out_dir, STATE_FILE)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"last_id": state, "updated_at": time.strftime("%Y-%m-%dT%H:%M:%S")}, f, indent=2)
+    os.replace(tmp, path)
+
+
+def export_tables(
+    out_dir: str,
+    fmt: str = "csv",
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+    tables: Sequence[str] = TABLES,
+    full: bool = False,
+    db_path: Optional[str] = None,
+) -> Dict[str, Dict[str, int]]:
+    """Tabloları parça parça yazar; tablo başına {rows, files, last_id} döner."""
+    if fmt not in _WRITERS:
+        raise ValueError(f"format csv|parquet olmalı: {fmt}")
+    write = _WRITERS[fmt]
+    if fmt == "parquet":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError as e:
+            raise RuntimeError("Parquet çıktısı için pyarrow gerekli (pip install pyarrow) ya da --format csv kullanın.") from e
+    os.makedirs(out_dir, exist_ok=True)
+
+    state = {} if full else _load_state(out_dir)
+    summary: Dict[str, Dict[str, int]] = {}
+
+    conn = _connect_ro(str(db_path or DB_PATH))
+    try:
+        for table in tables:
+            table_dir = os.path.join(out_dir, table)
+            os.makedirs(table_dir, exist_ok=True)
+            stats = {"rows": 0, "files": 0, "last_id": state.get(table, 0)}
+            schema = _parquet_schema(column_types(conn, table)) if fmt == "parquet" else None
+
+            for columns, rows in iter_pages(conn, table, stats["last_id"], chunk_rows):
+                id_idx = columns.index("id")
+                first, last = int(rows[0][id_idx]), int(rows[-1][id_idx])
+                path = os.path.join(table_dir, f"{table}_{first:010d}-{last:010d}.{fmt}")
+                tmp = f"{path}.tmp"
+                write(tmp, columns, rows, schema)
+                os.replace(tmp, path)
+
+                stats["rows"] += len(rows)
+                stats["files"] += 1
+                stats["last_id"] = last
+                state[table] = last
+                _save_state(out_dir, state)
+
+            summary[table] = stats
+    finally:
+        conn.close()
+    return summary
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="users/sessions/feedback dışa aktarımı")
+    parser.add_argument("--out", required=True, help="çıktı dizini")
+    parser.add_argument("--format", choices=sorted(_WRITERS), default="csv")
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS, help="dosya başına satır")
+    parser.add_argument("--tables", default=",".join(TABLES), help="virgülle ayrılmış tablo listesi")
+    parser.add_argument("--full", action="store_true", help="artımlı durumu yok say, baştan yaz")
+    args = parser.parse_args(argv)
+
+    t0 = time.perf_counter()
+    tables = [t.strip() for t in args.tables.split(",") if t.strip()]
+    summary = export_tables(args.out, args.format, args.chunk_rows, tables, full=args.full)
+    for table, s in summary.items():
+        print(f"✅ {table}: {s['rows']} yeni satır, {s['files']} dosya (son id={s['last_id']})")
+    print(f"   süre={time.perf_counter() - t0:.2f} sn -> {os.path.abspath(args.out)}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
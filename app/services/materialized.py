@@ -0,0 +1,297 @@
+"""
+Sık kullanılan filtre kovaları için önceden hesaplanmış top-k tabloları.
+
+Offline materializer, katalogdaki her şehir için Streamlit slider adımlarına
+denk gelen (max_fiyat, min_puan) kovalarında `select_top_hotels` çıktısını ve
+her otel için restoran listesini (mutfak filtresi yok) hesaplayıp tek bir
+sıkıştırılmış dosyaya yazar. Servis yolu bu kovalara tam denk gelen sorguları
+tek anahtar + ızgara indeksiyle yanıtlar.
+
+Dosya, üretildiği andaki CSV'lerin imzasını (boyut, mtime, sha1) taşır;
+CSV'ler değişince tablo kendiliğinden geçersiz sayılır ve canlı yola düşülür.
+
+Yeniden üretmek için:
+    python -m app.services.materialized
+"""
+
+from __future__ import annotations
+
+import gzip
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.agents import food_agent, hotel_agent
+from app.models.records import Hotel, Restaurant
+from app.utils.binary_catalog import file_signature as _file_sig, signature_matches
+from app.utils.text_utils import normalize_text
+
+MATERIALIZED_PATH = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "..", "data", "topk_materialized.json.gz")
+)
+
+FORMAT_VERSION = 2  # 2: restoranlar Restaurant.to_row() satırı olarak
+
+# Streamlit slider adımları (app/ui/streamlit_app.py ile aynı)
+FIYAT_MIN, FIYAT_MAX, FIYAT_STEP = 500, 20_000, 250
+PUAN_MIN, PUAN_MAX, PUAN_STEP = 1.0, 5.0, 0.1
+
+# UI en fazla 7 otel / 5 restoran istiyor; daha küçük top_k bunun ön ekidir
+MAX_HOTELS_K = 7
+MAX_RESTAURANTS_K = 5
+
+
+def _fiyat_buckets() -> List[int]:
+    return list(range(FIYAT_MIN, FIYAT_MAX + 1, FIYAT_STEP))
+
+
+def _puan_buckets() -> List[float]:
+    n = int(round((PUAN_MAX - PUAN_MIN) / PUAN_STEP)) + 1
+    return [round(PUAN_MIN + i * PUAN_STEP, 1) for i in range(n)]
+
+
+# ----------------------------
+# CSV imzası
+# ----------------------------
+
+def _source_paths() -> Dict[str, str]:
+    return {"otel": hotel_agent.DATA_PATH, "restoran": food_agent.DATA_PATH}
+
+
+def _sources_match(stored: Dict[str, Dict[str, Any]]) -> bool:
+    return all(signature_matches(path, stored.get(key) or {}) for key, path in _source_paths().items())
+
+
+# ----------------------------
+# Üretim (offline)
+# ----------------------------
+
+def build_materialized(path: str = MATERIALIZED_PATH) -> Dict[str, Any]:
+    """Tüm şehir × kova kombinasyonlarını hesaplar ve dosyaya yazar."""
+    os.environ["LLM_PROVIDER"] = "mock"  # materyalize edilen sıralama her zaman heuristik
+    os.environ["LEARNED_RANKER"] = "off"
+
+    sources = {k: _file_sig(p) for k, p in _source_paths().items()}
+
+    hotels_df = hotel_agent.load_hotels()
+    hotels_df["_sehir_norm"] = hotels_df["sehir"].apply(normalize_text)
+
+    hotels: Dict[str, List[Any]] = {}
+    for _, row in hotels_df.iterrows():
+        hotels[str(int(row["id"]))] = [
+            row["isim"],
+            row["sehir"],
+            int(row["fiyat_gece"]),
+            float(row["puan"]),
+            row.get("konum_aciklama", ""),
+        ]
+
+    lists: List[List[List[Any]]] = []
+    list_ids: Dict[Tuple[int, ...], int] = {}
+    cities: Dict[str, List[List[int]]] = {}
+
+    fiyatlar = _fiyat_buckets()
+    puanlar = _puan_buckets()
+
+    for city_norm, city_df in hotels_df.groupby("_sehir_norm"):
+        city_df = city_df.drop(columns=["_sehir_norm"])
+        by_candidates: Dict[Tuple[int, ...], int] = {}
+        grid: List[List[int]] = []
+
+        for fiyat in fiyatlar:
+            row_idx: List[int] = []
+            for puan in puanlar:
+                sub = city_df[(city_df["fiyat_gece"] <= fiyat) & (city_df["puan"] >= puan)]
+                cand_key = tuple(sorted(int(x) for x in sub["id"]))
+
+                li = by_candidates.get(cand_key)
+                if li is None:
+                    top = hotel_agent.select_top_hotels(sub, top_k=MAX_HOTELS_K) if len(sub) else []
+                    entries = [[int(h["id"]), h["skor"]] for h in top]
+                    ekey = tuple(x for e in entries for x in (e[0], int(e[1] * 10)))
+                    li = list_ids.get(ekey)
+                    if li is None:
+                        li = len(lists)
+                        lists.append(entries)
+                        list_ids[ekey] = li
+                    by_candidates[cand_key] = li
+                row_idx.append(li)
+            grid.append(row_idx)
+        cities[city_norm] = grid
+
+    rest_lists: Dict[str, List[List[Any]]] = {}
+    for hid in hotels:
+        recs = food_agent.select_top_restaurants_for_hotel(int(hid), mutfak_turu=None, top_k=MAX_RESTAURANTS_K)
+        if recs:
+            rest_lists[hid] = [Restaurant.from_dict(r).to_row() for r in recs]
+
+    data = {
+        "version": FORMAT_VERSION,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "sources": sources,
+        "grid": {
+            "fiyat_min": FIYAT_MIN, "fiyat_step": FIYAT_STEP, "fiyat_n": len(fiyatlar),
+            "puan_min": PUAN_MIN, "puan_step": PUAN_STEP, "puan_n": len(puanlar),
+        },
+        "hotels": hotels,
+        "lists": lists,
+        "cities": cities,
+        "restaurants": rest_lists,
+    }
+
+    tmp = f"{path}.tmp"
+    with gzip.open(tmp, "wt", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp, path)
+    return data
+
+
+# ----------------------------
+# Servis yolu
+# ----------------------------
+
+_lock = threading.Lock()
+_state: Dict[str, Any] = {"stat": None, "data": None, "loading": False}
+
+
+def _stat_key(path: str) -> Optional[Tuple[int, int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+
+def _state_key(path: str) -> Tuple[Any, ...]:
+    return (_stat_key(path),) + tuple(_stat_key(p) for p in _source_paths().values())
+
+
+def _read(path: str) -> Optional[Dict[str, Any]]:
+    """Dosyayı okur; sürüm ve kaynak CSV imzaları tutuyorsa tabloyu, yoksa None döner."""
+    try:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            loaded = json.load(f)
+    except Exception as e:
+        print(f"⚠️ [materialized] Tablo okunamadı: {e}")
+        return None
+    if loaded.get("version") == FORMAT_VERSION and _sources_match(loaded.get("sources", {})):
+        return loaded
+    print("⚠️ [materialized] CSV'ler değişmiş, top-k tablosu geçersiz (canlı hesaplamaya düşülüyor).")
+    return None
+
+
+def _load(path: str = MATERIALIZED_PATH) -> Optional[Dict[str, Any]]:
+    """Tabloyu (gerekirse) yükler; CSV'ler değiştiyse None döner."""
+    key = _state_key(path)
+    if key[0] is None:
+        return None
+
+    with _lock:
+        if _state["stat"] == key:
+            return _state["data"]
+        if _state["loading"]:
+            # Yeni tablo başka bir thread'de yükleniyor. Eski snapshot sadece CSV'ler
+            # aynıysa (yalnız tablo dosyası yenilendiyse) kullanılır; CSV'ler
+            # değiştiyse eski top-k'lar yanlış olur => canlı yol
+            old = _state["stat"]
+            return _state["data"] if old is not None and old[1:] == key[1:] else None
+        _state["loading"] = True
+
+    # Yükleme kilit dışında; hazır olunca tek atamayla yerine konur
+    data: Optional[Dict[str, Any]] = None
+    try:
+        data = _read(path)
+    finally:
+        with _lock:
+            _state["stat"] = key
+            _state["data"] = data
+            _state["loading"] = False
+    return data
+
+
+def reload(path: str = MATERIALIZED_PATH) -> Optional[Dict[str, Any]]:
+    """
+    Dosyayı önbelleğe bakmadan okuyup doğrular ve yerine koyar (catalog_watcher).
+    Tablo güncel CSV'lerle üretilmemişse None: çağıran yeniden üretmeli.
+    """
+    key = _state_key(path)
+    data = _read(path) if key[0] is not None else None
+    with _lock:
+        _state["stat"] = key
+        _state["data"] = data
+    return data
+
+
+def _grid_pos(grid: Dict[str, Any], max_fiyat: int, min_puan: float) -> Optional[Tuple[int, int]]:
+    fi, rem = divmod(int(max_fiyat) - grid["fiyat_min"], grid["fiyat_step"])
+    if rem != 0 or not (0 <= fi < grid["fiyat_n"]):
+        return None
+    pj = round((float(min_puan) - grid["puan_min"]) / grid["puan_step"])
+    if abs(grid["puan_min"] + pj * grid["puan_step"] - float(min_puan)) > 1e-6 or not (0 <= pj < grid["puan_n"]):
+        return None
+    return fi, pj
+
+
+def lookup_hotels(
+    sehir: str,
+    max_fiyat: int,
+    min_puan: float,
+    top_k: int = 5,
+    profile_hint: str = "",
+) -> Optional[List[Hotel]]:
+    """
+    Materyalize tablodan otel listesi döner; sorgu bir kovaya denk gelmiyorsa
+    veya tablo yok/geçersizse None (çağıran canlı yola düşer).
+    """
+    if top_k > MAX_HOTELS_K:
+        return None
+    data = _load()
+    if data is None:
+        return None
+    pos = _grid_pos(data["grid"], max_fiyat, min_puan)
+    if pos is None:
+        return None
+
+    grid = data["cities"].get(normalize_text(sehir))
+    if grid is None:
+        return []  # katalogda bu şehir yok => canlı yol da boş döner
+
+    entries = data["lists"][grid[pos[0]][pos[1]]]
+    out: List[Hotel] = []
+    for hid, skor in entries[:top_k]:
+        isim, sehir_adi, fiyat, puan, aciklama = data["hotels"][str(hid)]
+        out.append(Hotel(
+            id=hid,
+            isim=isim,
+            sehir=sehir_adi,
+            fiyat_gece=fiyat,
+            puan=puan,
+            konum_aciklama=aciklama,
+            skor=skor,
+            base_reason=f"Yüksek puan ({puan}) ve bütçeye uygun fiyat ({fiyat} TL).",
+            profile_hint=profile_hint,
+        ))
+    return out
+
+
+def lookup_restaurants(hotel_id: int, top_k: int = 3) -> Optional[List[Restaurant]]:
+    """Mutfak filtresiz restoran listesi; tablo yok/geçersizse None."""
+    if top_k > MAX_RESTAURANTS_K:
+        return None
+    data = _load()
+    if data is None:
+        return None
+    return [Restaurant.from_row(r) for r in data["restaurants"].get(str(int(hotel_id)), [])[:top_k]]
+
+
+if __name__ == "__main__":
+    t0 = time.perf_counter()
+    built = build_materialized()
+    n_keys = sum(len(g) * len(g[0]) for g in built["cities"].values() if g)
+    print(
+        f"✅ Top-k tablosu yazıldı: {MATERIALIZED_PATH}\n"
+        f"   şehir={len(built['cities'])}, kova={n_keys}, benzersiz liste={len(built['lists'])}, "
+        f"süre={time.perf_counter() - t0:.1f} sn"
+    )
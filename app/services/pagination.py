@@ -0,0 +1,110 @@
+"""
+Otel sonuçları için imleç (cursor) tabanlı sayfalama.
+
+İlk sayfa get_hotels ile aynıdır (materyalize tablo, LLM rerank vb. dahil).
+Yanında, kalan adayların önceden sıralanmış listesi sunucu tarafında bir
+imleç durumuna yazılır; sonraki sayfalar bu listeden dilimlenir, şehir
+yeniden taranıp sıralanmaz (sayfa başına O(sayfa boyutu)).
+
+- CSV:    durum = ilk sayfada gösterilmeyen adayların (id, skor) sırası;
+          kayıtlar sayfa istenince katalogdan id ile üretilir. Durum katalog
+          sürümünü taşır; katalog sıcak yenilenmişse imleç reddedilir
+          (satırlar sessizce düşmez/değişmez)
+- Places: durum = cache'lenmiş TextSearch yanıtının kalan kayıtları (to_row)
+
+İmleç opak bir metindir ("<durum_id>.<konum>"); durum değişmez, konum
+imlecin içindedir. Durumlar CURSOR_TTL_S (varsayılan 600 sn) sonra düşer;
+SHARED_CACHE_PATH açıksa worker'lar arası da paylaşılır (prefork API).
+
+    CURSOR_TTL_S=600
+"""
+
+from __future__ import annotations
+
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.models.records import Hotel
+from app.utils import shared_cache
+from app.utils.tracing import traced, set_attrs
+
+_MAX_CURSORS = 4096
+
+_lock = threading.Lock()
+_states: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+
+
+class CursorError(ValueError):
+    """İmleç geçersiz ya da süresi dolmuş."""
+
+
+def cursor_ttl_s() -> float:
+    return shared_cache.ttl_from_env("CURSOR_TTL_S", 600)
+
+
+def _put_state(state: Dict[str, Any]) -> str:
+    sid = secrets.token_urlsafe(12)
+    ttl = cursor_ttl_s()
+    now = time.time()
+    with _lock:
+        # Süresi dolanları (eklenme sırasıyla) ve fazlalığı at
+        while _states and (len(_states) >= _MAX_CURSORS or next(iter(_states.values()))[0] <= now):
+            _states.popitem(last=False)
+        _states[sid] = (now + ttl, state)
+    shared_cache.put("cursor", sid, state, ttl)
+    return sid
+
+
+def _get_state(sid: str) -> Optional[Dict[str, Any]]:
+    with _lock:
+        hit = _states.get(sid)
+    if hit is not None:
+        expires_at, state = hit
+        return state if expires_at > time.time() else None
+    # Başka bir worker'da açılmış olabilir
+    return shared_cache.get("cursor", sid)
+
+
+def open_cursor(state: Dict[str, Any], offset: int = 0) -> Optional[str]:
+    """Durumda offset'ten sonra kayıt yoksa None (sonraki sayfa yok)."""
+    if offset >= len(state["entries"]):
+        return None
+    return f"{_put_state(state)}.{offset}"
+
+
+def _parse(cursor: str) -> Tuple[str, int]:
+    sid, sep, pos = str(cursor or "").rpartition(".")
+    if not sep or not sid or not pos.isdigit():
+        raise CursorError("geçersiz imleç")
+    return sid, int(pos)
+
+
+@traced("pagination.next_page")
+def next_page(cursor: str, page_size: int) -> Tuple[List[Hotel], bool, Optional[str]]:
+    """Returns: (oteller, used_places, sonraki_imleç | None)."""
+    sid, pos = _parse(cursor)
+    state = _get_state(sid)
+    if state is None:
+        set_attrs(cursor_hit=False)
+        raise CursorError("imlecin süresi dolmuş; aramayı yeniden başlatın")
+
+    entries = state["entries"]
+    page = entries[pos:pos + page_size]
+    end = pos + len(page)
+    set_attrs(cursor_hit=True, offset=pos, page=len(page), remaining=len(entries) - end)
+
+    if state["kind"] == "places":
+        hotels = [Hotel.from_row(row) for row in page]
+    else:
+        from app.agents.hotel_agent import catalog_version, hotels_by_id
+
+        if state.get("catalog_version") != catalog_version():
+            set_attrs(cursor_stale=True)
+            raise CursorError("katalog güncellendi; aramayı yeniden başlatın")
+        hotels = hotels_by_id(page, state.get("profile_hint", ""))
+
+    next_cursor = f"{sid}.{end}" if end < len(entries) else None
+    return hotels, state["kind"] == "places", next_cursor
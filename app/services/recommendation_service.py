@@ -1,9 +1,28 @@
 import os
-from typing import Dict, Any, List, Optional, Tuple
+from typing import Dict, Any, List, Mapping, Optional, Sequence, Tuple, Union
 
-from app.agents.hotel_agent import filter_hotels, select_top_hotels
+from app.agents import learned_ranker
+from app.agents.hotel_agent import (
+    city_partition,
+    catalog_version,
+    filter_hotels,
+    rank_hotels,
+    resolve_city,
+    select_top_hotels,
+    select_top_hotels_many,
+    _use_llm,
+)
 from app.agents.food_agent import select_top_restaurants_for_hotel
-from app.providers.places_provider import search_hotels, search_restaurants_near_hotel
+from app.providers.circuit_breaker import OPEN, HALF_OPEN, breaker_states
+from app.services import materialized, pagination
+from app.utils.deadline import DeadlineExceeded, has_budget, remaining, request_deadline, resolve_budget
+from app.utils.env_utils import ensure_dotenv
+from app.utils.tracing import traced, set_attrs
+
+
+def _places_enabled() -> bool:
+    ensure_dotenv()
+    return bool(os.getenv("PLACES_API_KEY", "").strip())
 
 
 def _max_price_to_price_level(max_fiyat: int) -> int:
@@ -16,43 +35,199 @@ def _max_price_to_price_level(max_fiyat: int) -> int:
     return 4
 
 
+@traced("service.get_hotels")
 def get_hotels(
     sehir: str,
     max_fiyat: int,
     min_puan: float,
     profile_hint: str = "",
-    top_k: int = 5
-) -> Tuple[List[Dict[str, Any]], bool]:
+    top_k: int = 5,
+    with_cursor: bool = False,
+) -> Union[Tuple[List[Dict[str, Any]], bool], Tuple[List[Dict[str, Any]], bool, Optional[str]]]:
     """
     Returns: (otel_listesi, used_places)
+    with_cursor=True: (otel_listesi, used_places, next_cursor) — sonraki sayfalar
+    get_hotels_next(next_cursor) ile; kalan aday yoksa next_cursor None.
     """
-    use_places = bool(os.getenv("PLACES_API_KEY", "").strip())
+    # Yazım hataları upstream çağrısından önce yerelde düzeltilir
+    sehir = resolve_city(sehir) or sehir
+    use_places = _places_enabled()
+    set_attrs(sehir=sehir, provider="places" if use_places else "csv", top_k=top_k)
 
     if use_places:
+        from app.providers.places_provider import search_hotels
+
         max_price_level = _max_price_to_price_level(max_fiyat)
-        otel_listesi = search_hotels(
-            sehir,
-            min_rating=min_puan,
-            max_price_level=max_price_level,
-            limit=top_k
-        )
-        return otel_listesi, True
+        try:
+            otel_listesi = search_hotels(
+                sehir,
+                min_rating=min_puan,
+                max_price_level=max_price_level,
+                limit=PLACES_CURSOR_LIMIT if with_cursor else top_k
+            )
+            set_attrs(results=min(len(otel_listesi), top_k))
+            if with_cursor:
+                # Aynı TextSearch yanıtının kalanı imleçte; sonraki sayfalar upstream'e gitmez
+                rest = [h.to_row() for h in otel_listesi[top_k:]]
+                cursor = pagination.open_cursor({"kind": "places", "entries": rest})
+                return otel_listesi[:top_k], True, cursor
+            return otel_listesi, True
+        except Exception as e:
+            # Devre açıksa anında, değilse hata sonrası CSV kataloğuna düş
+            print(f"⚠️ Places otel arama başarısız, CSV'ye düşülüyor: {e}")
+            set_attrs(provider="csv", places_fallback=type(e).__name__)
+
+    # CSV: önce materyalize top-k tablosu (LLM rerank kapalıyken sıralama aynı)
+    # Materyalize tablo heuristik sırayı tutar; LLM veya öğrenilmiş model varsa canlı yol
+    if with_cursor:
+        return _csv_hotels_with_cursor(sehir, max_fiyat, min_puan, profile_hint, top_k)
+    if not _use_llm() and not learned_ranker.has_model("hotel"):
+        cached = materialized.lookup_hotels(sehir, max_fiyat, min_puan, top_k=top_k, profile_hint=profile_hint)
+        set_attrs(cache_hit=cached is not None, cache="materialized")
+        if cached is not None:
+            set_attrs(results=len(cached))
+            return cached, False
 
     # CSV fallback
-    uygun_oteller = filter_hotels(sehir, max_fiyat, min_puan)
+    otel_listesi = _csv_hotels(sehir, max_fiyat, min_puan, profile_hint, top_k)
+    set_attrs(results=len(otel_listesi))
+    return otel_listesi, False
+
+
+def _csv_hotels(
+    sehir: str,
+    max_fiyat: int,
+    min_puan: float,
+    profile_hint: str,
+    top_k: int,
+    uygun_oteller=None,
+) -> List[Dict[str, Any]]:
+    if uygun_oteller is None:
+        uygun_oteller = filter_hotels(sehir, max_fiyat, min_puan)
     if uygun_oteller.empty:
-        return [], False
+        return []
 
     user_context = f"Şehir: {sehir} | Maks gecelik fiyat: {max_fiyat} | Min puan: {min_puan}"
-    otel_listesi = select_top_hotels(
+    return select_top_hotels(
         uygun_oteller,
         top_k=top_k,
         profile_hint=profile_hint,
         user_context=user_context
     )
-    return otel_listesi, False
 
 
+# Places TextSearch tek sayfada en fazla 20 sonuç döner; imleçte hepsi tutulur
+PLACES_CURSOR_LIMIT = 60
+
+
+def _csv_hotels_with_cursor(
+    sehir: str,
+    max_fiyat: int,
+    min_puan: float,
+    profile_hint: str,
+    top_k: int,
+) -> Tuple[List[Dict[str, Any]], bool, Optional[str]]:
+    version = catalog_version()
+    uygun_oteller = filter_hotels(sehir, max_fiyat, min_puan)
+    otel_listesi = _csv_hotels(sehir, max_fiyat, min_puan, profile_hint, top_k, uygun_oteller)
+    set_attrs(results=len(otel_listesi))
+
+    # Önceden sıralanmış indeks: ilk sayfada gösterilmeyen tüm adaylar (LLM'siz sıra)
+    shown = {str(o["id"]) for o in otel_listesi}
+    rest = [(hid, skor) for hid, skor in rank_hotels(uygun_oteller) if str(hid) not in shown]
+    cursor = pagination.open_cursor({
+        "kind": "csv",
+        "entries": rest,
+        "profile_hint": profile_hint,
+        "catalog_version": version,
+    })
+    return otel_listesi, False, cursor
+
+
+@traced("service.get_hotels_next")
+def get_hotels_next(cursor: str, page_size: int = 5) -> Tuple[List[Dict[str, Any]], bool, Optional[str]]:
+    """
+    get_hotels(with_cursor=True) imlecinden sonraki sayfa.
+    Returns: (otel_listesi, used_places, next_cursor); süresi dolmuş imleçte pagination.CursorError.
+    """
+    return pagination.next_page(cursor, page_size)
+
+
+@traced("service.get_hotels_many")
+def get_hotels_many(queries: Sequence[Mapping[str, Any]]) -> List[Tuple[List[Dict[str, Any]], bool]]:
+    """
+    Çok sayıda (sehir, max_fiyat, min_puan[, top_k, profile_hint]) sorgusu.
+    Returns: sorgu sırasıyla (otel_listesi, used_places) — get_hotels ile aynı biçim.
+
+    Sorgular (düzeltilmiş) şehre göre gruplanır:
+    - Places: şehir başına tek TextSearch, filtreler yanıt üzerinde
+    - CSV: şehir bölümü bir kez taranır, predikatlar vektörel (select_top_hotels_many)
+    LLM rerank veya öğrenilmiş model açıksa CSV sorguları tek tek canlı yoldan geçer.
+    """
+    results: List[Optional[Tuple[List[Dict[str, Any]], bool]]] = [None] * len(queries)
+    groups: Dict[str, List[int]] = {}
+    resolved: Dict[str, str] = {}
+    for i, q in enumerate(queries):
+        raw = str(q["sehir"]).strip()
+        if raw not in resolved:
+            resolved[raw] = resolve_city(raw) or raw
+        groups.setdefault(resolved[raw], []).append(i)
+
+    use_places = _places_enabled()
+    set_attrs(queries=len(queries), cities=len(groups), provider="places" if use_places else "csv")
+
+    csv_groups = groups
+    if use_places:
+        from app.providers.places_provider import search_hotels_many
+
+        csv_groups = {}
+        for sehir, idxs in groups.items():
+            filters = [
+                (
+                    float(queries[i]["min_puan"]),
+                    _max_price_to_price_level(int(queries[i]["max_fiyat"])),
+                    int(queries[i].get("top_k", 5)),
+                )
+                for i in idxs
+            ]
+            try:
+                for i, otel_listesi in zip(idxs, search_hotels_many(sehir, filters)):
+                    results[i] = (otel_listesi, True)
+            except Exception as e:
+                print(f"⚠️ Places otel arama başarısız ({sehir}), CSV'ye düşülüyor: {e}")
+                csv_groups[sehir] = idxs
+        set_attrs(places_searches=len(groups), places_fallback_cities=len(csv_groups))
+
+    live = _use_llm() or learned_ranker.has_model("hotel")
+    for sehir, idxs in csv_groups.items():
+        if live:
+            for i in idxs:
+                q = queries[i]
+                results[i] = (_csv_hotels(
+                    sehir,
+                    int(q["max_fiyat"]),
+                    float(q["min_puan"]),
+                    q.get("profile_hint", ""),
+                    int(q.get("top_k", 5)),
+                ), False)
+            continue
+
+        batch = [
+            (
+                int(queries[i]["max_fiyat"]),
+                float(queries[i]["min_puan"]),
+                int(queries[i].get("top_k", 5)),
+                queries[i].get("profile_hint", ""),
+            )
+            for i in idxs
+        ]
+        for i, otel_listesi in zip(idxs, select_top_hotels_many(city_partition(sehir), batch)):
+            results[i] = (otel_listesi, False)
+
+    return results  # type: ignore[return-value]
+
+
+@traced("service.get_restaurants_for_hotel")
 def get_restaurants_for_hotel(
     otel: Dict[str, Any],
     mutfak_turu: Optional[str],
@@ -65,9 +240,12 @@ def get_restaurants_for_hotel(
     used_places: None ise env'e bakar, True/False ise onu kullanır
     """
     if used_places is None:
-        used_places = bool(os.getenv("PLACES_API_KEY", "").strip())
+        used_places = _places_enabled()
+    set_attrs(hotel_id=str(otel.get("id")), provider="places" if used_places else "csv")
 
     if used_places:
+        from app.providers.places_provider import search_restaurants_near_hotel
+
         # Places otel dict'inde _lat/_lng olmalı
         return search_restaurants_near_hotel(
             hotel_lat=float(otel["_lat"]),
@@ -78,6 +256,12 @@ def get_restaurants_for_hotel(
         )
 
     # CSV modunda hotel_id integer
+    if not mutfak_turu and not _use_llm() and not learned_ranker.has_model("restaurant"):
+        cached = materialized.lookup_restaurants(int(otel["id"]), top_k=top_k)
+        set_attrs(cache_hit=cached is not None, cache="materialized")
+        if cached is not None:
+            return cached
+
     return select_top_restaurants_for_hotel(
         hotel_id=int(otel["id"]),
         mutfak_turu=mutfak_turu,
@@ -86,6 +270,88 @@ def get_restaurants_for_hotel(
     )
 
 
+# Bir restoran araması için gereken asgari kalan bütçe (sn)
+RESTAURANT_MIN_BUDGET_S = 0.5
+
+
+@traced("service.get_recommendations")
+def get_recommendations(
+    sehir: str,
+    max_fiyat: int,
+    min_puan: float,
+    mutfak_turu: Optional[str] = None,
+    profile_hint: str = "",
+    top_k: int = 5,
+    top_k_rest: int = 3,
+    budget_s: Optional[float] = None,
+) -> Dict[str, Any]:
+    """
+    Oteller + otel başına restoranlar, tek bir istek bütçesi içinde.
+    budget_s: None => REQUEST_BUDGET_S, <= 0 => bütçe yok.
+
+    Bütçe biterken kalan restoran aramaları atlanır; sonuç complete=False ve
+    skipped_hotel_ids ile işaretlenir (oteller + o ana kadar gelen restoranlar döner).
+    """
+    budget_s = resolve_budget(budget_s)
+
+    skipped: List[str] = []
+    rest_map: Dict[str, List[Dict[str, Any]]] = {}
+
+    with request_deadline(budget_s):
+        oteller, used_places = get_hotels(
+            sehir=sehir,
+            max_fiyat=max_fiyat,
+            min_puan=min_puan,
+            profile_hint=profile_hint,
+            top_k=top_k,
+        )
+
+        for o in oteller:
+            hid = str(o["id"])
+            if not has_budget(RESTAURANT_MIN_BUDGET_S):
+                skipped.append(hid)
+                continue
+            try:
+                rest_map[hid] = get_restaurants_for_hotel(
+                    otel=o,
+                    mutfak_turu=mutfak_turu,
+                    profile_hint=profile_hint,
+                    top_k=top_k_rest,
+                    used_places=used_places,
+                )
+            except DeadlineExceeded:
+                skipped.append(hid)
+            except Exception as e:
+                print(f"⚠️ Restoran arama başarısız (otel={o.get('isim')}): {e}")
+                rest_map[hid] = []
+
+        rem = remaining()
+
+    set_attrs(complete=not skipped, skipped=len(skipped))
+    return {
+        "hotels": oteller,
+        "used_places": used_places,
+        "restaurants": rest_map,
+        "complete": not skipped,
+        "skipped_hotel_ids": skipped,
+        "budget_left_s": None if rem is None else round(rem, 3),
+    }
+
+
+def get_source_label(used_places: bool) -> str:
+    """UI 'Kaynak' metriği: veri kaynağı + Places devre kesici durumu."""
+    if used_places:
+        return "Google Places"
+    if not _places_enabled():
+        return "CSV"
+    states = breaker_states()
+    if any(s == OPEN for s in states.values()):
+        return "CSV (Places devresi açık)"
+    if any(s == HALF_OPEN for s in states.values()):
+        return "CSV (Places devresi yarı açık)"
+    return "CSV (Places yedeği)"
+
+
 def compute_metrics(otel_listesi: List[Dict[str, Any]]) -> Dict[str, float]:
     otel_ids = [str(o.get("id")) for o in otel_listesi if o.get("id") is not None]
     diversity = len(set(otel_ids)) / max(len(otel_ids), 1)
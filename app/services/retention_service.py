@@ -0,0 +1,221 @@
+"""
+feedback / sessions için saklama (retention) ve sıkıştırma job'ı.
+
+Her Streamlit "getir" tıklaması ve CLI çalıştırması yeni bir session açıyor,
+feedback ise hiç silinmiyordu; app.db sürekli büyüyordu. Bu job:
+
+1. Pencereden (FEEDBACK_RETENTION_DAYS, varsayılan 180 gün) eski feedback'leri
+   kullanıcı başına özetlere (feedback_summary, feedback_summary_tags) toplar
+   ve satırları siler. Her kullanıcının son PROFILE_KEEP_RECENT (20) feedback'i
+   yaşından bağımsız tutulur: build_profile_hint tam olarak bunları okur.
+2. Boş (feedback'i olmayan) ve sahipsiz (kullanıcısı silinmiş) session'ları
+   SESSION_GRACE_HOURS (24) geçtikten sonra siler.
+3. PRAGMA incremental_vacuum ile boşalan sayfaları dosyaya iade eder.
+
+Tüm silmeler sınırlı batch'lerle ve batch başına kısa işlemlerle yapılır;
+çalışan uygulamanın yazmaları uzun süre beklemez.
+
+Çalıştırma:
+    python -m app.services.retention_service
+    python -m app.services.retention_service --days 90 --batch 1000
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sqlite3
+import time
+from typing import Dict, List, Optional
+
+from app.utils.db_utils import get_conn, init_db
+
+DEFAULT_BATCH = 500
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, "").strip() or default)
+    except ValueError:
+        return default
+
+
+def compact_feedback(
+    conn: sqlite3.Connection,
+    days: int,
+    keep_recent: int,
+    batch: int = DEFAULT_BATCH,
+) -> int:
+    """
+    Eski feedback'leri özetlere toplayıp siler; silinen satır sayısını döner.
+
+    Aday id'ler (ROW_NUMBER penceresi) bir kez hesaplanıp geçici tabloya yazılır,
+    batch'ler bu tabloda id > son_id ile yürünür; pencere her batch'te tüm
+    tablo üzerinde yeniden çalışmaz. Job sırasında gelen yeni feedback
+    adayları sadece daha da eskitir, yani anlık görüntü güvenli tarafta kalır.
+    """
+    total = 0
+    cutoff = f"-{int(days)} days"
+    conn.execute("DROP TABLE IF EXISTS temp.compact_candidates")
+    conn.execute(
+        """
+        CREATE TEMP TABLE compact_candidates AS
+        SELECT id FROM (
+            SELECT id, created_at,
+                   ROW_NUMBER() OVER (PARTITION BY user_id ORDER BY id DESC) AS rn
+            FROM feedback
+        )
+        WHERE rn > ? AND created_at < datetime('now', ?)
+        """,
+        (int(keep_recent), cutoff),
+    )
+    conn.execute("CREATE INDEX temp.compact_candidates_id ON compact_candidates (id)")
+    last_id = 0
+    try:
+        while True:
+            ids = [r[0] for r in conn.execute(
+                "SELECT id FROM temp.compact_candidates WHERE id > ? ORDER BY id LIMIT ?",
+                (last_id, int(batch)),
+            ).fetchall()]
+            if not ids:
+                return total
+            last_id = ids[-1]
+            total += _compact_batch(conn, ids)
+    finally:
+        conn.execute("DROP TABLE IF EXISTS temp.compact_candidates")
+
+
+def _compact_batch(conn: sqlite3.Connection, ids: List[int]) -> int:
+    """Tek batch: özetlere ekle + sil (tek kısa işlem). Silinen satır sayısı."""
+    marks = ",".join("?" * len(ids))
+    with conn:  # batch başına tek kısa işlem
+        conn.execute(
+            f"""
+            INSERT INTO feedback_summary (user_id, n, rating_sum, likes, dislikes, first_at, last_at)
+            SELECT user_id, COUNT(*), SUM(rating),
+                   SUM(rating >= 4), SUM(rating <= 2),
+                   MIN(created_at), MAX(created_at)
+            FROM feedback WHERE id IN ({marks})
+            GROUP BY user_id
+            ON CONFLICT(user_id) DO UPDATE SET
+                n = n + excluded.n,
+                rating_sum = rating_sum + excluded.rating_sum,
+                likes = likes + excluded.likes,
+                dislikes = dislikes + excluded.dislikes,
+                first_at = MIN(COALESCE(first_at, excluded.first_at), excluded.first_at),
+                last_at = MAX(COALESCE(last_at, excluded.last_at), excluded.last_at)
+            """,
+            ids,
+        )
+        conn.execute(
+            f"""
+            INSERT INTO feedback_summary_tags (user_id, tag, n)
+            SELECT user_id, tag, COUNT(*)
+            FROM feedback_tags WHERE feedback_id IN ({marks})
+            GROUP BY user_id, tag
+            ON CONFLICT(user_id, tag) DO UPDATE SET n = n + excluded.n
+            """,
+            ids,
+        )
+        # feedback_tags satırları ON DELETE CASCADE ile gider
+        cur = conn.execute(f"DELETE FROM feedback WHERE id IN ({marks})", ids)
+    return cur.rowcount
+
+
+def prune_sessions(conn: sqlite3.Connection, grace_hours: int, batch: int = DEFAULT_BATCH) -> int:
+    """Boş veya sahipsiz session'ları batch'ler halinde siler."""
+    total = 0
+    grace = f"-{int(grace_hours)} hours"
+    while True:
+        with conn:
+            cur = conn.execute(
+                """
+                DELETE FROM sessions WHERE id IN (
+                    SELECT s.id FROM sessions s
+                    WHERE s.created_at < datetime('now', ?)
+                      AND (
+                        NOT EXISTS (SELECT 1 FROM feedback f WHERE f.session_id = s.id)
+                        OR NOT EXISTS (SELECT 1 FROM users u WHERE u.id = s.user_id)
+                      )
+                    LIMIT ?
+                )
+                """,
+                (grace, int(batch)),
+            )
+        if cur.rowcount <= 0:
+            return total
+        total += cur.rowcount
+
+
+def incremental_vacuum(conn: sqlite3.Connection, max_pages: int = 0) -> Optional[int]:
+    """
+    Boş sayfaları iade eder; iade edilen sayfa sayısını döner.
+    DB auto_vacuum=INCREMENTAL değilse None (tek seferlik VACUUM gerekir, bkz. --convert-vacuum).
+    """
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+        return None
+    before = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    if max_pages > 0:
+        conn.execute(f"PRAGMA incremental_vacuum({int(max_pages)})").fetchall()
+    else:
+        conn.execute("PRAGMA incremental_vacuum").fetchall()
+    after = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    return int(before - after)
+
+
+def run_retention(
+    days: Optional[int] = None,
+    keep_recent: Optional[int] = None,
+    grace_hours: Optional[int] = None,
+    batch: int = DEFAULT_BATCH,
+    vacuum_pages: int = 0,
+    convert_vacuum: bool = False,
+) -> Dict[str, Optional[int]]:
+    days = days if days is not None else _env_int("FEEDBACK_RETENTION_DAYS", 180)
+    keep_recent = keep_recent if keep_recent is not None else _env_int("PROFILE_KEEP_RECENT", 20)
+    grace_hours = grace_hours if grace_hours is not None else _env_int("SESSION_GRACE_HOURS", 24)
+
+    init_db()  # özet tabloları / indeksler
+    conn = get_conn()
+    conn.isolation_level = None  # işlemleri `with conn` / batch bazında biz yönetiyoruz
+    try:
+        result: Dict[str, Optional[int]] = {
+            "feedback_compacted": compact_feedback(conn, days, keep_recent, batch),
+            "sessions_deleted": prune_sessions(conn, grace_hours, batch),
+        }
+        if convert_vacuum and conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            print("ℹ️ [retention] auto_vacuum=INCREMENTAL'a geçiliyor (tek seferlik VACUUM, DB kilitlenir)...")
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            conn.execute("VACUUM")
+        result["pages_freed"] = incremental_vacuum(conn, vacuum_pages)
+        return result
+    finally:
+        conn.close()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="feedback/session retention + compaction")
+    parser.add_argument("--days", type=int, default=None, help="feedback saklama penceresi (gün)")
+    parser.add_argument("--keep-recent", type=int, default=None, help="kullanıcı başına tutulan son feedback")
+    parser.add_argument("--grace-hours", type=int, default=None, help="boş session'lar için bekleme süresi")
+    parser.add_argument("--batch", type=int, default=DEFAULT_BATCH)
+    parser.add_argument("--vacuum-pages", type=int, default=0, help="0 => tüm boş sayfalar")
+    parser.add_argument("--convert-vacuum", action="store_true", help="eski DB'yi auto_vacuum=INCREMENTAL'a çevir")
+    args = parser.parse_args(argv)
+
+    t0 = time.perf_counter()
+    res = run_retention(
+        args.days, args.keep_recent, args.grace_hours, args.batch, args.vacuum_pages, args.convert_vacuum,
+    )
+    print(f"✅ Özetlenen feedback: {res['feedback_compacted']}")
+    print(f"✅ Silinen session: {res['sessions_deleted']}")
+    if res["pages_freed"] is None:
+        print("ℹ️ incremental_vacuum atlandı (auto_vacuum kapalı; --convert-vacuum ile bir kez çevirin)")
+    else:
+        print(f"✅ İade edilen sayfa: {res['pages_freed']}")
+    print(f"   süre={time.perf_counter() - t0:.2f} sn")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
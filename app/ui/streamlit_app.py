@@ -2,8 +2,8 @@ import streamlit as st
 from typing import Optional
 
 from app.services.recommendation_service import (
-    get_hotels,
-    get_restaurants_for_hotel,
+    get_recommendations,
+    get_source_label,
     compute_metrics,
 )
 from app.utils.db_utils import (
@@ -13,24 +13,9 @@ from app.utils.db_utils import (
     init_db,
 )
 from app.agents.reflective_agent import build_profile_hint
-
-
-# --------------------------------------------------
-# SABİT LİSTELER
-# --------------------------------------------------
-
-SEHIR_LISTESI = [
-    "Adana","Adıyaman","Afyonkarahisar","Ağrı","Amasya","Ankara","Antalya","Artvin",
-    "Aydın","Balıkesir","Bilecik","Bingöl","Bitlis","Bolu","Burdur","Bursa",
-    "Çanakkale","Çankırı","Çorum","Denizli","Diyarbakır","Edirne","Elazığ","Erzincan",
-    "Erzurum","Eskişehir","Gaziantep","Giresun","Gümüşhane","Hakkari","Hatay","Isparta",
-    "Mersin","İstanbul","İzmir","Kars","Kastamonu","Kayseri","Kırklareli","Kırşehir",
-    "Kocaeli","Konya","Kütahya","Malatya","Manisa","Kahramanmaraş","Mardin","Muğla",
-    "Muş","Nevşehir","Niğde","Ordu","Rize","Sakarya","Samsun","Siirt","Sinop","Sivas",
-    "Tekirdağ","Tokat","Trabzon","Tunceli","Şanlıurfa","Uşak","Van","Yozgat","Zonguldak",
-    "Aksaray","Bayburt","Karaman","Kırıkkale","Batman","Şırnak","Bartın","Ardahan",
-    "Iğdır","Yalova","Karabük","Kilis","Osmaniye","Düzce"
-]
+from app.agents.city_index import SEHIR_LISTESI
+from app.utils.catalog_watcher import start_catalog_watcher
+from app.utils.profiling import profile_request
 
 
 # --------------------------------------------------
@@ -49,6 +34,7 @@ st.set_page_config(
 
 def main():
     init_db()
+    start_catalog_watcher()  # süreç başına bir kez; CSV güncellemeleri yeniden başlatmadan alınır
 
     st.title("🏨 Otel & 🍽️ Restoran Öneri Sistemi")
     st.caption("Kişiselleştirilmiş otel ve restoran önerileri, geri bildirimle öğrenen sistem")
@@ -110,32 +96,27 @@ def main():
 
     # ---------------- FETCH ----------------
     if fetch_btn:
-        session_id = create_session(user_id, session_token="")
-        st.session_state.session_id = session_id
-
-        oteller, used_places = get_hotels(
-            sehir=sehir,
-            max_fiyat=int(max_fiyat),
-            min_puan=float(min_puan),
-            profile_hint=profile_hint,
-            top_k=int(top_k_hotels),
-        )
-
-        st.session_state.otel_listesi = oteller
-        st.session_state.used_places = used_places
+        # ?profile=1 => bu istek profillenir (PROFILE_SAMPLE_RATE ile örnekleme ayrıca)
+        force_profile = st.query_params.get("profile") == "1"
+        with profile_request("ui.fetch", force=force_profile, user=user_identifier, sehir=sehir):
+            session_id = create_session(user_id, session_token="")
+            st.session_state.session_id = session_id
 
-        rest_map = {}
-        for o in oteller:
-            recs = get_restaurants_for_hotel(
-                otel=o,
+            rec = get_recommendations(
+                sehir=sehir,
+                max_fiyat=int(max_fiyat),
+                min_puan=float(min_puan),
                 mutfak_turu=None,  # mutfak filtresi KALDIRILDI
                 profile_hint=profile_hint,
-                top_k=int(top_k_rest),
-                used_places=used_places
+                top_k=int(top_k_hotels),
+                top_k_rest=int(top_k_rest),
             )
-            rest_map[str(o["id"])] = recs
 
-        st.session_state.rest_map = rest_map
+            st.session_state.otel_listesi = rec["hotels"]
+            st.session_state.used_places = rec["used_places"]
+            st.session_state.source_label = get_source_label(rec["used_places"])
+            st.session_state.rest_map = rec["restaurants"]
+            st.session_state.skipped_hotel_ids = rec["skipped_hotel_ids"]
 
     # ---------------- RESULTS ----------------
     otel_listesi = st.session_state.otel_listesi
@@ -148,11 +129,22 @@ def main():
     c1, c2, c3 = st.columns(3)
     c1.metric("📊 Çeşitlilik", f"{metrics['diversity']:.2f}")
     c2.metric("🔁 Tekrar oranı", f"{metrics['repetition']:.2f}")
-    c3.metric("🗺️ Kaynak", "Google Places" if st.session_state.used_places else "CSV")
+    c3.metric(
+        "🗺️ Kaynak",
+        st.session_state.get("source_label")
+        or ("Google Places" if st.session_state.used_places else "CSV")
+    )
 
     # ---------------- HOTELS ----------------
     st.subheader("✅ Önerilen Oteller & Restoranlar")
 
+    skipped_ids = set(st.session_state.get("skipped_hotel_ids", []))
+    if skipped_ids:
+        st.warning(
+            f"⏱️ Zaman bütçesi doldu: {len(skipped_ids)} otel için restoranlar getirilemedi. "
+            "Sonuçlar kısmi; tekrar deneyebilirsin."
+        )
+
     for idx, o in enumerate(otel_listesi, start=1):
         with st.expander(
             f"{idx}) {o['isim']} — {o.get('puan','-')} puan",
@@ -163,7 +155,9 @@ def main():
             st.write(f"**Önerilme Gerekçesi:** {o.get('gerekce','-')}")
 
             recs = st.session_state.rest_map.get(str(o["id"]), [])
-            if not recs:
+            if str(o["id"]) in skipped_ids:
+                st.write("⏱️ Restoranlar zaman bütçesi dolduğu için getirilemedi.")
+            elif not recs:
                 st.write("❌ Bu otel için restoran bulunamadı.")
             else:
                 st.markdown("**🍽️ Yakın Restoranlar:**")
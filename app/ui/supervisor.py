@@ -0,0 +1,181 @@
+"""
+Çoklu Streamlit worker'ı tek port arkasında çalıştıran supervisor.
+
+Tek Streamlit süreci tüm kullanıcılar için tek GIL demek (CSV filtreleme,
+prompt üretimi, SQLite). Supervisor:
+- N adet `streamlit run` sürecini 127.0.0.1:<base_port + i> üzerinde başlatır
+- dış portta küçük bir TCP proxy çalıştırır; istemci IP'sine göre yapışkan
+  (sticky) yönlendirme yapar, böylece bir tarayıcının websocket oturumu hep
+  aynı worker'a gider; worker ayakta değilse sıradakine düşer
+- ölen worker'ı yeniden başlatır, SIGTERM/SIGINT'te hepsini kapatır
+
+Paylaşılanlar:
+- katalog: memory-map edilen ikili katalog (app/utils/binary_catalog.py);
+  yoksa/eskiyse başlamadan önce bir kez üretilir
+- Places / LLM yanıtları: SHARED_CACHE_PATH SQLite dosyası (app/utils/shared_cache.py)
+
+    python main.py --mode ui --workers 4
+"""
+
+from __future__ import annotations
+
+import os
+import secrets
+import select
+import signal
+import socket
+import socketserver
+import subprocess
+import sys
+import threading
+import time
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+APP_PATH = os.path.join("app", "ui", "streamlit_app.py")
+
+_IDLE_POLL_S = 30.0
+
+
+def streamlit_cmd(host: str, port: int, headless: bool = False) -> List[str]:
+    cmd = [
+        sys.executable, "-m", "streamlit", "run",
+        APP_PATH,
+        "--server.address", host,
+        "--server.port", str(port),
+    ]
+    if headless:
+        cmd += ["--server.headless", "true"]
+    return cmd
+
+
+def _prepare_shared_state() -> None:
+    """Worker'lar başlamadan önce: DB şeması, ikili katalog, paylaşılan cache yolu."""
+    from app.utils import binary_catalog, shared_cache
+    from app.utils.db_utils import init_db
+
+    init_db()
+    print(f"🗄️ Paylaşılan cache: {shared_cache.ensure_default_path()}")
+    binary_catalog.ensure_built()
+
+
+# ----------------------------
+# TCP proxy
+# ----------------------------
+
+def _pipe(a: socket.socket, b: socket.socket) -> None:
+    socks = [a, b]
+    while True:
+        readable, _, _ = select.select(socks, [], [], _IDLE_POLL_S)
+        for s in readable:
+            data = s.recv(65536)
+            if not data:
+                return
+            (b if s is a else a).sendall(data)
+
+
+class _ProxyServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, addr: Tuple[str, int], backends: List[Tuple[str, int]]):
+        super().__init__(addr, _ProxyHandler)
+        self.backends = backends
+
+
+class _ProxyHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        server: _ProxyServer = self.server  # type: ignore[assignment]
+        n = len(server.backends)
+        # İstemci IP'sine göre yapışkan seçim; bağlanılamazsa sıradaki worker
+        start = zlib.crc32(self.client_address[0].encode("utf-8")) % n
+        upstream: Optional[socket.socket] = None
+        for i in range(n):
+            try:
+                upstream = socket.create_connection(server.backends[(start + i) % n], timeout=2.0)
+                break
+            except OSError:
+                continue
+        if upstream is None:
+            return
+
+        upstream.settimeout(None)
+        try:
+            _pipe(self.request, upstream)
+        except OSError:
+            pass
+        finally:
+            upstream.close()
+
+
+# ----------------------------
+# Supervisor
+# ----------------------------
+
+def run_supervisor(host: str, port: int, workers: int = 0, shutdown_timeout: float = 15.0) -> None:
+    workers = workers or (os.cpu_count() or 1)
+    base_port = int(os.getenv("UI_WORKER_BASE_PORT", "").strip() or port + 1)
+
+    _prepare_shared_state()
+
+    env = dict(os.environ)
+    # XSRF / oturum çerezleri tüm worker'larda geçerli olsun
+    env.setdefault("STREAMLIT_SERVER_COOKIE_SECRET", secrets.token_hex(32))
+
+    backends = [("127.0.0.1", base_port + i) for i in range(workers)]
+    procs: Dict[int, subprocess.Popen] = {}
+    started_at: Dict[int, float] = {}
+    retry_at: Dict[int, float] = {}
+
+    def _start(i: int) -> None:
+        started_at[i] = time.monotonic()
+        procs[i] = subprocess.Popen(
+            streamlit_cmd(backends[i][0], backends[i][1], headless=True),
+            cwd=ROOT_DIR,
+            env=env,
+        )
+
+    for i in range(workers):
+        _start(i)
+
+    proxy = _ProxyServer((host, port), backends)
+    threading.Thread(target=proxy.serve_forever, kwargs={"poll_interval": 0.5}, daemon=True).start()
+    print(f"🚀 UI dinleniyor: http://{host}:{port} (workers={workers}, portlar {base_port}-{base_port + workers - 1})")
+
+    stopping = {"v": False}
+
+    def _stop(signum, frame):
+        stopping["v"] = True
+
+    signal.signal(signal.SIGTERM, _stop)
+    signal.signal(signal.SIGINT, _stop)
+
+    while not stopping["v"]:
+        now = time.monotonic()
+        for i, p in list(procs.items()):
+            code = p.poll()
+            if code is None or stopping["v"]:
+                continue
+            if i not in retry_at:
+                # Açılışta hemen çöken worker'ı sürekli yeniden başlatma
+                crashed_fast = now - started_at[i] < 5.0
+                retry_at[i] = now + (5.0 if crashed_fast else 0.0)
+                print(f"⚠️ [ui] Worker {i} (pid={p.pid}) çıktı (code={code}), yeniden başlatılıyor.")
+            if now >= retry_at[i]:
+                del retry_at[i]
+                _start(i)
+        time.sleep(0.5)
+
+    proxy.shutdown()
+    proxy.server_close()
+    for p in procs.values():
+        if p.poll() is None:
+            p.terminate()
+    deadline = time.monotonic() + shutdown_timeout
+    for p in procs.values():
+        try:
+            p.wait(timeout=max(deadline - time.monotonic(), 0.1))
+        except subprocess.TimeoutExpired:
+            p.kill()
+    print("✅ UI kapatıldı.")
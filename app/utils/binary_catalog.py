@@ -0,0 +1,433 @@
+"""
+CSV kataloglarının memory-map edilen kolonlu ikili kopyası.
+
+Her worker (Streamlit / API / batch) otel.csv ve restoran.csv'yi ayrı ayrı
+parse edip kendi pandas kopyasını tutuyordu. Build aracı her tabloyu bir
+dizine yazar:
+
+    app/data/catalog_bin/<tablo>/
+        manifest.json        şema + kaynak CSV imzası
+        <kolon>.npy          sayısal kolonlar (int64 / float64)
+        <kolon>.codes.npy    metin kolonları: int32 kod (-1 => boş)
+        <kolon>.dict_offsets.npy  metin kolonları: sözlük ofsetleri (int64, n+1)
+        <kolon>.dict_blob.npy     metin kolonları: sözlük kelimeleri art arda UTF-8 (uint8)
+        <kolon>.offsets.npy  liste kolonları (ör. otellere_yakin_ids): CSR ofsetleri
+        <kolon>.values.npy   liste kolonları: CSR değerleri (int64)
+
+Agent'lar dosyaları np.load(mmap_mode="r") ile salt okunur açar; tüm
+worker'lar aynı page-cache kopyasını paylaşır, açılış maliyeti birkaç stat +
+mmap'tir. Filtreler doğrudan kolonlar üzerinde çalışır, DataFrame sadece
+seçilen satırlar için kurulur; sözlükten de sadece o satırların kodları
+çözülür (maliyet katalog boyutuyla değil dönen satır sayısıyla büyür).
+
+Kaynak CSV değişmişse (boyut/mtime, gerekirse sha1) tablo yok sayılır ve
+agent'lar CSV'ye düşer. CATALOG_BINARY=off ile tamamen kapatılır.
+
+Yeniden üretmek için:
+    python -m app.utils.binary_catalog
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+try:  # süreçler arası build kilidi (POSIX)
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None  # type: ignore[assignment]
+
+from app.utils.text_utils import normalize_text
+
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+
+CATALOG_DIR = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "..", "data", "catalog_bin")
+)
+
+# 2: metin sözlükleri sabit genişlikli <U yerine ofset + UTF-8 blob
+FORMAT_VERSION = 2
+
+# Virgülle ayrılmış id listeleri: CSR olarak da indekslenir
+LIST_COLUMNS: Dict[str, Tuple[str, ...]] = {
+    "restoran": ("otellere_yakin_ids",),
+}
+
+
+def catalog_enabled() -> bool:
+    return os.getenv("CATALOG_BINARY", "auto").strip().lower() not in ("0", "off", "false", "no")
+
+
+def catalog_dir() -> str:
+    return os.getenv("CATALOG_BIN_DIR", "").strip() or CATALOG_DIR
+
+
+# ----------------------------
+# Kaynak imzası
+# ----------------------------
+
+def file_signature(path: str, with_hash: bool = True) -> Dict[str, Any]:
+    st = os.stat(path)
+    sig: Dict[str, Any] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+    if with_hash:
+        h = hashlib.sha1()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+        sig["sha1"] = h.hexdigest()
+    return sig
+
+
+def signature_matches(path: str, stored: Dict[str, Any]) -> bool:
+    try:
+        cur = file_signature(path, with_hash=False)
+    except OSError:
+        return False
+    if cur["size"] != stored.get("size"):
+        return False
+    # mtime değiştiyse (ör. touch) içerik hash'ine bak
+    if cur["mtime_ns"] != stored.get("mtime_ns") and file_signature(path)["sha1"] != stored.get("sha1"):
+        return False
+    return True
+
+
+# ----------------------------
+# Okuma (servis yolu)
+# ----------------------------
+
+class CatalogTable:
+    """Tek bir tablonun mmap edilmiş kolonları."""
+
+    def __init__(self, root: str, manifest: Dict[str, Any]):
+        import numpy as np
+
+        self.root = root
+        self.manifest = manifest
+        self.n_rows: int = int(manifest["rows"])
+        self.columns: List[str] = [c["name"] for c in manifest["columns"]]
+        self._kinds: Dict[str, str] = {c["name"]: c["kind"] for c in manifest["columns"]}
+        self._arrays: Dict[str, Any] = {}
+        self._norm_cache: Dict[str, Dict[str, List[int]]] = {}
+        self._word_cache: Dict[str, List[str]] = {}
+        self._lock = threading.Lock()
+
+        def _mmap(fname: str):
+            return np.load(os.path.join(root, fname), mmap_mode="r", allow_pickle=False)
+
+        for c in manifest["columns"]:
+            name = c["name"]
+            if c["kind"] == "num":
+                self._arrays[name] = _mmap(f"{name}.npy")
+            else:
+                self._arrays[f"{name}.codes"] = _mmap(f"{name}.codes.npy")
+                self._arrays[f"{name}.dict_offsets"] = _mmap(f"{name}.dict_offsets.npy")
+                self._arrays[f"{name}.dict_blob"] = _mmap(f"{name}.dict_blob.npy")
+        for name in manifest.get("lists", []):
+            self._arrays[f"{name}.offsets"] = _mmap(f"{name}.offsets.npy")
+            self._arrays[f"{name}.values"] = _mmap(f"{name}.values.npy")
+
+    def __len__(self) -> int:
+        return self.n_rows
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        """Sayısal kolon (mmap); metin kolonu için kod dizisi."""
+        if self._kinds.get(name) == "num":
+            return self._arrays[name]
+        return self._arrays[f"{name}.codes"]
+
+    def _decode(self, name: str, codes: Sequence[int]) -> List[str]:
+        """Sadece verilen sözlük kodlarını çözer (kodlar >= 0)."""
+        offsets = self._arrays[f"{name}.dict_offsets"]
+        blob = self._arrays[f"{name}.dict_blob"]
+        out = []
+        for c in codes:
+            start, end = int(offsets[c]), int(offsets[c + 1])
+            out.append(blob[start:end].tobytes().decode("utf-8"))
+        return out
+
+    def _words(self, name: str) -> List[str]:
+        """Tüm sözlük (tablo başına bir kez çözülür; normalize indeksi / tam kolon için)."""
+        with self._lock:
+            words = self._word_cache.get(name)
+        if words is None:
+            offsets = self._arrays[f"{name}.dict_offsets"].tolist()
+            raw = self._arrays[f"{name}.dict_blob"].tobytes()
+            words = [raw[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(len(offsets) - 1)]
+            with self._lock:
+                self._word_cache[name] = words
+        return words
+
+    def eq_normalized(self, name: str, value: str) -> np.ndarray:
+        """normalize_text(kolon) == normalize_text(value) maskesi (sözlük üzerinden)."""
+        import numpy as np
+
+        with self._lock:
+            index = self._norm_cache.get(name)
+        if index is None:
+            index = {}
+            for code, s in enumerate(self._words(name)):
+                index.setdefault(normalize_text(s), []).append(code)
+            with self._lock:
+                self._norm_cache[name] = index
+        codes = index.get(normalize_text(value), [])
+        return np.isin(self._arrays[f"{name}.codes"], np.asarray(codes, dtype=np.int32))
+
+    def strings(self, name: str) -> List[Optional[str]]:
+        """Metin kolonunun satır başına çözülmüş değerleri (boş => None)."""
+        words = self._words(name)
+        return [words[c] if c >= 0 else None for c in self._arrays[f"{name}.codes"].tolist()]
+
+    def lists(self, name: str) -> List[List[int]]:
+        """Liste kolonunun (CSR) satır başına değerleri."""
+        offsets = self._arrays[f"{name}.offsets"].tolist()
+        values = self._arrays[f"{name}.values"].tolist()
+        return [values[offsets[i]:offsets[i + 1]] for i in range(self.n_rows)]
+
+    def to_frame(self, rows: Optional[Sequence[int]] = None) -> pd.DataFrame:
+        """Seçilen satırlardan (None => hepsi) CSV ile aynı kolonlu DataFrame kurar."""
+        import numpy as np
+        import pandas as pd
+
+        idx = np.arange(self.n_rows) if rows is None else np.asarray(rows, dtype=np.int64)
+        data: Dict[str, Any] = {}
+        for name in self.columns:
+            if self._kinds[name] == "num":
+                data[name] = np.asarray(self._arrays[name][idx])
+            else:
+                codes = np.asarray(self._arrays[f"{name}.codes"][idx])
+                col = np.empty(len(idx), dtype=object)
+                ok = codes >= 0
+                if rows is None:
+                    words = self._words(name)
+                    col[ok] = [words[c] for c in codes[ok].tolist()]
+                else:
+                    # Sadece seçilen satırların kodları çözülür
+                    uniq, inv = np.unique(codes[ok], return_inverse=True)
+                    decoded = np.empty(len(uniq), dtype=object)
+                    decoded[:] = self._decode(name, uniq.tolist())
+                    col[ok] = decoded[inv]
+                col[~ok] = np.nan
+                data[name] = col
+        return pd.DataFrame(data, columns=self.columns, index=idx)
+
+
+_lock = threading.Lock()
+_tables: Dict[str, Tuple[Any, Optional[CatalogTable]]] = {}
+_opening: set = set()
+
+
+def _stat_key(*paths: str) -> Tuple[Any, ...]:
+    out = []
+    for p in paths:
+        try:
+            st = os.stat(p)
+            out.append((st.st_size, st.st_mtime_ns, st.st_ino))
+        except OSError:
+            out.append(None)
+    return tuple(out)
+
+
+def open_table(name: str, csv_path: str) -> Optional[CatalogTable]:
+    """
+    `name` tablosunu mmap ile açar (süreç içinde önbelleklenir).
+    Kapalıysa, dosya yoksa veya csv_path'in imzası tutmuyorsa None döner.
+    """
+    if not catalog_enabled():
+        return None
+
+    root = os.path.join(catalog_dir(), name)
+    manifest_path = os.path.join(root, "manifest.json")
+    key = _stat_key(manifest_path, csv_path)
+    if key[0] is None:
+        return None
+
+    with _lock:
+        cached = _tables.get(name)
+        if cached is not None and cached[0] == (csv_path, key):
+            return cached[1]
+        if name in _opening and cached is not None and cached[1] is not None:
+            # Başka bir thread yeni snapshot'ı açıyor: bu istek eskisiyle devam eder
+            return cached[1]
+        _opening.add(name)
+
+    # Yeni snapshot kilit dışında açılır, hazır olunca tek atamayla yerine konur
+    table: Optional[CatalogTable] = None
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("source_path") != os.path.abspath(csv_path):
+            pass  # başka bir CSV (ör. benchmark kataloğu) => sessizce CSV yolu
+        elif manifest.get("version") == FORMAT_VERSION and signature_matches(csv_path, manifest.get("source", {})):
+            table = CatalogTable(root, manifest)
+        else:
+            print(f"⚠️ [catalog] {name}: CSV değişmiş, ikili katalog yok sayılıyor (CSV'ye düşülüyor).")
+    except Exception as e:
+        print(f"⚠️ [catalog] {name} açılamadı: {e}")
+    finally:
+        with _lock:
+            _tables[name] = ((csv_path, key), table)
+            _opening.discard(name)
+    return table
+
+
+# ----------------------------
+# Üretim (offline)
+# ----------------------------
+
+def split_ids(raw: Any) -> List[int]:
+    out: List[int] = []
+    if raw is None or raw != raw:
+        return out
+    for part in str(raw).split(","):
+        part = part.strip()
+        try:
+            out.append(int(part))
+        except ValueError:
+            continue
+    return out
+
+
+@contextmanager
+def build_lock(base: Optional[str] = None) -> Iterator[None]:
+    """Aynı dizine aynı anda tek süreç yazsın (supervisor / API worker'ları ve watcher'ları)."""
+    base = base or catalog_dir()
+    os.makedirs(base, exist_ok=True)
+    with open(os.path.join(base, ".build.lock"), "a") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def build_table(name: str, csv_path: str, out_dir: Optional[str] = None) -> Dict[str, Any]:
+    """csv_path'i kolonlu ikili formata çevirir; dizini atomik olarak değiştirir."""
+    import numpy as np
+    import pandas as pd
+    from pandas.api.types import is_bool_dtype, is_numeric_dtype
+
+    base = out_dir or catalog_dir()
+    os.makedirs(base, exist_ok=True)
+    final = os.path.join(base, name)
+    tmp = f"{final}.{os.getpid()}.tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+
+    source = file_signature(csv_path)
+    df = pd.read_csv(csv_path)
+
+    columns: List[Dict[str, Any]] = []
+    for col in df.columns:
+        s = df[col]
+        if is_numeric_dtype(s.dtype) and not is_bool_dtype(s.dtype):
+            arr = s.to_numpy()
+            arr = arr.astype(np.int64) if arr.dtype.kind in "iu" else arr.astype(np.float64)
+            np.save(os.path.join(tmp, f"{col}.npy"), arr)
+            columns.append({"name": col, "kind": "num", "dtype": arr.dtype.str})
+        else:
+            values = s.astype(object).where(s.notna(), None).tolist()
+            words: Dict[str, int] = {}
+            codes = np.empty(len(values), dtype=np.int32)
+            for i, v in enumerate(values):
+                codes[i] = -1 if v is None else words.setdefault(str(v), len(words))
+            encoded = [w.encode("utf-8") for w in words]
+            dict_offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+            np.cumsum([len(b) for b in encoded], out=dict_offsets[1:])
+            blob = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+            np.save(os.path.join(tmp, f"{col}.codes.npy"), codes)
+            np.save(os.path.join(tmp, f"{col}.dict_offsets.npy"), dict_offsets)
+            np.save(os.path.join(tmp, f"{col}.dict_blob.npy"), blob)
+            columns.append({"name": col, "kind": "dict", "size": len(words)})
+
+    lists: List[str] = []
+    for col in LIST_COLUMNS.get(name, ()):
+        if col not in df.columns:
+            continue
+        offsets = [0]
+        values: List[int] = []
+        for raw in df[col].tolist():
+            values.extend(split_ids(raw))
+            offsets.append(len(values))
+        np.save(os.path.join(tmp, f"{col}.offsets.npy"), np.asarray(offsets, dtype=np.int64))
+        np.save(os.path.join(tmp, f"{col}.values.npy"), np.asarray(values, dtype=np.int64))
+        lists.append(col)
+
+    manifest = {
+        "version": FORMAT_VERSION,
+        "table": name,
+        "rows": int(len(df)),
+        "source": source,
+        "source_path": os.path.abspath(csv_path),
+        "columns": columns,
+        "lists": lists,
+    }
+    with open(os.path.join(tmp, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+    # Eski dizini kenara al, yenisini yerine koy. Açık mmap'ler eski (unlink
+    # edilmiş) dosyaları okumaya devam eder; yeni açılışlar yeni dizini görür.
+    old = f"{final}.{os.getpid()}.old"
+    if os.path.isdir(final):
+        os.replace(final, old)
+    os.replace(tmp, final)
+    shutil.rmtree(old, ignore_errors=True)
+    return manifest
+
+
+def catalog_sources() -> Dict[str, str]:
+    """tablo adı => kaynak CSV yolu"""
+    from app.agents import food_agent, hotel_agent
+
+    return {"otel": hotel_agent.DATA_PATH, "restoran": food_agent.DATA_PATH}
+
+
+def build_all(out_dir: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+    with build_lock(out_dir):
+        return {name: build_table(name, path, out_dir) for name, path in catalog_sources().items()}
+
+
+def refresh_table(name: str, csv_path: str) -> bool:
+    """
+    CSV değiştiyse tabloyu yeniden üretip yeni snapshot'ı açar (ısıtır).
+    Başka bir süreç zaten üretmişse sadece açar. Üretim yapıldıysa True.
+    """
+    with build_lock():
+        if open_table(name, csv_path) is not None:
+            return False
+        build_table(name, csv_path)
+    open_table(name, csv_path)
+    return True
+
+
+def ensure_built() -> bool:
+    """Çok süreçli modlar için: tablolar yoksa/eskiyse bir kez üretir. Katalog kullanılabilir mi döner."""
+    if not catalog_enabled():
+        return False
+    if all(open_table(name, path) for name, path in catalog_sources().items()):
+        return True
+    try:
+        build_all()
+        print("📦 İkili katalog üretildi (worker'lar mmap ile paylaşacak).")
+        return True
+    except Exception as e:
+        print(f"⚠️ İkili katalog üretilemedi, worker'lar CSV okuyacak: {e}")
+        return False
+
+
+if __name__ == "__main__":
+    import time
+
+    t0 = time.perf_counter()
+    built = build_all()
+    for tname, m in built.items():
+        print(f"✅ {tname}: {m['rows']} satır, {len(m['columns'])} kolon -> {os.path.join(catalog_dir(), tname)}")
+    print(f"   süre={time.perf_counter() - t0:.2f} sn")
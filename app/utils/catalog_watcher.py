@@ -0,0 +1,174 @@
+"""
+CSV kataloglarının (otel.csv, restoran.csv) yeniden başlatmadan güncellenmesi.
+
+Arka plandaki bir thread kaynak CSV'lerin (boyut, mtime) imzasını yoklar;
+değişen bir dosyanın imzası iki yoklama boyunca sabit kalınca (yazma
+bitmiş) içerik hash'i de farklıysa:
+- ikili katalog tablosu yeniden üretilir ve yeni snapshot açılıp ısıtılır
+  (binary_catalog.refresh_table; dizin atomik değişir, açık mmap'ler eski
+  dosyaları okumaya devam eder)
+- materyalize top-k tablosu önceden üretilmişse o da yeniden üretilir
+- süreç içi indeksler (şehir trigram indeksi, id -> satır haritası, restoran
+  near/mutfak indeksi) yeni snapshot için bu thread'de kurulur
+
+Snapshot'lar tek atamayla değiştirilir: süren istekler eski snapshot'la biter,
+yeni istekler yenisini görür; üretim sırasında servis durmaz (indeksler
+kurulurken istekler önceki snapshot'ın indeksini kullanır, bkz. snapshot_cache). Üretim
+süreçler arası kilitlidir, aynı değişikliği tek worker üretir, diğerleri
+sadece yeni snapshot'ı açar.
+
+    CATALOG_WATCH=0               izleyiciyi kapatır
+    CATALOG_WATCH_INTERVAL_S=5    yoklama aralığı
+"""
+
+from __future__ import annotations
+
+import os
+import subprocess
+import sys
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from app.utils import binary_catalog
+
+_ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+_lock = threading.Lock()
+_watcher: Optional["CatalogWatcher"] = None
+
+
+def watch_enabled() -> bool:
+    return os.getenv("CATALOG_WATCH", "1").strip().lower() not in ("0", "off", "false", "no")
+
+
+def _interval_s() -> float:
+    try:
+        return max(float(os.getenv("CATALOG_WATCH_INTERVAL_S", "").strip() or 5.0), 0.2)
+    except ValueError:
+        return 5.0
+
+
+def _stat(path: str) -> Optional[Tuple[int, int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+
+class CatalogWatcher(threading.Thread):
+    def __init__(self, interval_s: float):
+        super().__init__(name="catalog-watcher", daemon=True)
+        self.interval_s = interval_s
+        self._stop_event = threading.Event()
+        self._seen: Dict[str, Optional[Tuple[int, int]]] = {}
+        self._pending: Dict[str, Optional[Tuple[int, int]]] = {}
+        self._hashes: Dict[str, Optional[str]] = {}
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+    def _content_changed(self, name: str, path: str) -> bool:
+        # touch / kopyalama gibi sadece mtime değişimlerinde yeniden üretme
+        try:
+            sha1 = binary_catalog.file_signature(path)["sha1"]
+        except OSError:
+            return False
+        old = self._hashes.get(name)
+        self._hashes[name] = sha1
+        return old is None or old != sha1
+
+    def poll_once(self) -> None:
+        changed = []
+        for name, path in binary_catalog.catalog_sources().items():
+            cur = _stat(path)
+            if name not in self._seen:
+                self._seen[name] = cur
+                try:
+                    self._hashes[name] = binary_catalog.file_signature(path)["sha1"]
+                except OSError:
+                    self._hashes[name] = None
+                # Süreç kapalıyken CSV değişmiş olabilir: mevcut ama eski tabloyu hemen yenile
+                table_dir = os.path.join(binary_catalog.catalog_dir(), name)
+                if (
+                    binary_catalog.catalog_enabled()
+                    and os.path.isdir(table_dir)
+                    and binary_catalog.open_table(name, path) is None
+                ):
+                    changed.append((name, path))
+                continue
+            if cur == self._seen[name]:
+                self._pending.pop(name, None)
+                continue
+            # Yazma sürüyor olabilir: imza bir sonraki yoklamada da aynıysa işle
+            if self._pending.get(name) != cur:
+                self._pending[name] = cur
+                continue
+            self._pending.pop(name, None)
+            self._seen[name] = cur
+            if cur is not None and self._content_changed(name, path):
+                changed.append((name, path))
+
+        if changed:
+            self._rebuild(changed)
+
+    def _rebuild(self, changed) -> None:
+        t0 = time.perf_counter()
+        names = ", ".join(os.path.basename(p) for _, p in changed)
+        try:
+            if binary_catalog.catalog_enabled():
+                for name, path in changed:
+                    binary_catalog.refresh_table(name, path)
+            self._refresh_materialized()
+            self._warm_indexes()
+            print(f"🔄 [catalog] {names} değişti, yeni snapshot hazır ({time.perf_counter() - t0:.2f} sn).")
+        except Exception as e:
+            print(f"⚠️ [catalog] {names} yeniden üretilemedi, eski snapshot/CSV ile devam: {e}")
+
+    @staticmethod
+    def _refresh_materialized() -> None:
+        from app.services import materialized
+
+        if not os.path.exists(materialized.MATERIALIZED_PATH):
+            return  # hiç üretilmemiş: canlı yol zaten kullanılıyor
+        with binary_catalog.build_lock():
+            # Dosyanın kendi `sources` imzası kontrol edilir (istek thread'lerinin
+            # önbelleği değil); başka worker zaten ürettiyse sadece yüklenir
+            if materialized.reload() is None:
+                # Ayrı süreçte: build, LLM/ranker env'ini değiştirir; servis eden süreç etkilenmesin
+                subprocess.run(
+                    [sys.executable, "-m", "app.services.materialized"],
+                    cwd=_ROOT_DIR,
+                    check=True,
+                    stdout=subprocess.DEVNULL,
+                )
+                materialized.reload()  # yeni tabloyu ısıt
+
+    @staticmethod
+    def _warm_indexes() -> None:
+        from app.agents import food_agent, hotel_agent
+
+        hotel_agent.warm_indexes()
+        food_agent.warm_indexes()
+
+    def run(self) -> None:
+        self.poll_once()  # başlangıç imzaları (+ eski tablolar) servis thread'ini bekletmeden
+        while not self._stop_event.wait(self.interval_s):
+            try:
+                self.poll_once()
+            except Exception as e:
+                print(f"⚠️ [catalog] izleyici hatası: {e}")
+
+
+def start_catalog_watcher() -> Optional[CatalogWatcher]:
+    """Süreç başına bir izleyici başlatır (fork sonrası child'da yeniden başlar)."""
+    global _watcher
+    if not watch_enabled():
+        return None
+    with _lock:
+        if _watcher is not None and _watcher.is_alive():
+            return _watcher
+        _watcher = CatalogWatcher(_interval_s())
+        _watcher.start()
+        return _watcher
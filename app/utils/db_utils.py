@@ -1,10 +1,13 @@
 from __future__ import annotations
 
-from typing import Optional, Union, List, Tuple, Any
+from typing import Dict, Optional, Union, List, Tuple, Any
 import sqlite3
 import os
 from pathlib import Path
 
+from app.utils.keyword_index import dictionary_version, extract_tags
+from app.utils.tracing import traced
+
 
 # DB dosyası: app/db/app.db
 BASE_DIR = Path(__file__).resolve().parent.parent   # app/
@@ -21,6 +24,8 @@ def get_conn() -> sqlite3.Connection:
 
     conn = sqlite3.connect(DB_PATH, check_same_thread=False)
     conn.execute("PRAGMA foreign_keys = ON;")
+    # Çoklu worker (supervisor / API prefork): yazma kilidinde hemen hata verme, bekle
+    conn.execute("PRAGMA busy_timeout = 5000;")
     return conn
 
 
@@ -35,6 +40,7 @@ def _to_text_id(v: Optional[Union[int, str]]) -> Optional[str]:
     return s if s != "" else None
 
 
+@traced("db.get_or_create_user")
 def get_or_create_user(user_identifier: str) -> int:
     user_identifier = (user_identifier or "").strip() or "anon"
 
@@ -47,13 +53,17 @@ def get_or_create_user(user_identifier: str) -> int:
         conn.close()
         return int(row[0])
 
-    cur.execute("INSERT INTO users (user_identifier) VALUES (?)", (user_identifier,))
+    # Eşzamanlı süreçler (batch worker'ları, API) aynı kullanıcıyı birlikte
+    # oluşturabilir: kaybeden taraf UNIQUE hatası yerine mevcut satırı okur
+    cur.execute("INSERT OR IGNORE INTO users (user_identifier) VALUES (?)", (user_identifier,))
     conn.commit()
-    user_id = cur.lastrowid
+    cur.execute("SELECT id FROM users WHERE user_identifier = ?", (user_identifier,))
+    user_id = cur.fetchone()[0]
     conn.close()
     return int(user_id)
 
 
+@traced("db.create_session")
 def create_session(user_id: int, session_token: str = "") -> int:
     conn = get_conn()
     cur = conn.cursor()
@@ -68,6 +78,7 @@ def create_session(user_id: int, session_token: str = "") -> int:
     return int(session_id)
 
 
+@traced("db.insert_feedback")
 def insert_feedback(
     user_id: int,
     session_id: int,
@@ -96,10 +107,19 @@ def insert_feedback(
         (int(user_id), int(session_id), otel_id_txt, restoran_id_txt, int(rating), comment)
     )
 
+    # Yorum bir kez normalize edilip etiketlenir; profil ipucu sadece sayıları okur
+    tags = extract_tags(comment)
+    if tags:
+        cur.executemany(
+            "INSERT OR IGNORE INTO feedback_tags (feedback_id, user_id, tag) VALUES (?, ?, ?)",
+            [(cur.lastrowid, int(user_id), t) for t in tags],
+        )
+
     conn.commit()
     conn.close()
 
 
+@traced("db.get_recent_feedback")
 def get_recent_feedback(user_id: int, limit: int = 20) -> List[Tuple[Any, ...]]:
     """
     Son feedback kayıtlarını döndürür:
@@ -123,10 +143,75 @@ def get_recent_feedback(user_id: int, limit: int = 20) -> List[Tuple[Any, ...]]:
     conn.close()
     return rows
 
+
+@traced("db.get_recent_tag_counts")
+def get_recent_tag_counts(user_id: int, limit: int = 20) -> Dict[str, int]:
+    """Kullanıcının son `limit` feedback'indeki tercih etiketi sayıları."""
+    conn = get_conn()
+    cur = conn.cursor()
+
+    cur.execute(
+        """
+        SELECT t.tag, COUNT(*)
+        FROM feedback_tags t
+        JOIN (
+            SELECT id FROM feedback
+            WHERE user_id = ?
+            ORDER BY id DESC
+            LIMIT ?
+        ) f ON f.id = t.feedback_id
+        GROUP BY t.tag
+        """,
+        (int(user_id), int(limit))
+    )
+
+    counts = {tag: int(n) for tag, n in cur.fetchall()}
+    conn.close()
+    return counts
+
+
+def _sync_feedback_tags(conn: sqlite3.Connection, batch_size: int = 1000) -> None:
+    """Anahtar kelime sözlüğü değiştiyse mevcut yorumları yeniden etiketler."""
+    cur = conn.cursor()
+    version = dictionary_version()
+    row = cur.execute("SELECT value FROM keyword_meta WHERE key = 'dictionary_version'").fetchone()
+    if row and row[0] == version:
+        return
+
+    cur.execute("DELETE FROM feedback_tags")
+    last_id = 0
+    while True:
+        rows = cur.execute(
+            """
+            SELECT id, user_id, comment FROM feedback
+            WHERE id > ? AND comment IS NOT NULL AND comment != ''
+            ORDER BY id
+            LIMIT ?
+            """,
+            (last_id, batch_size)
+        ).fetchall()
+        if not rows:
+            break
+        cur.executemany(
+            "INSERT OR IGNORE INTO feedback_tags (feedback_id, user_id, tag) VALUES (?, ?, ?)",
+            [(fid, uid, t) for fid, uid, comment in rows for t in extract_tags(comment)],
+        )
+        last_id = rows[-1][0]
+
+    cur.execute(
+        "INSERT OR REPLACE INTO keyword_meta (key, value) VALUES ('dictionary_version', ?)",
+        (version,)
+    )
+
+@traced("db.init_db")
 def init_db() -> None:
     conn = get_conn()
     cur = conn.cursor()
 
+    # Yeni DB'lerde retention job'ın incremental_vacuum yapabilmesi için
+    # (mevcut DB'lerde tablolar oluştuktan sonra etkisizdir)
+    cur.execute("PRAGMA auto_vacuum = INCREMENTAL;")
+
     cur.execute("""
         CREATE TABLE IF NOT EXISTS users (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -159,5 +244,50 @@ def init_db() -> None:
         );
     """)
 
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS feedback_tags (
+            feedback_id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            tag TEXT NOT NULL,
+            PRIMARY KEY (feedback_id, tag),
+            FOREIGN KEY (feedback_id) REFERENCES feedback(id) ON DELETE CASCADE
+        );
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_feedback_tags_user_tag ON feedback_tags (user_id, tag);")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_feedback_user_id ON feedback (user_id, id);")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_feedback_session ON feedback (session_id);")
+
+    # Retention job'ın eski feedback'leri topladığı kullanıcı özetleri
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS feedback_summary (
+            user_id INTEGER PRIMARY KEY,
+            n INTEGER NOT NULL DEFAULT 0,
+            rating_sum INTEGER NOT NULL DEFAULT 0,
+            likes INTEGER NOT NULL DEFAULT 0,
+            dislikes INTEGER NOT NULL DEFAULT 0,
+            first_at TIMESTAMP,
+            last_at TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+        );
+    """)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS feedback_summary_tags (
+            user_id INTEGER NOT NULL,
+            tag TEXT NOT NULL,
+            n INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, tag),
+            FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+        );
+    """)
+
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS keyword_meta (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        );
+    """)
+
+    _sync_feedback_tags(conn)
+
     conn.commit()
     conn.close()
@@ -0,0 +1,119 @@
+"""
+İstek kapsamlı zaman bütçesi (deadline).
+
+    with request_deadline(8.0):
+        ... get_hotels / restoran aramaları / LLM rerank ...
+
+Deadline bir contextvar'da tutulur; servis, agent'lar ve provider'lar
+parametre zinciri kurmadan kalan bütçeyi okur:
+- provider'lar HTTP timeout'unu `timeout_for(varsayılan)` ile kısaltır
+- agent'lar LLM rerank'i bütçe yetmiyorsa atlar (heuristik sıralama kalır)
+- servis, bütçe biterken kalan restoran aramalarını atlayıp kısmi sonuç döner
+"""
+
+from __future__ import annotations
+
+import contextvars
+import os
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+
+class DeadlineExceeded(TimeoutError):
+    pass
+
+
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("request_deadline", default=None)
+
+
+def default_budget_s() -> Optional[float]:
+    """REQUEST_BUDGET_S (varsayılan 15 sn); 0 veya negatif => deadline yok."""
+    try:
+        v = float(os.getenv("REQUEST_BUDGET_S", "").strip() or 15.0)
+    except ValueError:
+        v = 15.0
+    return v if v > 0 else None
+
+
+def resolve_budget(budget_s: Optional[float]) -> Optional[float]:
+    """None => REQUEST_BUDGET_S varsayılanı, <= 0 => deadline yok."""
+    if budget_s is None:
+        return default_budget_s()
+    return budget_s if budget_s > 0 else None
+
+
+@contextmanager
+def request_deadline(budget_s: Optional[float]) -> Iterator[None]:
+    """
+    Bütçeyi başlatır. İç içe kullanımda daha sıkı olan deadline geçerlidir;
+    budget_s None ise mevcut deadline (varsa) aynen kalır.
+    """
+    current = _deadline.get()
+    new = current
+    if budget_s is not None:
+        candidate = time.monotonic() + budget_s
+        new = candidate if current is None else min(current, candidate)
+    token = _deadline.set(new)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def current_deadline() -> Optional[float]:
+    """Mutlak deadline (time.monotonic); yoksa None."""
+    return _deadline.get()
+
+
+@contextmanager
+def deadline_at(deadline: Optional[float]) -> Iterator[None]:
+    """
+    Deadline'ı olduğu gibi ayarlar (None => yok); request_deadline'ın aksine
+    mevcut deadline'la sıkılaştırılmaz. Birden fazla isteğe hizmet eden
+    paylaşılan işler (LLM micro-batch) için: iş, bekleyenlerin en uzun
+    deadline'ıyla çalışır, her istek yine kendi deadline'ında vazgeçer.
+    """
+    token = _deadline.set(deadline)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """Kalan saniye; deadline yoksa None."""
+    dl = _deadline.get()
+    if dl is None:
+        return None
+    return dl - time.monotonic()
+
+
+def has_budget(min_s: float) -> bool:
+    rem = remaining()
+    return rem is None or rem >= min_s
+
+
+def timeout_for(default_s: float, min_s: float = 0.5) -> float:
+    """
+    Bir upstream çağrısı için timeout: varsayılan ile kalan bütçenin küçüğü.
+    Kalan bütçe min_s'nin altındaysa çağrı hiç yapılmaz.
+    """
+    rem = remaining()
+    if rem is None:
+        return default_s
+    if rem < min_s:
+        raise DeadlineExceeded(f"request deadline exceeded ({rem:.2f}s left)")
+    return min(default_s, rem)
+
+
+def deadline_caused_timeout(timeout_s: float, default_s: float, slack_s: float = 0.05) -> bool:
+    """
+    Bir upstream timeout'u istek bütçesinden mi kaynaklandı: timeout kalan
+    bütçeyle kısaltılmıştı (timeout_s < default_s) ve deadline şimdi dolmuş.
+    Değilse timeout upstream'in kendi hatasıdır (devre kesiciye sayılmalı).
+    """
+    if timeout_s >= default_s:
+        return False
+    rem = remaining()
+    return rem is not None and rem <= slack_s
@@ -0,0 +1,21 @@
+"""
+.env yükleme (tek sefer, tembel).
+
+Eskiden places_provider import edilirken load_dotenv() çalışıyordu; artık
+provider'lar ihtiyaç anında import edildiği için giriş noktaları ve env okuyan
+yerler ensure_dotenv() çağırır.
+"""
+
+_loaded = False
+
+
+def ensure_dotenv() -> None:
+    global _loaded
+    if _loaded:
+        return
+    _loaded = True
+    try:
+        from dotenv import load_dotenv
+    except ImportError:
+        return
+    load_dotenv()
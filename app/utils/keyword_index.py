@@ -0,0 +1,145 @@
+"""
+Yorumlardan tercih etiketleri çıkaran anahtar kelime indeksi.
+
+Yorum, feedback kaydedilirken bir kez normalize edilir (normalize_text:
+küçük harf, Türkçe karakter/aksan katlama) ve tüm kalıplar tek geçişte
+Aho-Corasick otomatı ile aranır. Eşleşen etiketler `feedback_tags` yan
+tablosuna yazılır; build_profile_hint metni yeniden taramak yerine etiket
+sayılarını okur.
+
+Sözlük PREFERENCE_KEYWORDS_PATH ile bir JSON dosyasından değiştirilebilir:
+
+    {
+      "sessiz": {"hint": "tercih: sessiz/sakin ortam", "patterns": ["sessiz", "sakin"]},
+      ...
+    }
+
+Sözlük değişince (sürüm hash'i) init_db mevcut yorumları yeniden etiketler.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+from app.utils.text_utils import normalize_text
+
+# Sıra önemli: profil ipuçları bu sırayla yazılır
+DEFAULT_KEYWORDS: Dict[str, Dict[str, object]] = {
+    "sessiz": {"hint": "tercih: sessiz/sakin ortam", "patterns": ["sessiz"]},
+    "aile": {"hint": "tercih: aile dostu", "patterns": ["aile"]},
+    "butce": {"hint": "tercih: bütçe hassasiyeti", "patterns": ["ucuz", "bütçe", "butce"]},
+}
+
+
+class AhoCorasick:
+    """Çok kalıplı alt dizgi eşleyici; her kalıp bir etikete bağlıdır."""
+
+    def __init__(self, patterns: List[Tuple[str, str]]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[str]] = [[]]
+
+        for pattern, tag in patterns:
+            node = 0
+            for ch in pattern:
+                nxt = self._goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[node][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                node = nxt
+            if tag not in self._out[node]:
+                self._out[node].append(tag)
+
+        # BFS ile failure linkleri; çıktılar failure zinciri boyunca birleştirilir
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self._goto[node].items():
+                queue.append(nxt)
+                f = self._fail[node]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                self._fail[nxt] = self._goto[f].get(ch, 0)
+                for tag in self._out[self._fail[nxt]]:
+                    if tag not in self._out[nxt]:
+                        self._out[nxt].append(tag)
+
+    def find_tags(self, text: str) -> List[str]:
+        found: List[str] = []
+        node = 0
+        for ch in text:
+            while node and ch not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(ch, 0)
+            for tag in self._out[node]:
+                if tag not in found:
+                    found.append(tag)
+        return found
+
+
+def load_keywords() -> Dict[str, Dict[str, object]]:
+    path = os.getenv("PREFERENCE_KEYWORDS_PATH", "").strip()
+    if not path:
+        return DEFAULT_KEYWORDS
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if not isinstance(data, dict):
+            raise ValueError("JSON nesnesi bekleniyor")
+        return data
+    except Exception as e:
+        print(f"⚠️ [keywords] {path} okunamadı, varsayılan sözlük kullanılıyor: {e}")
+        return DEFAULT_KEYWORDS
+
+
+_lock = threading.Lock()
+_state: Dict[str, object] = {"source": None, "matcher": None, "version": None, "keywords": None}
+
+
+def _load() -> Tuple[AhoCorasick, str, Dict[str, Dict[str, object]]]:
+    source = os.getenv("PREFERENCE_KEYWORDS_PATH", "").strip()
+    with _lock:
+        if _state["matcher"] is None or _state["source"] != source:
+            keywords = load_keywords()
+            patterns = [
+                (normalize_text(p), tag)
+                for tag, spec in keywords.items()
+                for p in (spec.get("patterns") or [])
+                if normalize_text(p)
+            ]
+            raw = json.dumps(sorted(patterns), ensure_ascii=False)
+            _state.update(
+                source=source,
+                matcher=AhoCorasick(patterns),
+                version=hashlib.sha1(raw.encode("utf-8")).hexdigest()[:12],
+                keywords=keywords,
+            )
+        return _state["matcher"], _state["version"], _state["keywords"]  # type: ignore[return-value]
+
+
+def extract_tags(comment: Optional[str]) -> List[str]:
+    """Yorumdaki tercih etiketleri (sözlük sırasıyla)."""
+    text = normalize_text(comment or "")
+    if not text:
+        return []
+    matcher, _, keywords = _load()
+    found = set(matcher.find_tags(text))
+    return [tag for tag in keywords if tag in found]
+
+
+def dictionary_version() -> str:
+    return _load()[1]
+
+
+def tag_hints(counts: Dict[str, int]) -> List[str]:
+    """Etiket sayılarından profil ipuçları (sözlük sırasıyla, sayısı > 0 olanlar)."""
+    _, _, keywords = _load()
+    return [str(spec.get("hint") or f"tercih: {tag}") for tag, spec in keywords.items() if counts.get(tag)]
@@ -0,0 +1,280 @@
+"""
+İstek bazında, isteğe bağlı profilleme (cProfile + tracemalloc).
+
+Üretimde yavaş kalan tek bir isteği profillemek için: istek örneklenirse
+(PROFILE_SAMPLE_RATE olasılığıyla ya da istek bayrağıyla zorlanırsa) süresince
+cProfile ve tracemalloc açılır, bitince zaman damgalı bir dizine yazılır:
+
+    <PROFILE_DIR>/<YYYYmmdd-HHMMSS>-<isim>-<pid>-<rastgele>/
+        profile.pstats   cProfile istatistikleri (snakeviz, gprof2dot, pstats)
+        collapsed.txt    katlanmış yığınlar ("a;b;c <mikrosaniye>"): flamegraph.pl, speedscope
+        memory.txt       en çok bellek ayıran satırlar (istek süresince net artış)
+        meta.json        isim, süre, tepe bellek, ek alanlar
+
+Örneklenmeyen isteklerin maliyeti tek bir random() çağrısıdır; düşük bir oranla
+üretimde açık bırakılabilir. Aynı anda tek istek profillenir; çakışan istekler
+profillenmeden geçer.
+
+Thread'ler: cProfile sadece etkinleştirildiği thread'i izler. İsteğin işini
+başka thread'de yürüten yerler (LLM yarışı `llm-race`, micro-batch çağrısı
+`llm-batch`) işi `profiled_call` ile sarar: istek profilleniyorsa o thread'de
+ayrı bir profiler açılır ve `_dump`'ta ana profille birleştirilir (pstats ve
+collapsed.txt'de o thread'lerin yığınları ayrı kökler olarak görünür).
+İstek bittiğinde hâlâ süren (geç) işler ve başka thread'ler dahil edilmez;
+tracemalloc ise süreç genelidir (tüm thread'lerin ayırmaları memory.txt'de).
+
+    PROFILE_SAMPLE_RATE=0        0..1 (0 => sadece bayrakla zorlanan istekler)
+    PROFILE_DIR=profiles
+    PROFILE_TOP_N=25             memory.txt satır sayısı
+    PROFILE_TRACEMALLOC_FRAMES=1 ayırma başına tutulan çerçeve (derinlik arttıkça maliyet artar)
+"""
+
+from __future__ import annotations
+
+import contextvars
+import json
+import os
+import random
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+_ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+# Yığın başına bu süreden (mikrosaniye) kısa dallar collapsed.txt'ye yazılmaz
+_MIN_US = 10.0
+_MAX_DEPTH = 128
+
+_active = threading.Lock()
+
+
+class _Collector:
+    """Profillenen isteğin diğer thread'lerdeki profiler'ları."""
+
+    def __init__(self) -> None:
+        self.owner = threading.get_ident()
+        self._lock = threading.Lock()
+        self._profilers: List[Any] = []
+        self._closed = False
+
+    def add(self, profiler) -> None:
+        with self._lock:
+            if not self._closed:
+                self._profilers.append(profiler)
+
+    def close(self) -> List[Any]:
+        with self._lock:
+            self._closed = True
+            return list(self._profilers)
+
+
+_collector: contextvars.ContextVar[Optional[_Collector]] = contextvars.ContextVar("profile_collector", default=None)
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, "").strip() or default)
+    except ValueError:
+        return default
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, "").strip() or default)
+    except ValueError:
+        return default
+
+
+def sample_rate() -> float:
+    return min(max(_env_float("PROFILE_SAMPLE_RATE", 0.0), 0.0), 1.0)
+
+
+def profile_dir() -> str:
+    path = os.getenv("PROFILE_DIR", "").strip() or "profiles"
+    return path if os.path.isabs(path) else os.path.join(_ROOT_DIR, path)
+
+
+def should_profile(force: bool = False) -> bool:
+    if force:
+        return True
+    rate = sample_rate()
+    return rate > 0 and random.random() < rate
+
+
+# ----------------------------
+# Çıktılar
+# ----------------------------
+
+def _label(func: Tuple[str, int, str]) -> str:
+    filename, line, name = func
+    if filename == "~":  # builtin
+        return name.replace(";", ":")
+    rel = os.path.relpath(filename, _ROOT_DIR) if filename.startswith(_ROOT_DIR) else os.path.basename(filename)
+    return f"{name} ({rel}:{line})".replace(";", ":")
+
+
+def collapsed_stacks(stats: Dict[Any, Any]) -> List[str]:
+    """
+    pstats verisinden katlanmış yığınlar. cProfile örnekleyici değildir: her
+    fonksiyonun kümülatif süresi, caller->callee kenarlarındaki payına göre
+    yığınlara dağıtılır (yaklaşık ama flamegraph için yeterli).
+    """
+    children: Dict[Any, List[Tuple[Any, float]]] = {}
+    for func, (_, _, _, _, callers) in stats.items():
+        for caller, (_, _, _, ct) in callers.items():
+            children.setdefault(caller, []).append((func, ct))
+
+    lines: Dict[str, float] = {}
+
+    def walk(func, path: Tuple[str, ...], on_path: frozenset, budget: float) -> None:
+        _, _, tt, ct, _ = stats[func]
+        share = budget / ct if ct > 0 else 0.0
+        stack = path + (_label(func),)
+        self_us = tt * share * 1e6
+        if self_us >= _MIN_US:
+            key = ";".join(stack)
+            lines[key] = lines.get(key, 0.0) + self_us
+        if len(stack) >= _MAX_DEPTH:
+            return
+        for child, edge_ct in children.get(func, ()):
+            if child in on_path or child not in stats:
+                continue  # özyineleme: süre zaten üst çerçevede sayıldı
+            child_budget = edge_ct * share
+            if child_budget * 1e6 >= _MIN_US:
+                walk(child, stack, on_path | {child}, child_budget)
+
+    roots = [f for f, (_, _, _, _, callers) in stats.items() if not callers]
+    for root in roots:
+        walk(root, (), frozenset([root]), stats[root][3])
+
+    return [f"{stack} {int(round(us))}" for stack, us in sorted(lines.items()) if us >= _MIN_US]
+
+
+def _top_allocations(before, after, top_n: int) -> List[str]:
+    import tracemalloc
+
+    # tracemalloc'un kendi ayırmaları (snapshot'lar) sonuçta görünmesin
+    own = (tracemalloc.Filter(False, tracemalloc.__file__),)
+    diff = after.filter_traces(own).compare_to(before.filter_traces(own), "lineno")
+    return [str(stat) for stat in diff[:top_n]]
+
+
+def _dump(out_dir: str, profiler, before, after, meta: Dict[str, Any], extra: Optional[List[Any]] = None) -> None:
+    import pstats
+
+    os.makedirs(out_dir, exist_ok=True)
+    merged = pstats.Stats(profiler)
+    for p in extra or ():
+        merged.add(p)  # diğer thread'lerin profilleri
+    merged.dump_stats(os.path.join(out_dir, "profile.pstats"))
+    with open(os.path.join(out_dir, "collapsed.txt"), "w", encoding="utf-8") as f:
+        f.write("\n".join(collapsed_stacks(merged.stats)) + "\n")  # type: ignore[attr-defined]
+    if after is not None:
+        with open(os.path.join(out_dir, "memory.txt"), "w", encoding="utf-8") as f:
+            f.write("\n".join(_top_allocations(before, after, _env_int("PROFILE_TOP_N", 25))) + "\n")
+    with open(os.path.join(out_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2, default=str)
+
+
+# ----------------------------
+# Public API
+# ----------------------------
+
+def profiled_call(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """
+    İsteğin işini başka bir thread'de yürüten yerler için (copy_context + ctx.run
+    içinde çağrılır). İstek profilleniyorsa bu thread'in süresi de profile eklenir.
+    """
+    collector = _collector.get()
+    if collector is None or collector.owner == threading.get_ident():
+        # Profil yok ya da aynı thread (ana profiler zaten izliyor; ikinci profiler onu ezerdi)
+        return fn(*args, **kwargs)
+
+    import cProfile
+
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        return fn(*args, **kwargs)
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        profiler.disable()
+        collector.add(profiler)
+
+
+@contextmanager
+def profile_request(name: str, force: bool = False, **attrs: Any) -> Iterator[Optional[str]]:
+    """
+    İstek örneklenirse bloğu profiller; çıktı dizinini (örneklenmediyse None) verir.
+    Profil yazılamazsa istek bozulmaz, sadece uyarı basılır.
+    """
+    if not should_profile(force) or not _active.acquire(blocking=False):
+        yield None
+        return
+
+    import cProfile
+    import tracemalloc
+
+    out_dir = os.path.join(
+        profile_dir(),
+        f"{time.strftime('%Y%m%d-%H%M%S')}-{name.replace('/', '_')}-{os.getpid()}-{secrets.token_hex(3)}",
+    )
+    started_tracing = not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start(max(_env_int("PROFILE_TRACEMALLOC_FRAMES", 1), 1))
+    tracemalloc.reset_peak()
+    before = tracemalloc.take_snapshot()
+
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # Süreçte başka bir profiler (ör. debugger / harici araç) etkin
+        if started_tracing:
+            tracemalloc.stop()
+        _active.release()
+        yield None
+        return
+
+    after = None
+    collector = _Collector()
+    token = _collector.set(collector)
+    t0 = time.perf_counter()
+    try:
+        try:
+            yield out_dir
+        finally:
+            profiler.disable()
+            _collector.reset(token)
+            extra = collector.close()
+            elapsed = time.perf_counter() - t0
+            peak = None
+            try:
+                after = tracemalloc.take_snapshot()
+                peak = tracemalloc.get_traced_memory()[1]
+            finally:
+                if started_tracing:
+                    tracemalloc.stop()
+            try:
+                _dump(out_dir, profiler, before, after, {
+                    "name": name,
+                    "pid": os.getpid(),
+                    "started_at": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(time.time() - elapsed)),
+                    "elapsed_ms": round(elapsed * 1000.0, 2),
+                    "peak_traced_bytes": peak,
+                    "sample_rate": sample_rate(),
+                    "forced": bool(force),
+                    "threads": 1 + len(extra),
+                    "attrs": attrs,
+                }, extra)
+                print(f"🔬 [profile] {name}: {elapsed * 1000.0:.0f} ms -> {out_dir}")
+            except Exception as e:
+                print(f"⚠️ [profile] {name} profili yazılamadı: {e}")
+    finally:
+        _active.release()
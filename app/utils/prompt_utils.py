@@ -1,6 +1,7 @@
 from __future__ import annotations
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
 import json
+import os
 
 
 # --- Legacy promptlar (KALSIN) ---
@@ -60,53 +61,211 @@ def build_system_prompt() -> str:
     )
 
 
+# --- Kompakt aday kodlayıcı (token bütçeli) ---
+# Adaylar JSON yerine '|' ayrılmış tablo olarak gönderilir; sadece modelin
+# ihtiyaç duyduğu alanlar, kısa başlıklarla. `gerekce` gönderilmez (profil ipucu
+# zaten prompt'ta bir kez var), tekrar eden açıklamalar '^<id>' ile referanslanır.
+
+HOTEL_PROMPT_FIELDS: List[Tuple[str, str]] = [
+    ("id", "id"),
+    ("isim", "ad"),
+    ("fiyat_gece", "fiyat"),
+    ("puan", "puan"),
+    ("skor", "skor"),
+]
+FOOD_PROMPT_FIELDS: List[Tuple[str, str]] = [
+    ("id", "id"),
+    ("isim", "ad"),
+    ("mutfak_turu", "mutfak"),
+    ("puan", "puan"),
+]
+DESC_FIELD = "konum_aciklama"
+
+# Bir prompt için toplam (yaklaşık) input token bütçesi
+DEFAULT_PROMPT_TOKEN_BUDGET = 1200
+# Sabit metin bütçeyi yese bile adaylara en az bu kadar yer bırak
+MIN_CANDIDATE_TOKENS = 64
+
+
+def prompt_token_budget() -> int:
+    try:
+        return max(int(os.getenv("LLM_PROMPT_TOKEN_BUDGET", "")), MIN_CANDIDATE_TOKENS)
+    except ValueError:
+        return DEFAULT_PROMPT_TOKEN_BUDGET
+
+
+def estimate_tokens(text: str) -> int:
+    """Kaba tahmin: ~4 karakter = 1 token (bütçe kontrolü için yeterli)."""
+    return (len(text or "") + 3) // 4
+
+
+def _cell(v: Any) -> str:
+    if v is None:
+        return "-"
+    s = f"{v:g}" if isinstance(v, float) else str(v)
+    return " ".join(s.replace("|", "/").split())
+
+
+def _truncate(s: str, max_chars: int) -> str:
+    if len(s) <= max_chars:
+        return s
+    if max_chars <= 1:
+        return ""
+    return s[: max_chars - 1].rstrip() + "…"
+
+
+def _desc_cap(lengths: List[int], budget_chars: int) -> int:
+    """
+    Açıklamalara ortak bir karakter tavanı bulur (kısa olanlar aynen kalır,
+    artan bütçe uzunlara eşit paylaştırılır).
+    """
+    remaining = max(budget_chars, 0)
+    ordered = sorted(lengths)
+    for idx, n in enumerate(ordered):
+        share = remaining // (len(ordered) - idx)
+        if n > share:
+            return share
+        remaining -= n
+    return ordered[-1] if ordered else 0
+
+
+def encode_candidates_compact(
+    candidates: List[Dict[str, Any]],
+    fields: List[Tuple[str, str]],
+    desc_field: Optional[str] = DESC_FIELD,
+    token_budget: Optional[int] = None,
+) -> str:
+    """
+    Adayları kompakt tabloya çevirir:
+        id|ad|fiyat|puan|skor|acik
+        1|Deniz Manzaralı Otel|1200|4.5|92.3|Denize yakın…
+    Bütçe aşılırsa önce açıklamalar kısaltılır, yetmezse sondaki adaylar atılır
+    (adaylar zaten skor sırasında geldiği için en zayıflar düşer).
+    """
+    budget_chars = (token_budget if token_budget is not None else prompt_token_budget()) * 4
+
+    header = "|".join([short for _, short in fields] + (["acik"] if desc_field else []))
+    used = len(header)
+
+    rows: List[List[str]] = []
+    descs: List[str] = []
+    first_by_desc: Dict[str, str] = {}
+
+    for c in candidates:
+        cells = [_cell(c.get(key)) for key, _ in fields]
+        row_len = sum(len(x) for x in cells) + len(cells) + 1  # ayraçlar + satır sonu
+        if rows and used + row_len > budget_chars:
+            break
+        used += row_len
+        rows.append(cells)
+
+        if desc_field:
+            desc = _cell(c.get(desc_field) or "")
+            cid = cells[0]
+            if desc and desc in first_by_desc:
+                desc = f"^{first_by_desc[desc]}"
+            elif desc:
+                first_by_desc[desc] = cid
+            descs.append(desc)
+
+    if desc_field:
+        cap = _desc_cap([len(d) for d in descs], budget_chars - used)
+        for cells, desc in zip(rows, descs):
+            cells.append(desc if desc.startswith("^") else _truncate(desc, cap))
+
+    return "\n".join([header] + ["|".join(cells) for cells in rows])
+
+
+def _fit_candidates(head: str, tail: str, encode) -> str:
+    """
+    Sabit prompt metnini (head + tail) bütçeden düşüp kalanını aday tablosuna
+    verir; tablo ikisinin arasına konur. Yer tutucu + replace kullanılmaz:
+    head kullanıcı metnini içerir ve "{candidates}" yazan bir istek tabloyu
+    kendi içine çekebilirdi.
+    """
+    fixed = estimate_tokens(head) + estimate_tokens(tail)
+    cand_budget = max(prompt_token_budget() - fixed, MIN_CANDIDATE_TOKENS)
+    return f"{head}\n{encode(cand_budget)}\n\n{tail}"
+
+
 def build_hotel_prompt_json(user_context: str, candidates: List[Dict[str, Any]], profile_hint: str) -> str:
-    return f"""
+    head = f"""
 Kullanıcı isteği:
 {user_context}
 
 Profil ipucu:
 {profile_hint}
 
-Otel adayları (JSON):
-{json.dumps(candidates, ensure_ascii=False)}
-
+Otel adayları ('|' ayrılmış tablo; acik='^N' ise id=N ile aynı açıklama):
+""".strip()
+    tail = """
 SADECE şu JSON formatında cevap ver:
-{{
+{
   "hotels": [
-    {{"otel_id": 123, "skor": 87, "kisa_gerekce": "..." }}
+    {"otel_id": 123, "skor": 87, "kisa_gerekce": "..." }
   ]
-}}
+}
 
 Kurallar:
 - 3-5 otel seç.
 - otel_id aday listesinde olmalı.
 - skor 0-100 arası integer olsun.
 """.strip()
+    return _fit_candidates(
+        head,
+        tail,
+        lambda budget: encode_candidates_compact(candidates, HOTEL_PROMPT_FIELDS, token_budget=budget),
+    )
 
 
 def build_food_prompt_json(food_context: str, hotel: Dict[str, Any], restaurants: List[Dict[str, Any]], profile_hint: str) -> str:
-    return f"""
+    hotel_compact = {k: hotel[k] for k in ("id", "isim", "sehir") if hotel.get(k) is not None}
+    head = f"""
 Yemek isteği:
 {food_context}
 
 Otel (JSON):
-{json.dumps(hotel, ensure_ascii=False)}
+{json.dumps(hotel_compact, ensure_ascii=False)}
 
 Profil ipucu:
 {profile_hint}
 
-Restoran adayları (JSON):
-{json.dumps(restaurants, ensure_ascii=False)}
-
+Restoran adayları ('|' ayrılmış tablo; acik='^N' ise id=N ile aynı açıklama):
+""".strip()
+    tail = """
 SADECE şu JSON formatında cevap ver:
-{{
+{
   "restaurants": [
-    {{"restoran_id": 11, "kisa_gerekce": "..." }}
+    {"restoran_id": 11, "kisa_gerekce": "..." }
   ]
-}}
+}
 
 Kurallar:
 - 1-3 restoran seç.
 - restoran_id aday listesinde olmalı.
+""".strip()
+    return _fit_candidates(
+        head,
+        tail,
+        lambda budget: encode_candidates_compact(restaurants, FOOD_PROMPT_FIELDS, token_budget=budget),
+    )
+
+
+def build_batch_prompt(tasks: List[Tuple[str, str]]) -> str:
+    """
+    Birden fazla bağımsız rerank görevini tek prompt'ta birleştirir (micro-batch).
+    tasks: [(etiket, görev prompt'u)]; cevap etiket => görevin kendi JSON cevabı.
+    """
+    sections = "\n\n".join(f'<gorev id="{tag}">\n{prompt}\n</gorev>' for tag, prompt in tasks)
+    example = ", ".join(f'"{tag}": {{...}}' for tag, _ in tasks[:2])
+    return f"""
+Aşağıda birbirinden BAĞIMSIZ {len(tasks)} görev var. Her görevi yalnızca kendi
+bölümündeki veriyle ve kendi kurallarına göre çöz; görevler arasında bilgi taşıma.
+
+{sections}
+
+SADECE şu JSON formatında cevap ver (her görev id'si için o görevin istediği JSON nesnesi):
+{{
+  "results": {{{example}}}
+}}
 """.strip()
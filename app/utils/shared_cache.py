@@ -0,0 +1,146 @@
+"""
+Süreçler arası paylaşılan anahtar/değer cache'i (yerel SQLite dosyası).
+
+Supervisor (çoklu Streamlit worker) ve API prefork modlarında her worker
+Places / LLM yanıtlarını kendi başına ısıtmasın diye tek bir dosya
+paylaşılır. WAL modu sayesinde okuyucular birbirini bloklamaz; yazma
+çakışmalarında busy_timeout kadar beklenir.
+
+    SHARED_CACHE_PATH=<dosya>   boş => kapalı (tek süreçte varsayılan)
+    PLACES_CACHE_TTL_S          Places yanıtları (varsayılan 86400)
+    LLM_CACHE_TTL_S             LLM yanıtları (varsayılan 3600)
+
+Cache hataları isteği asla bozmaz: okuma hatası => miss, yazma hatası => yok sayılır.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from app.utils.tracing import set_attrs
+
+DEFAULT_PATH = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "..", "db", "shared_cache.db")
+)
+
+_PURGE_EVERY = 256
+
+_local = threading.local()
+_stats_lock = threading.Lock()
+_stats: Dict[str, int] = {"hit": 0, "miss": 0, "put": 0, "error": 0}
+_puts_since_purge = 0
+
+
+def cache_path() -> str:
+    return os.getenv("SHARED_CACHE_PATH", "").strip()
+
+
+def cache_enabled() -> bool:
+    return bool(cache_path())
+
+
+def ensure_default_path() -> str:
+    """Çok süreçli modlar için: SHARED_CACHE_PATH boşsa varsayılan dosyayı seçer (child'lar env'i devralır)."""
+    if not cache_path():
+        os.environ["SHARED_CACHE_PATH"] = DEFAULT_PATH
+    return cache_path()
+
+
+def ttl_from_env(name: str, default_s: float) -> float:
+    try:
+        return float(os.getenv(name, "").strip() or default_s)
+    except ValueError:
+        return default_s
+
+
+def make_key(*parts: Any) -> str:
+    raw = json.dumps(parts, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def _conn() -> sqlite3.Connection:
+    # Bağlantı thread başına; fork sonrası ebeveynin bağlantısı kullanılmaz
+    path = cache_path()
+    conn = getattr(_local, "conn", None)
+    if conn is not None and _local.owner == (os.getpid(), path):
+        return conn
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    conn = sqlite3.connect(path, timeout=5.0, isolation_level=None, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode = WAL;")
+    conn.execute("PRAGMA synchronous = NORMAL;")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS cache (
+            ns TEXT NOT NULL,
+            k TEXT NOT NULL,
+            v TEXT NOT NULL,
+            expires_at REAL NOT NULL,
+            PRIMARY KEY (ns, k)
+        ) WITHOUT ROWID;
+    """)
+    _local.conn = conn
+    _local.owner = (os.getpid(), path)
+    return conn
+
+
+def _count(name: str) -> None:
+    with _stats_lock:
+        _stats[name] += 1
+
+
+def get(ns: str, key: str) -> Optional[Any]:
+    if not cache_enabled():
+        return None
+    try:
+        row = _conn().execute(
+            "SELECT v, expires_at FROM cache WHERE ns = ? AND k = ?", (ns, key)
+        ).fetchone()
+    except sqlite3.Error as e:
+        _count("error")
+        print(f"⚠️ [shared_cache] okuma hatası: {e}")
+        return None
+
+    if row is None or row[1] < time.time():
+        _count("miss")
+        set_attrs(shared_cache="miss")
+        return None
+    _count("hit")
+    set_attrs(shared_cache="hit")
+    return json.loads(row[0])
+
+
+def put(ns: str, key: str, value: Any, ttl_s: float) -> None:
+    global _puts_since_purge
+    if not cache_enabled() or ttl_s <= 0:
+        return
+    now = time.time()
+    try:
+        conn = _conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO cache (ns, k, v, expires_at) VALUES (?, ?, ?, ?)",
+            (ns, key, json.dumps(value, ensure_ascii=False), now + ttl_s),
+        )
+        _count("put")
+        with _stats_lock:
+            _puts_since_purge += 1
+            purge = _puts_since_purge >= _PURGE_EVERY
+            if purge:
+                _puts_since_purge = 0
+        if purge:
+            conn.execute("DELETE FROM cache WHERE expires_at < ?", (now,))
+    except (sqlite3.Error, TypeError, ValueError) as e:
+        _count("error")
+        print(f"⚠️ [shared_cache] yazma hatası: {e}")
+
+
+def cache_stats() -> Dict[str, Any]:
+    with _stats_lock:
+        out: Dict[str, Any] = dict(_stats)
+    out["path"] = cache_path() or None
+    return out
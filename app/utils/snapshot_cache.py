@@ -0,0 +1,60 @@
+"""
+Katalog snapshot'ına bağlı, süreç içi türetilmiş nesneler (indeksler) için tutucu.
+
+Katalog değişince (yeni mmap tablosu / CSV imzası) nesne yeniden kurulmalı.
+Kurulum tek uçuşludur (single-flight): aynı anda tek thread kurar; bu sırada
+gelen istekler önceki snapshot'ın nesnesiyle devam eder, sadece hiç nesne
+yoksa (soğuk başlangıç) kurulumu bekler. Yeni nesne hazır olunca tek atamayla
+yerine konur. catalog_watcher, değişiklikten sonra bu nesneleri kendi
+thread'inde ısıtır; istek thread'leri kurulum maliyetini görmez.
+"""
+
+from __future__ import annotations
+
+import threading
+from typing import Any, Callable, Generic, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class SnapshotCache(Generic[T]):
+    def __init__(self, build: Callable[[Any], T]):
+        self._build = build
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self._source: Any = None
+        self._value: Optional[T] = None
+
+    def _fresh(self, source: Any) -> bool:
+        # mmap tabloları kimlikle, CSV imzaları (tuple) eşitlikle karşılaştırılır
+        return self._value is not None and (self._source is source or self._source == source)
+
+    def get(self, source: Any) -> T:
+        """source snapshot'ının nesnesi; başka thread kuruyorsa önceki snapshot'ınki."""
+        with self._lock:
+            if self._fresh(source):
+                return self._value  # type: ignore[return-value]
+            stale = self._value
+
+        if not self._build_lock.acquire(blocking=stale is None):
+            return stale  # type: ignore[return-value]
+        try:
+            with self._lock:
+                if self._fresh(source):
+                    return self._value  # type: ignore[return-value]
+            value = self._build(source)
+            with self._lock:
+                self._source, self._value = source, value
+            return value
+        finally:
+            self._build_lock.release()
+
+    def warm(self, source: Any) -> None:
+        """Arka plan ısıtması (catalog_watcher): kurulum bitene kadar bekler."""
+        with self._build_lock:
+            with self._lock:
+                if self._fresh(source):
+                    return
+            value = self._build(source)
+            with self._lock:
+                self._source, self._value = source, value
@@ -0,0 +1,171 @@
+"""
+Heuristik sıralama ile LLM rerank yarışı.
+
+Heuristik sıralama (uygunluk_skoru / puan) hazırken LLM'i süresiz beklemek
+yerine rerank arka planda başlatılır; LLM sonucu LLM_RACE_BUDGET_MS içinde
+gelirse onu, gelmezse heuristik sonucu döneriz. Geç gelen LLM sonuçları
+atılır ama istatistiğe yazılır (bütçeyi ayarlamak için).
+
+Çağıran en fazla bütçe kadar bekler (bloklayan tasarım): API, batch ve CLI
+tek yanıt döner, sonradan değiştirilecek bir sonuç yok. Gecikmeyi sınırlayan
+bütçedir; LLM yavaşsa kullanıcı bütçe kadar bekleyip heuristiği görür.
+
+Geç çağrılar bitene kadar bir worker'ı tutar. Havuz kuyruklamaz: tüm
+worker'lar meşgulse (ör. takılmış upstream) yarış hiç başlatılmaz ve
+heuristik hemen döner (outcome=llm_skipped). Böylece yeni yarışlar geç
+çağrıların arkasında sıra bekleyip bütçelerini kuyrukta harcamaz.
+
+    LLM_SPECULATIVE=1        açar
+    LLM_RACE_BUDGET_MS=1500  yarış bütçesi (istek deadline'ı daha kısaysa o)
+    LLM_RACE_WORKERS=4       aynı anda süren en fazla LLM çağrısı (geç olanlar dahil)
+
+Sonuçlar:
+- race_stats(): süreç içi sayaçlar + LLM gecikme yüzdelikleri
+- LLM_RACE_LOG=<dosya>: her yarış sonucu bir JSONL satırı
+"""
+
+from __future__ import annotations
+
+import contextvars
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.utils.deadline import remaining
+from app.utils.profiling import profiled_call
+from app.utils.tracing import set_attrs
+
+_executor: Optional[ThreadPoolExecutor] = None
+_slots: Optional[threading.BoundedSemaphore] = None
+_executor_lock = threading.Lock()
+
+_stats_lock = threading.Lock()
+_stats: Dict[str, Any] = {"outcomes": {}, "llm_latency_ms": []}
+_MAX_LATENCY_SAMPLES = 1000
+
+
+def speculative_enabled() -> bool:
+    return os.getenv("LLM_SPECULATIVE", "").strip().lower() in ("1", "true", "yes", "on")
+
+
+def race_budget_s() -> float:
+    try:
+        budget = float(os.getenv("LLM_RACE_BUDGET_MS", "").strip() or 1500) / 1000.0
+    except ValueError:
+        budget = 1.5
+    rem = remaining()
+    return max(0.0, min(budget, rem)) if rem is not None else budget
+
+
+def _get_executor() -> Tuple[ThreadPoolExecutor, threading.BoundedSemaphore]:
+    """Havuz + worker sayısı kadar slot; slot alınamazsa iş kuyruğa girmez."""
+    global _executor, _slots
+    with _executor_lock:
+        if _executor is None:
+            try:
+                workers = max(int(os.getenv("LLM_RACE_WORKERS", "").strip() or 4), 1)
+            except ValueError:
+                workers = 4
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="llm-race")
+            _slots = threading.BoundedSemaphore(workers)
+        return _executor, _slots  # type: ignore[return-value]
+
+
+def _record(name: str, outcome: str, llm_ms: Optional[float], budget_s: float) -> None:
+    with _stats_lock:
+        key = f"{name}:{outcome}"
+        _stats["outcomes"][key] = _stats["outcomes"].get(key, 0) + 1
+        if llm_ms is not None:
+            lat = _stats["llm_latency_ms"]
+            lat.append(llm_ms)
+            if len(lat) > _MAX_LATENCY_SAMPLES:
+                del lat[: len(lat) - _MAX_LATENCY_SAMPLES]
+
+    log_path = os.getenv("LLM_RACE_LOG", "").strip()
+    if log_path:
+        line = json.dumps({
+            "ts": round(time.time(), 3),
+            "name": name,
+            "outcome": outcome,
+            "llm_ms": None if llm_ms is None else round(llm_ms, 1),
+            "budget_ms": round(budget_s * 1000.0, 1),
+        })
+        try:
+            with _stats_lock, open(log_path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+        except OSError:
+            pass
+
+
+def race_stats() -> Dict[str, Any]:
+    with _stats_lock:
+        outcomes = dict(_stats["outcomes"])
+        lat = sorted(_stats["llm_latency_ms"])
+
+    def pct(q: float) -> Optional[float]:
+        if not lat:
+            return None
+        return round(lat[min(int(q * len(lat)), len(lat) - 1)], 1)
+
+    return {"outcomes": outcomes, "llm_p50_ms": pct(0.5), "llm_p90_ms": pct(0.9), "llm_p99_ms": pct(0.99)}
+
+
+def race_rerank(
+    name: str,
+    heuristic: List[Dict[str, Any]],
+    rerank: Callable[[], List[Dict[str, Any]]],
+    budget_s: Optional[float] = None,
+) -> Tuple[List[Dict[str, Any]], str]:
+    """
+    rerank() arka planda çalışır; çağıran en fazla budget_s bekler, bu sürede boş
+    olmayan sonuç dönerse o kullanılır. Dönüş: (liste, outcome) — outcome:
+    llm_won | llm_empty | llm_error | llm_late | llm_skipped (bütçe yok / havuz dolu)
+    """
+    budget = race_budget_s() if budget_s is None else budget_s
+    executor, slots = _get_executor()
+    if budget <= 0 or not slots.acquire(blocking=False):
+        _record(name, "llm_skipped", None, budget)
+        set_attrs(race="llm_skipped")
+        return heuristic, "llm_skipped"
+
+    t0 = time.perf_counter()
+    ctx = contextvars.copy_context()  # tracing/deadline bağlamı thread'e taşınsın
+
+    def _timed():
+        try:
+            out = ctx.run(profiled_call, rerank)
+            return out, (time.perf_counter() - t0) * 1000.0
+        finally:
+            slots.release()
+
+    try:
+        fut = executor.submit(_timed)
+    except RuntimeError:  # yorumlayıcı kapanıyor
+        slots.release()
+        return heuristic, "llm_skipped"
+    try:
+        llm_ranked, llm_ms = fut.result(timeout=budget)
+    except FutureTimeout:
+        def _late(f):
+            try:
+                res, ms = f.result()
+                _record(name, "late_ok" if res else "late_empty", ms, budget)
+            except Exception:
+                _record(name, "late_error", None, budget)
+
+        fut.add_done_callback(_late)
+        _record(name, "llm_late", None, budget)
+        set_attrs(race="llm_late", race_budget_ms=round(budget * 1000.0, 1))
+        return heuristic, "llm_late"
+    except Exception:
+        _record(name, "llm_error", None, budget)
+        set_attrs(race="llm_error")
+        return heuristic, "llm_error"
+
+    outcome = "llm_won" if llm_ranked else "llm_empty"
+    _record(name, outcome, llm_ms, budget)
+    set_attrs(race=outcome, race_llm_ms=round(llm_ms, 1))
+    return (llm_ranked or heuristic), outcome
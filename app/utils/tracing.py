@@ -0,0 +1,268 @@
+"""
+Hafif span enstrümantasyonu.
+
+Kullanım:
+    with span("hotel.filter", sehir=sehir) as sp:
+        ...
+        sp.set(candidates=len(df))
+
+    @traced("db.insert_feedback")
+    def insert_feedback(...): ...
+
+Exporter env ile seçilir (TRACE_EXPORTER):
+- none (varsayılan): span'ler ölçülür ama hiçbir yere yazılmaz
+- stdout: her span tek satır JSON olarak basılır
+- jsonl: TRACE_FILE (varsayılan: traces.jsonl) dosyasına eklenir
+- prometheus: TRACE_PROM_HOST:TRACE_PROM_PORT/metrics (varsayılan localhost:9464)
+  üzerinden Prometheus text formatında özet sunulur
+"""
+
+from __future__ import annotations
+
+import contextvars
+import functools
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterator, List, Optional, Protocol
+
+
+class Span:
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "start_ts", "duration_ms", "status", "attrs")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], attrs: Dict[str, Any]):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.start_ts = time.time()
+        self.duration_ms = 0.0
+        self.status = "ok"
+        self.attrs = attrs
+
+    def set(self, **attrs: Any) -> None:
+        self.attrs.update(attrs)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_ts": round(self.start_ts, 6),
+            "duration_ms": round(self.duration_ms, 3),
+            "status": self.status,
+            "attrs": self.attrs,
+        }
+
+
+class SpanExporter(Protocol):
+    def export(self, span: Span) -> None:
+        ...
+
+
+# ----------------------------
+# Exporter'lar
+# ----------------------------
+
+class NullExporter:
+    def export(self, span: Span) -> None:
+        return None
+
+
+class StdoutExporter:
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+        self._lock = threading.Lock()
+
+    def export(self, span: Span) -> None:
+        line = json.dumps(span.to_dict(), ensure_ascii=False, default=str)
+        with self._lock:
+            self.stream.write(line + "\n")
+            self.stream.flush()
+
+
+class JsonlExporter:
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, span: Span) -> None:
+        line = json.dumps(span.to_dict(), ensure_ascii=False, default=str)
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+
+class PrometheusExporter:
+    """
+    Span'leri isim bazında histogram olarak toplar ve /metrics altında sunar.
+    Sunucu daemon thread'de çalışır; süreç kapanınca kendiliğinden biter.
+    """
+
+    BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+    def __init__(self, host: str = "localhost", port: int = 9464, serve: bool = True):
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, Any]] = {}
+        self._server: Optional[ThreadingHTTPServer] = None
+        if serve:
+            self._start_server(host, port)
+
+    def export(self, span: Span) -> None:
+        with self._lock:
+            st = self._stats.get(span.name)
+            if st is None:
+                st = {"count": 0, "errors": 0, "sum_ms": 0.0, "buckets": [0] * len(self.BUCKETS_MS)}
+                self._stats[span.name] = st
+            st["count"] += 1
+            st["sum_ms"] += span.duration_ms
+            if span.status != "ok":
+                st["errors"] += 1
+            for i, b in enumerate(self.BUCKETS_MS):
+                if span.duration_ms <= b:
+                    st["buckets"][i] += 1
+
+    def render(self) -> str:
+        lines: List[str] = [
+            "# HELP app_span_duration_seconds Span süresi (saniye)",
+            "# TYPE app_span_duration_seconds histogram",
+        ]
+        with self._lock:
+            items = sorted(self._stats.items())
+            for name, st in items:
+                for b, n in zip(self.BUCKETS_MS, st["buckets"]):
+                    lines.append(f'app_span_duration_seconds_bucket{{span="{name}",le="{b / 1000:g}"}} {n}')
+                lines.append(f'app_span_duration_seconds_bucket{{span="{name}",le="+Inf"}} {st["count"]}')
+                lines.append(f'app_span_duration_seconds_sum{{span="{name}"}} {st["sum_ms"] / 1000:.6f}')
+                lines.append(f'app_span_duration_seconds_count{{span="{name}"}} {st["count"]}')
+            lines.append("# HELP app_span_errors_total Hata ile biten span sayısı")
+            lines.append("# TYPE app_span_errors_total counter")
+            for name, st in items:
+                lines.append(f'app_span_errors_total{{span="{name}"}} {st["errors"]}')
+        return "\n".join(lines) + "\n"
+
+    def _start_server(self, host: str, port: int) -> None:
+        exporter = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.rstrip("/") != "/metrics":
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                body = exporter.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):  # erişim logunu sustur
+                return
+
+        try:
+            self._server = ThreadingHTTPServer((host, port), _Handler)
+        except OSError as e:
+            # Port doluysa (ör. ikinci worker) toplamaya devam et, sunma
+            print(f"⚠️ Prometheus exporter başlatılamadı ({host}:{port}): {e}")
+            return
+        t = threading.Thread(target=self._server.serve_forever, name="trace-prometheus", daemon=True)
+        t.start()
+
+
+# ----------------------------
+# Global exporter + aktif span
+# ----------------------------
+
+_exporter: Optional[SpanExporter] = None
+_exporter_lock = threading.Lock()
+_current: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("current_span", default=None)
+
+
+def _exporter_from_env() -> SpanExporter:
+    kind = os.getenv("TRACE_EXPORTER", "none").strip().lower()
+    if kind == "stdout":
+        return StdoutExporter()
+    if kind == "jsonl":
+        return JsonlExporter(os.getenv("TRACE_FILE", "traces.jsonl").strip() or "traces.jsonl")
+    if kind == "prometheus":
+        host = os.getenv("TRACE_PROM_HOST", "localhost").strip() or "localhost"
+        port = int(os.getenv("TRACE_PROM_PORT", "9464").strip() or "9464")
+        return PrometheusExporter(host, port)
+    return NullExporter()
+
+
+def get_exporter() -> SpanExporter:
+    global _exporter
+    if _exporter is None:
+        with _exporter_lock:
+            if _exporter is None:
+                _exporter = _exporter_from_env()
+    return _exporter
+
+
+def set_exporter(exporter: Optional[SpanExporter]) -> None:
+    """Exporter'ı programatik olarak değiştirir (None => env'den yeniden seç)."""
+    global _exporter
+    with _exporter_lock:
+        _exporter = exporter
+
+
+def current_span() -> Optional[Span]:
+    return _current.get()
+
+
+@contextmanager
+def span(name: str, **attrs: Any) -> Iterator[Span]:
+    parent = _current.get()
+    sp = Span(
+        name=name,
+        trace_id=parent.trace_id if parent else uuid.uuid4().hex,
+        parent_id=parent.span_id if parent else None,
+        attrs=attrs,
+    )
+    token = _current.set(sp)
+    t0 = time.perf_counter()
+    try:
+        yield sp
+    except BaseException as e:
+        sp.status = "error"
+        sp.attrs["error"] = type(e).__name__
+        raise
+    finally:
+        sp.duration_ms = (time.perf_counter() - t0) * 1000.0
+        _current.reset(token)
+        try:
+            get_exporter().export(sp)
+        except Exception:
+            # Trace yazılamaması isteği asla bozmamalı
+            pass
+
+
+def traced(name: Optional[str] = None) -> Callable:
+    """Fonksiyonu bir span ile sarar (span adı varsayılan: modül.fonksiyon)."""
+
+    def deco(fn: Callable) -> Callable:
+        span_name = name or f"{fn.__module__.rsplit('.', 1)[-1]}.{fn.__name__}"
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(span_name):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return deco
+
+
+def set_attrs(**attrs: Any) -> None:
+    """Aktif span'e attribute ekler (aktif span yoksa no-op)."""
+    sp = _current.get()
+    if sp is not None:
+        sp.attrs.update(attrs)
@@ -0,0 +1,87 @@
+"""
+Batch checkpoint / resume kontrolü (boş satırlı girdi ile).
+
+- Tam çalıştırma sonrası filigran (done_upto) son satıra ulaşmalı, extra boş kalmalı
+  (boş satırlar filigranı durdurmamalı)
+- Çökme benzetimi (çıktının yarısı, checkpoint kayıp) sonrası resume sadece
+  eksik satırları işlemeli; her satır çıktıda tam bir kez olmalı
+
+Çalıştırma:
+    python -m benchmarks.batch_resume_check
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import List
+
+REQUEST = {"user": "check", "sehir": "Antalya", "max_fiyat": 3000, "min_puan": 4.0}
+
+# 1, 3, 5, 6 dolu; 2, 4, 7 boş (sondaki dahil)
+INPUT_LINES = [json.dumps(REQUEST), "", json.dumps(REQUEST), "   ", json.dumps(REQUEST), json.dumps(REQUEST), ""]
+EXPECTED_LINES = [1, 3, 5, 6]
+
+
+def _output_lines(path: str) -> List[int]:
+    with open(path, encoding="utf-8") as f:
+        return sorted(json.loads(line)["line"] for line in f if line.strip())
+
+
+def main() -> int:
+    from app.services.batch_service import Checkpoint, run_batch
+    from app.utils import db_utils
+
+    tmp = tempfile.mkdtemp(prefix="batch_resume_")
+    db_utils.DB_PATH = Path(tmp) / "app.db"  # worker'lar fork ile devralır
+    db_utils.init_db()
+
+    input_path = os.path.join(tmp, "in.jsonl")
+    output_path = os.path.join(tmp, "out.jsonl")
+    with open(input_path, "w", encoding="utf-8") as f:
+        f.write("\n".join(INPUT_LINES) + "\n")
+
+    failures: List[str] = []
+
+    # 1) Tam çalıştırma
+    stats = run_batch(input_path, output_path, workers=2, resume=False)
+    ckpt = Checkpoint(f"{output_path}.ckpt")
+    ckpt.load()
+    if ckpt.done_upto != len(INPUT_LINES) or ckpt.extra:
+        failures.append(f"filigran: done_upto={ckpt.done_upto} extra={sorted(ckpt.extra)} (beklenen {len(INPUT_LINES)}, [])")
+    if _output_lines(output_path) != EXPECTED_LINES or stats["ok"] != len(EXPECTED_LINES):
+        failures.append(f"tam çalıştırma: satırlar={_output_lines(output_path)} stats={stats}")
+
+    # 2) Çökme benzetimi: çıktıda ilk iki kayıt, checkpoint yok
+    with open(output_path, encoding="utf-8") as f:
+        kept = [line for line in f if json.loads(line)["line"] in EXPECTED_LINES[:2]]
+    with open(output_path, "w", encoding="utf-8") as f:
+        f.writelines(kept)
+    os.remove(ckpt.path)
+
+    stats = run_batch(input_path, output_path, workers=2, resume=True)
+    if stats["ok"] != len(EXPECTED_LINES) - 2:
+        failures.append(f"resume {len(EXPECTED_LINES) - 2} satır işlemeliydi: stats={stats}")
+    if _output_lines(output_path) != EXPECTED_LINES:
+        failures.append(f"resume sonrası satırlar: {_output_lines(output_path)}")
+    ckpt.load()
+    if ckpt.done_upto != len(INPUT_LINES) or ckpt.extra:
+        failures.append(f"resume filigranı: done_upto={ckpt.done_upto} extra={sorted(ckpt.extra)}")
+
+    # 3) Tekrar resume: her şey atlanmalı
+    stats = run_batch(input_path, output_path, workers=2, resume=True)
+    if stats["ok"] != 0:
+        failures.append(f"ikinci resume hiçbir şey işlememeliydi: stats={stats}")
+
+    if failures:
+        for msg in failures:
+            print(f"❌ {msg}")
+        return 1
+    print("✅ batch resume: boş satırlar filigranı durdurmuyor, resume sadece eksikleri işliyor")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
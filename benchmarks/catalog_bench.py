@@ -0,0 +1,319 @@
+"""
+Katalog filtreleme / sıralama sıcak yolları için mikro-benchmark.
+
+Sentetik otel.csv + restoran.csv (şehir ve mutfak dağılımı Zipf benzeri, yani
+birkaç büyük şehir/mutfak verinin çoğunu tutar) üretir, agent fonksiyonlarını
+bu kataloglara yönlendirir ve her fonksiyon için gecikme yüzdeliklerini
+(p50/p90/p99) + tepe bellek kullanımını ölçer.
+
+Her boyut iki yoldan ölçülür: `csv` (CATALOG_BINARY=off, pandas) ve `mmap`
+(sentetik CSV'ler için geçici bir CATALOG_BIN_DIR'e üretilen ikili katalog).
+Sonuçlar "<boyut>/<yol>" anahtarlarıyla yazılır.
+
+Çalıştırma:
+    python -m benchmarks.catalog_bench --sizes 1000,100000,1000000 --out bench.json
+    python -m benchmarks.catalog_bench --sizes 1000 --compare bench.json --threshold 0.2
+    python -m benchmarks.catalog_bench --sizes 100000 --backends mmap
+
+--compare verilirse p50 değerleri eski sonuçla kıyaslanır; eşik üstü yavaşlama
+varsa çıkış kodu 1 olur (CI'da regresyon yakalamak için).
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.agents import food_agent, hotel_agent
+from app.utils import binary_catalog
+from app.utils.text_utils import normalize_text
+
+
+SEHIRLER = [
+    "İstanbul", "Antalya", "İzmir", "Muğla", "Ankara", "Bursa", "Nevşehir", "Trabzon",
+    "Çanakkale", "Eskişehir", "Gaziantep", "Mardin", "Rize", "Kapadokya", "Bodrum",
+    "Fethiye", "Kaş", "Alanya", "Sapanca", "Şanlıurfa",
+]
+MUTFAKLAR = [
+    "Türk Mutfağı", "Deniz Ürünleri", "Kebap", "Ev Yemekleri", "Steakhouse", "İtalyan",
+    "Vegan", "Kahvaltı", "Meyhane", "Uzak Doğu", "Fast Food", "Ege Mutfağı",
+]
+ACIKLAMALAR = [
+    "Denize yakın, sahile yürüme mesafesi",
+    "Şehir merkezinde, iş seyahati için uygun",
+    "Çocuklu aileler için ideal, her şey dahil",
+    "Temel ihtiyaçlar için yeterli, ekonomik",
+    "Tarihi yarımadaya yakın, butik konsept",
+]
+
+DEFAULT_SIZES = [1_000, 100_000, 1_000_000]
+BACKENDS = ("csv", "mmap")
+
+
+def _zipf_weights(n: int, s: float = 1.1) -> List[float]:
+    return [1.0 / ((i + 1) ** s) for i in range(n)]
+
+
+# ----------------------------
+# Sentetik katalog
+# ----------------------------
+
+def generate_catalogs(n_rows: int, out_dir: str, seed: int = 42) -> Tuple[str, str]:
+    """
+    n_rows otel + n_rows restoran üretir. Restoranlar aynı şehirdeki 1-3 otele
+    `otellere_yakin_ids` ile bağlanır (gerçek CSV ile aynı şema).
+    """
+    rnd = random.Random(seed)
+    city_w = _zipf_weights(len(SEHIRLER))
+    cuisine_w = _zipf_weights(len(MUTFAKLAR))
+
+    hotel_path = os.path.join(out_dir, f"otel_{n_rows}.csv")
+    rest_path = os.path.join(out_dir, f"restoran_{n_rows}.csv")
+
+    hotels_by_city: Dict[str, List[int]] = {c: [] for c in SEHIRLER}
+    hotel_cities = rnd.choices(SEHIRLER, weights=city_w, k=n_rows)
+
+    with open(hotel_path, "w", encoding="utf-8", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(["id", "isim", "sehir", "fiyat_gece", "puan", "mesafe_merkez_km", "konum_aciklama"])
+        for i, city in enumerate(hotel_cities, start=1):
+            hotels_by_city[city].append(i)
+            w.writerow([
+                i,
+                f"Otel {i}",
+                city,
+                rnd.randrange(300, 20_000, 50),
+                round(rnd.uniform(2.5, 5.0), 1),
+                round(rnd.uniform(0.1, 25.0), 1),
+                rnd.choice(ACIKLAMALAR),
+            ])
+
+    rest_cities = rnd.choices(SEHIRLER, weights=city_w, k=n_rows)
+    rest_cuisines = rnd.choices(MUTFAKLAR, weights=cuisine_w, k=n_rows)
+
+    with open(rest_path, "w", encoding="utf-8", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(["id", "isim", "sehir", "mutfak_turu", "fiyat_seviye", "puan", "otellere_yakin_ids", "konum_aciklama"])
+        for i, (city, cuisine) in enumerate(zip(rest_cities, rest_cuisines), start=1):
+            pool = hotels_by_city[city] or [1]
+            near = sorted({rnd.choice(pool) for _ in range(rnd.randint(1, 3))})
+            w.writerow([
+                i,
+                f"Restoran {i}",
+                city,
+                cuisine,
+                rnd.randint(1, 4),
+                round(rnd.uniform(2.5, 5.0), 1),
+                ",".join(str(x) for x in near),
+                rnd.choice(ACIKLAMALAR),
+            ])
+
+    return hotel_path, rest_path
+
+
+# ----------------------------
+# Ölçüm
+# ----------------------------
+
+def _percentile(sorted_vals: List[float], q: float) -> float:
+    if not sorted_vals:
+        return 0.0
+    k = (len(sorted_vals) - 1) * q
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_vals) - 1)
+    return sorted_vals[lo] + (sorted_vals[hi] - sorted_vals[lo]) * (k - lo)
+
+
+def measure(fn: Callable[[], Any], repeat: int, warmup: int = 1) -> Dict[str, float]:
+    for _ in range(warmup):
+        fn()
+
+    times_ms: List[float] = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times_ms.append((time.perf_counter() - t0) * 1000.0)
+    times_ms.sort()
+
+    # Tepe bellek ayrı koşuda ölçülür (tracemalloc zamanlamayı bozar)
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "runs": repeat,
+        "mean_ms": round(statistics.fmean(times_ms), 4),
+        "p50_ms": round(_percentile(times_ms, 0.50), 4),
+        "p90_ms": round(_percentile(times_ms, 0.90), 4),
+        "p99_ms": round(_percentile(times_ms, 0.99), 4),
+        "max_ms": round(times_ms[-1], 4),
+        "peak_mem_kb": round(peak / 1024.0, 1),
+    }
+
+
+def _repeat_for(n_rows: int, base_repeat: int) -> int:
+    # Büyük kataloglarda tek koşu saniyeler sürebilir; tekrar sayısını ölçekle
+    if n_rows >= 1_000_000:
+        return max(3, base_repeat // 20)
+    if n_rows >= 100_000:
+        return max(5, base_repeat // 5)
+    return base_repeat
+
+
+def use_backend(backend: str, n_rows: int, work_dir: str) -> None:
+    """
+    csv:  ikili katalog kapalı, agent'lar pandas ile CSV okur.
+    mmap: sentetik CSV'ler (DATA_PATH) için work_dir altına ikili katalog üretilir
+          ve CATALOG_BIN_DIR oraya yönlendirilir (uygulamanın kataloğuna dokunulmaz).
+    """
+    if backend == "csv":
+        os.environ["CATALOG_BINARY"] = "off"
+        return
+
+    os.environ["CATALOG_BINARY"] = "on"
+    os.environ["CATALOG_BIN_DIR"] = os.path.join(work_dir, f"catalog_bin_{n_rows}")
+    t0 = time.perf_counter()
+    binary_catalog.build_all()
+    print(f"  (ikili katalog {time.perf_counter() - t0:.2f} sn'de üretildi: {binary_catalog.catalog_dir()})")
+    for name, path in binary_catalog.catalog_sources().items():
+        if binary_catalog.open_table(name, path) is None:
+            raise RuntimeError(f"{name} ikili kataloğu açılamadı; mmap yolu ölçülemez")
+
+
+def bench_size(n_rows: int, work_dir: str, base_repeat: int, seed: int, backend: str = "csv") -> Dict[str, Dict[str, float]]:
+    hotel_path = os.path.join(work_dir, f"otel_{n_rows}.csv")
+    rest_path = os.path.join(work_dir, f"restoran_{n_rows}.csv")
+    if not (os.path.exists(hotel_path) and os.path.exists(rest_path)):
+        hotel_path, rest_path = generate_catalogs(n_rows, work_dir, seed=seed)
+
+    # Agent'lar DATA_PATH'i her çağrıda okur; sentetik dosyaya yönlendir
+    hotel_agent.DATA_PATH = hotel_path
+    food_agent.DATA_PATH = rest_path
+    use_backend(backend, n_rows, work_dir)
+
+    top_city = SEHIRLER[0]
+    top_cuisine = MUTFAKLAR[0]
+    repeat = _repeat_for(n_rows, base_repeat)
+
+    filtered = hotel_agent.filter_hotels(top_city, 20_000, 0.0)
+    hotel_id = int(filtered.iloc[0]["id"]) if not filtered.empty else 1
+
+    rnd = random.Random(seed)
+    words = [rnd.choice(SEHIRLER + MUTFAKLAR) for _ in range(1_000)]
+
+    cases: Dict[str, Callable[[], Any]] = {
+        "filter_hotels": lambda: hotel_agent.filter_hotels(top_city, 2_000, 4.0),
+        "get_restaurants_near_hotel": lambda: food_agent.get_restaurants_near_hotel(hotel_id),
+        "get_restaurant_recommendations_cuisine": lambda: food_agent.get_restaurant_recommendations(hotel_id, top_cuisine),
+        "select_top_hotels": lambda: hotel_agent.select_top_hotels(filtered, top_k=5),
+        "normalize_text_x1000": lambda: [normalize_text(w) for w in words],
+    }
+
+    out: Dict[str, Dict[str, float]] = {}
+    for name, fn in cases.items():
+        stats = measure(fn, repeat=repeat)
+        out[name] = stats
+        print(
+            f"  {name:<40} p50={stats['p50_ms']:>10.3f} ms  p90={stats['p90_ms']:>10.3f} ms  "
+            f"p99={stats['p99_ms']:>10.3f} ms  peak={stats['peak_mem_kb']:>10.1f} KB"
+        )
+    return out
+
+
+def _git_rev() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        return None
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """p50 bazında regresyonları döndürür (ör. threshold=0.2 => %20 yavaşlama)."""
+    regressions: List[str] = []
+    for size, funcs in current.get("results", {}).items():
+        base_funcs = baseline.get("results", {}).get(size, {})
+        for name, stats in funcs.items():
+            base = base_funcs.get(name)
+            if not base or not base.get("p50_ms"):
+                continue
+            ratio = stats["p50_ms"] / base["p50_ms"]
+            if ratio > 1.0 + threshold:
+                regressions.append(f"{size} rows / {name}: p50 {base['p50_ms']} -> {stats['p50_ms']} ms (x{ratio:.2f})")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Katalog filtreleme/sıralama mikro-benchmark")
+    parser.add_argument("--sizes", default=",".join(str(s) for s in DEFAULT_SIZES))
+    parser.add_argument("--repeat", type=int, default=50, help="küçük katalog için tekrar sayısı")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--backends", default=",".join(BACKENDS), help="csv,mmap")
+    parser.add_argument("--out", default="", help="sonuç JSON dosyası")
+    parser.add_argument("--compare", default="", help="kıyaslanacak eski sonuç JSON dosyası")
+    parser.add_argument("--threshold", type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    # Benchmark sırasında LLM rerank devreye girmesin
+    os.environ["LLM_PROVIDER"] = "mock"
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    backends = [b.strip() for b in args.backends.split(",") if b.strip()]
+    unknown = set(backends) - set(BACKENDS)
+    if unknown:
+        parser.error(f"bilinmeyen backend: {', '.join(sorted(unknown))}")
+    saved_env = {k: os.environ.get(k) for k in ("CATALOG_BINARY", "CATALOG_BIN_DIR")}
+
+    report: Dict[str, Any] = {
+        "git_rev": _git_rev(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "results": {},
+    }
+
+    try:
+        with tempfile.TemporaryDirectory(prefix="catalog_bench_") as work_dir:
+            for n in sizes:
+                for backend in backends:
+                    print(f"📦 {n} satırlık katalog [{backend}]")
+                    report["results"][f"{n}/{backend}"] = bench_size(n, work_dir, args.repeat, args.seed, backend)
+    finally:
+        for k, v in saved_env.items():
+            if v is None:
+                os.environ.pop(k, None)
+            else:
+                os.environ[k] = v
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n✅ Sonuçlar yazıldı: {args.out}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold)
+        if regressions:
+            print("\n❌ Regresyonlar:")
+            for line in regressions:
+                print(f"- {line}")
+            return 1
+        print("\n✅ Regresyon yok.")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
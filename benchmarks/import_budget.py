@@ -0,0 +1,78 @@
+"""
+Import süresi bütçe kontrolü (soğuk başlangıç regresyonlarını yakalamak için).
+
+Her giriş modülü temiz bir Python sürecinde import edilir:
+- süre IMPORT_BUDGET_MS'i (varsayılan 150 ms) aşmamalı
+- ağır bağımlılıklar (pandas, numpy, requests) import anında yüklenmemeli
+
+Çalıştırma:
+    python -m benchmarks.import_budget
+    IMPORT_BUDGET_MS=100 python -m benchmarks.import_budget
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import subprocess
+import sys
+from typing import Any, Dict, List
+
+ENTRY_MODULES = [
+    "app.agents.request_handler",
+    "app.services.recommendation_service",
+    "app.api.http_api",
+]
+
+HEAVY_MODULES = ["pandas", "numpy", "requests"]
+
+_PROBE = """
+import json, sys, time
+t0 = time.perf_counter()
+import {module}
+dt = (time.perf_counter() - t0) * 1000.0
+print(json.dumps({{"ms": dt, "heavy": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def measure_import(module: str, runs: int = 3) -> Dict[str, Any]:
+    """En iyi `runs` ölçümünü döner (disk cache gürültüsünü azaltmak için)."""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    best: Dict[str, Any] = {}
+    for _ in range(runs):
+        out = subprocess.check_output(
+            [sys.executable, "-c", _PROBE.format(module=module, heavy=HEAVY_MODULES)],
+            cwd=root,
+            text=True,
+        )
+        res = json.loads(out.strip().splitlines()[-1])
+        if not best or res["ms"] < best["ms"]:
+            best = res
+    return best
+
+
+def main() -> int:
+    budget_ms = float(os.getenv("IMPORT_BUDGET_MS", "150"))
+    failures: List[str] = []
+
+    for module in ENTRY_MODULES:
+        res = measure_import(module)
+        status = "✅"
+        if res["ms"] > budget_ms:
+            failures.append(f"{module}: {res['ms']:.1f} ms > {budget_ms:.0f} ms")
+            status = "❌"
+        if res["heavy"]:
+            failures.append(f"{module}: import anında yüklenenler: {', '.join(res['heavy'])}")
+            status = "❌"
+        print(f"{status} {module:<40} {res['ms']:>7.1f} ms  heavy={res['heavy'] or '-'}")
+
+    if failures:
+        print("\n❌ Import bütçesi aşıldı:")
+        for f in failures:
+            print(f"- {f}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,340 @@
+"""
+Ağsız uçtan uca yük testi.
+
+Lokal sahte HTTP sunucuları Places (textsearch/nearbysearch) ve Gemini
+(generateContent) uç noktalarını taklit eder; gecikme dağılımı, hata oranı ve
+429 patlamaları ayarlanabilir. PLACES_BASE_URL / GEMINI_BASE_URL bu sunuculara
+yönlendirilir, ardından N eşzamanlı sanal kullanıcı recommendation_service'i
+(otel listesi + her otel için restoranlar) çağırır.
+
+Çalıştırma:
+    python -m benchmarks.loadtest --source places --users 20 --duration 30
+    python -m benchmarks.loadtest --source csv --llm --users 8 --latency-ms 300 --error-rate 0.05
+    python -m benchmarks.loadtest --burst-every 10 --burst-len 2 --out loadtest.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import os
+import random
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+from benchmarks.catalog_bench import SEHIRLER, _percentile
+
+
+# ----------------------------
+# Sahte upstream
+# ----------------------------
+
+class UpstreamProfile:
+    """
+    Gecikme: log-normal (medyan latency_ms, yayılım latency_sigma).
+    error_rate: 500 dönen isteklerin oranı.
+    burst_every/burst_len: her burst_every saniyede burst_len saniye boyunca 429.
+    """
+
+    def __init__(
+        self,
+        latency_ms: float = 80.0,
+        latency_sigma: float = 0.5,
+        error_rate: float = 0.0,
+        burst_every: float = 0.0,
+        burst_len: float = 0.0,
+        seed: int = 7,
+    ):
+        self.latency_ms = latency_ms
+        self.latency_sigma = latency_sigma
+        self.error_rate = error_rate
+        self.burst_every = burst_every
+        self.burst_len = burst_len
+        self._rnd = random.Random(seed)
+        self._lock = threading.Lock()
+        self._t0 = time.monotonic()
+
+    def sample_latency_s(self) -> float:
+        if self.latency_ms <= 0:
+            return 0.0
+        with self._lock:
+            z = self._rnd.gauss(0.0, 1.0)
+        return self.latency_ms * math.exp(self.latency_sigma * z) / 1000.0
+
+    def sample_status(self) -> int:
+        if self.burst_every > 0 and self.burst_len > 0:
+            phase = (time.monotonic() - self._t0) % self.burst_every
+            if phase < self.burst_len:
+                return 429
+        with self._lock:
+            if self._rnd.random() < self.error_rate:
+                return 500
+        return 200
+
+
+def _fake_hotels(city: str, n: int = 20) -> List[Dict[str, Any]]:
+    rnd = random.Random(city)
+    out = []
+    for i in range(n):
+        out.append({
+            "place_id": f"fake-hotel-{city}-{i}",
+            "name": f"{city} Otel {i}",
+            "rating": round(rnd.uniform(3.0, 5.0), 1),
+            "price_level": rnd.randint(1, 4),
+            "user_ratings_total": rnd.randint(10, 5000),
+            "formatted_address": f"{city} merkez, sokak {i}",
+            "geometry": {"location": {"lat": 36.8 + i * 0.001, "lng": 30.7 + i * 0.001}},
+        })
+    return out
+
+
+def _fake_restaurants(location: str, n: int = 10) -> List[Dict[str, Any]]:
+    rnd = random.Random(location)
+    return [{
+        "place_id": f"fake-rest-{location}-{i}",
+        "name": f"Restoran {i}",
+        "rating": round(rnd.uniform(3.0, 5.0), 1),
+        "price_level": rnd.randint(1, 4),
+        "user_ratings_total": rnd.randint(10, 3000),
+        "vicinity": f"yakın sokak {i}",
+    } for i in range(n)]
+
+
+_ID_LINE = re.compile(r"^(\d+)\|", re.MULTILINE)
+
+
+def _fake_gemini_text(prompt: str) -> str:
+    # Prompt'taki aday tablosundan ilk id'leri seç (gerçek bir rerank gibi geçerli id döner)
+    ids = [int(x) for x in _ID_LINE.findall(prompt)][:3]
+    if '"hotels"' in prompt:
+        return json.dumps({"hotels": [{"otel_id": i, "skor": 80, "kisa_gerekce": "stub"} for i in ids]})
+    if '"restaurants"' in prompt:
+        return json.dumps({"restaurants": [{"restoran_id": i, "kisa_gerekce": "stub"} for i in ids]})
+    return "ok"
+
+
+class FakeUpstreamServer:
+    def __init__(self, profile: UpstreamProfile, host: str = "127.0.0.1", port: int = 0):
+        self.profile = profile
+        self.counts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-upstream", daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeUpstreamServer":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self.counts[key] = self.counts.get(key, 0) + 1
+
+    def _make_handler(self):
+        srv = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _send(self, status: int, payload: Dict[str, Any]) -> None:
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _simulate(self, endpoint: str) -> Optional[int]:
+                time.sleep(srv.profile.sample_latency_s())
+                status = srv.profile.sample_status()
+                srv._count(f"{endpoint}:{status}")
+                if status != 200:
+                    self._send(status, {"error": {"code": status, "message": "simulated"}})
+                    return None
+                return status
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                qs = parse_qs(url.query)
+                if url.path.endswith("/textsearch/json"):
+                    if self._simulate("places.textsearch") is None:
+                        return
+                    query = (qs.get("query") or [""])[0]
+                    city = query.replace("hotels in", "").strip() or "X"
+                    self._send(200, {"status": "OK", "results": _fake_hotels(city)})
+                elif url.path.endswith("/nearbysearch/json"):
+                    if self._simulate("places.nearbysearch") is None:
+                        return
+                    loc = (qs.get("location") or ["0,0"])[0]
+                    self._send(200, {"status": "OK", "results": _fake_restaurants(loc)})
+                else:
+                    self._send(404, {"error": "not found"})
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                raw = self.rfile.read(length) if length else b"{}"
+                if ":generateContent" not in self.path:
+                    self._send(404, {"error": "not found"})
+                    return
+                if self._simulate("gemini.generateContent") is None:
+                    return
+                try:
+                    body = json.loads(raw)
+                    prompt = "\n".join(p.get("text", "") for p in body["contents"][0]["parts"])
+                except Exception:
+                    prompt = ""
+                self._send(200, {"candidates": [{"content": {"parts": [{"text": _fake_gemini_text(prompt)}]}}]})
+
+            def log_message(self, *args):
+                return
+
+        return _Handler
+
+
+# ----------------------------
+# Sanal kullanıcılar
+# ----------------------------
+
+def _user_loop(
+    user_no: int,
+    deadline: float,
+    max_requests: int,
+    top_k_rest: int,
+    latencies_ms: List[float],
+    errors: Dict[str, int],
+    lock: threading.Lock,
+) -> None:
+    from app.services.recommendation_service import get_hotels, get_restaurants_for_hotel
+
+    rnd = random.Random(user_no)
+    done = 0
+    while time.monotonic() < deadline and (max_requests <= 0 or done < max_requests):
+        sehir = rnd.choice(SEHIRLER[:8])
+        max_fiyat = rnd.choice([1000, 2000, 3000, 5000, 10000])
+        min_puan = rnd.choice([3.0, 3.5, 4.0, 4.5])
+
+        t0 = time.perf_counter()
+        try:
+            oteller, used_places = get_hotels(sehir, max_fiyat, min_puan, profile_hint="", top_k=5)
+            for o in oteller:
+                get_restaurants_for_hotel(o, None, profile_hint="", top_k=top_k_rest, used_places=used_places)
+            elapsed = (time.perf_counter() - t0) * 1000.0
+            with lock:
+                latencies_ms.append(elapsed)
+        except Exception as e:
+            with lock:
+                key = type(e).__name__
+                errors[key] = errors.get(key, 0) + 1
+        done += 1
+
+
+def run_load(users: int, duration_s: float, max_requests: int, top_k_rest: int) -> Dict[str, Any]:
+    latencies: List[float] = []
+    errors: Dict[str, int] = {}
+    lock = threading.Lock()
+
+    t_start = time.monotonic()
+    deadline = t_start + duration_s
+    threads = [
+        threading.Thread(
+            target=_user_loop,
+            args=(i, deadline, max_requests, top_k_rest, latencies, errors, lock),
+            name=f"vuser-{i}",
+        )
+        for i in range(users)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.monotonic() - t_start
+
+    latencies.sort()
+    n_ok = len(latencies)
+    n_err = sum(errors.values())
+    return {
+        "users": users,
+        "wall_s": round(wall, 3),
+        "requests_ok": n_ok,
+        "requests_failed": n_err,
+        "errors": errors,
+        "throughput_rps": round(n_ok / wall, 3) if wall > 0 else 0.0,
+        "p50_ms": round(_percentile(latencies, 0.50), 2),
+        "p90_ms": round(_percentile(latencies, 0.90), 2),
+        "p99_ms": round(_percentile(latencies, 0.99), 2),
+        "max_ms": round(latencies[-1], 2) if latencies else 0.0,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Sahte Places/Gemini ile uçtan uca yük testi")
+    parser.add_argument("--source", choices=["places", "csv"], default="places")
+    parser.add_argument("--llm", action="store_true", help="CSV modunda Gemini rerank'i (sahte) aç")
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--duration", type=float, default=15.0, help="saniye")
+    parser.add_argument("--requests-per-user", type=int, default=0, help="0 => süre dolana kadar")
+    parser.add_argument("--top-k-rest", type=int, default=3)
+    parser.add_argument("--latency-ms", type=float, default=80.0, help="upstream medyan gecikme")
+    parser.add_argument("--latency-sigma", type=float, default=0.5, help="log-normal yayılım")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--burst-every", type=float, default=0.0, help="429 patlama periyodu (sn)")
+    parser.add_argument("--burst-len", type=float, default=0.0, help="429 patlama süresi (sn)")
+    parser.add_argument("--out", default="")
+    args = parser.parse_args(argv)
+
+    profile = UpstreamProfile(
+        latency_ms=args.latency_ms,
+        latency_sigma=args.latency_sigma,
+        error_rate=args.error_rate,
+        burst_every=args.burst_every,
+        burst_len=args.burst_len,
+    )
+    server = FakeUpstreamServer(profile).start()
+
+    # Provider modülleri import edilmeden önce env ayarlanmalı (PLACES_* import anında okunur)
+    if args.source == "places":
+        os.environ["PLACES_API_KEY"] = "loadtest-fake-key"
+        os.environ["PLACES_BASE_URL"] = server.base_url
+    else:
+        os.environ["PLACES_API_KEY"] = ""
+    if args.llm:
+        os.environ["LLM_PROVIDER"] = "gemini"
+        os.environ["GEMINI_API_KEY"] = "loadtest-fake-key"
+        os.environ["GEMINI_BASE_URL"] = server.base_url
+    else:
+        os.environ["LLM_PROVIDER"] = "mock"
+
+    print(f"🚦 Sahte upstream: {server.base_url} | kaynak={args.source} | llm={args.llm} | users={args.users}")
+    try:
+        report = run_load(args.users, args.duration, args.requests_per_user, args.top_k_rest)
+    finally:
+        server.stop()
+
+    report["source"] = args.source
+    report["llm"] = args.llm
+    report["upstream_calls"] = dict(sorted(server.counts.items()))
+
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
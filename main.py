@@ -1,36 +1,61 @@
 import argparse
 import os
-import sys
 
 
-def run_cli():
+def run_cli(profile: bool = False):
     from app.agents.request_handler import run_full_recommendation_flow
-    run_full_recommendation_flow()
+    run_full_recommendation_flow(profile=profile)
 
 
-def run_ui(host: str, port: int):
+def run_ui(host: str, port: int, workers: int = 1):
+    from app.ui.supervisor import run_supervisor, streamlit_cmd
+
+    if workers > 1:
+        # N streamlit worker'ı + tek port arkasında sticky TCP proxy
+        run_supervisor(host, port, workers)
+        return
+
     # streamlit'i subprocess ile çağırıyoruz
     import subprocess
-    cmd = [
-        sys.executable, "-m", "streamlit", "run",
-        "app/ui/streamlit_app.py",
-        "--server.address", host,
-        "--server.port", str(port),
-    ]
-    subprocess.run(cmd, check=False)
+    subprocess.run(streamlit_cmd(host, port), check=False)
+
+
+def run_api(host: str, port: int, workers: int):
+    from app.api.http_api import run_api as _run_api
+    _run_api(host, port, workers=workers)
+
+
+def run_batch(input_path: str, output_path: str, workers: int, resume: bool):
+    from app.services.batch_service import main_batch
+    main_batch(input_path, output_path, workers=workers, resume=resume)
 
 
 def main():
     parser = argparse.ArgumentParser(description="Otel & Restoran Öneri Sistemi")
-    parser.add_argument("--mode", choices=["cli", "ui"], default="ui")
+    parser.add_argument("--mode", choices=["cli", "ui", "api", "batch"], default="ui")
     parser.add_argument("--host", default="localhost")
-    parser.add_argument("--port", type=int, default=8501)
+    parser.add_argument("--port", type=int, default=None, help="varsayılan: ui=8501, api=8080")
+    parser.add_argument("--workers", type=int, default=0, help="api/batch worker sayısı (0 => CPU sayısı); ui: >1 ise supervisor modu")
+    parser.add_argument("--input", default="", help="batch: istek JSONL dosyası")
+    parser.add_argument("--output", default="", help="batch: sonuç JSONL dosyası")
+    parser.add_argument("--no-resume", action="store_true", help="batch: checkpoint'i yok say, baştan başla")
+    parser.add_argument("--profile", action="store_true", help="cli: akışı profille; ui: her 'getir' isteğini profille (PROFILE_DIR)")
     args = parser.parse_args()
 
+    if args.profile:
+        # ui modunda streamlit alt süreci env'i devralır
+        os.environ["PROFILE_SAMPLE_RATE"] = "1"
+
     if args.mode == "cli":
-        run_cli()
+        run_cli(profile=args.profile)
+    elif args.mode == "batch":
+        if not args.input:
+            parser.error("--mode batch için --input zorunlu")
+        run_batch(args.input, args.output, args.workers, resume=not args.no_resume)
+    elif args.mode == "api":
+        run_api(args.host, args.port or 8080, args.workers)
     else:
-        run_ui(args.host, args.port)
+        run_ui(args.host, args.port or 8501, args.workers)
 
 
 if __name__ == "__main__":